@@ -33,6 +33,10 @@ class OrderType(Enum):
 class AdjudicableOrder:
     """Helper class for adjudicating orders.
     Contains order information and information about the unit's adjudication state."""
+    __slots__ = ("state", "resolution", "country", "is_army", "current_province", "current_coast", "supports",
+                 "convoys", "type", "destination_province", "destination_coast", "source_province", "is_convoy",
+                 "is_sortie", "not_supportable", "is_valid", "base_unit")
+
     def __init__(self, unit: Unit):
         self.state = ResolutionState.UNRESOLVED
         self.resolution = Resolution.FAILS
@@ -1,12 +1,51 @@
 """Utility functions that handle image conversion."""
 import asyncio
+import io
 import logging
 import os
+from collections import OrderedDict
+from dataclasses import dataclass
+from enum import Enum
+import subprocess
+import time
 from subprocess import PIPE
-from DiploGM.config import SIMULATRANEOUS_SVG_EXPORT_LIMIT
+
+from PIL import Image
+
+from DiploGM.config import OVERSIZED_IMAGE_FORMAT, OVERSIZED_IMAGE_MIN_QUALITY, SIMULATRANEOUS_SVG_EXPORT_LIMIT
+from DiploGM.profiler import profiler
 
 logger = logging.getLogger(__name__)
 
+# file extension and Pillow format name for each format oversized maps can be encoded as
+IMAGE_FORMATS = {
+    "jpeg": (".jpg", "JPEG"),
+    "webp": (".webp", "WEBP"),
+}
+MAX_QUALITY = 95
+# number of rasterized maps kept so later uploads (e.g. to the archive) don't have to render them again
+RASTERIZED_MAP_CACHE_SIZE = 16
+
+
+class MapSize(Enum):
+    """Resolutions a map can be sent at, as a fraction of the full Inkscape export."""
+    FULL = 1.0
+    MEDIUM = 0.5
+
+
+@dataclass
+class RasterizedMap:
+    """Every resolution produced from a single rasterization of a map."""
+    file_name: str
+    pngs: dict[MapSize, bytes]
+
+    def get(self, size: MapSize = MapSize.FULL) -> bytes:
+        """Gets the map at a size, or at full size if that size wasn't produced."""
+        return self.pngs.get(size, self.pngs[MapSize.FULL])
+
+
+rasterized_maps: OrderedDict[tuple, RasterizedMap] = OrderedDict()
+
 LIMIT = SIMULATRANEOUS_SVG_EXPORT_LIMIT
 
 if LIMIT is None:
@@ -14,49 +53,153 @@ if LIMIT is None:
 external_task_limit = asyncio.Semaphore(int(LIMIT))
 
 
-async def svg_to_png(svg: bytes, file_name: str) -> tuple[bytes, str]:
+INKSCAPE_PNG_COMMAND = "inkscape --pipe --export-type=png --export-dpi=200"
+
+
+def _get_inkscape_env() -> dict[str, str]:
+    # https://gitlab.com/inkscape/inkscape/-/issues/4716
+    os_env = os.environ.copy()
+    os_env["SELF_CALL"] = "xxx"
+    return os_env
+
+
+def _extract_png(data: bytes, file_name: str) -> tuple[bytes, str]:
+    # Stupid inkscape error fix, not good but works
+    # Inkscape can throw warnings in stdout, this should remove those warnings, leaving us with a valid png
+
+    # This should indicate the start of the png, see https://www.w3.org/TR/2003/REC-PNG-20031110/#5PNG-file-signature
+    png_start = b"\x89PNG\r\n\x1a\n"
+
+    if data[:8] != png_start:
+#        logger.critical(f"failed to assert png code: {png_start}")
+#        logger.critical(data[:30])
+
+        data = data[data.find(png_start) :]
+
+        if data[:8] != png_start:
+            logger.critical(data[:30])
+            raise RuntimeError("Something went wrong with making the png.")
+
+    base = os.path.splitext(file_name)[0]
+    return bytes(data), base + ".png"
+
+
+async def svg_to_png(svg: bytes, file_name: str, variant: str | None = None) -> tuple[bytes, str]:
     """Convert an SVG to a PNG using Inkscape.
     This is by far the most intensive part of the bot, so if there's any way we could speed this up,
-    it would make a huge difference."""
+    it would make a huge difference.
+    variant: the variant the map is from, for profiling"""
+    queued_at = time.perf_counter()
     async with external_task_limit:
-        # https://gitlab.com/inkscape/inkscape/-/issues/4716
-        os_env = os.environ.copy()
-        os_env["SELF_CALL"] = "xxx"
+        started_at = time.perf_counter()
         p = await asyncio.create_subprocess_shell(
-            "inkscape --pipe --export-type=png --export-dpi=200",
+            INKSCAPE_PNG_COMMAND,
             stdout=PIPE,
             stdin=PIPE,
             stderr=PIPE,
-            env=os_env,
+            env=_get_inkscape_env(),
         )
         data, _ = await p.communicate(input=svg)
+        png = _extract_png(data, file_name)
+    profiler.record("rasterize.wait", started_at - queued_at, variant)
+    profiler.record("rasterize.process", time.perf_counter() - started_at, variant)
+    profiler.record("rasterize.svg_bytes", len(svg), variant)
+    profiler.record("rasterize.png_bytes", len(png[0]), variant)
+    return png
 
-        # Stupid inkscape error fix, not good but works
-        # Inkscape can throw warnings in stdout, this should remove those warnings, leaving us with a valid png
 
-        # This should indicate the start of the png, see https://www.w3.org/TR/2003/REC-PNG-20031110/#5PNG-file-signature
-        png_start = b"\x89PNG\r\n\x1a\n"
+def svg_to_png_sync(svg: bytes, file_name: str) -> tuple[bytes, str]:
+    """Blocking svg_to_png, for use outside of the bot (e.g. batch jobs), which doesn't share its limit."""
+    p = subprocess.run(INKSCAPE_PNG_COMMAND, input=svg, stdout=PIPE, stderr=PIPE,
+                       shell=True, env=_get_inkscape_env(), check=False)
+    return _extract_png(p.stdout, file_name)
 
-        if data[:8] != png_start:
-#            logger.critical(f"failed to assert png code: {png_start}")
-#            logger.critical(data[:30])
 
-            data = data[data.find(png_start) :]
+def downscale_png(png: bytes, sizes: list[MapSize]) -> dict[MapSize, bytes]:
+    """Downscale a PNG to each of the given sizes, decoding it only once."""
+    pngs: dict[MapSize, bytes] = {}
+    with Image.open(io.BytesIO(png)) as image:
+        image.load()
+        for size in sizes:
+            width = max(1, round(image.width * size.value))
+            height = max(1, round(image.height * size.value))
+            output = io.BytesIO()
+            image.resize((width, height), Image.Resampling.LANCZOS).save(output, format="PNG", optimize=True)
+            pngs[size] = output.getvalue()
+    return pngs
 
-            if data[:8] != png_start:
-                logger.critical(data[:30])
-                raise RuntimeError("Something went wrong with making the png.")
 
-        base = os.path.splitext(file_name)[0]
-        return bytes(data), base + ".png"
+async def svg_to_pngs(svg: bytes,
+                      file_name: str,
+                      sizes: tuple[MapSize, ...] = (MapSize.FULL,),
+                      variant: str | None = None) -> RasterizedMap:
+    """Convert an SVG to PNGs at the given sizes, only running Inkscape once.
+    Smaller sizes each cost a downscale and an encode, so only ask for the ones that will be sent."""
+    png, png_file_name = await svg_to_png(svg, file_name, variant)
+    rasterized = RasterizedMap(png_file_name, {MapSize.FULL: png})
+    smaller = [size for size in sizes if size != MapSize.FULL]
+    if smaller:
+        with profiler.span("rasterize.downscale", variant):
+            rasterized.pngs.update(await asyncio.to_thread(downscale_png, png, smaller))
+    return rasterized
 
 
-async def png_to_jpg(png: bytes, file_name: str) -> tuple[bytes, str, bytes]:
-    """Convert a PNG to a JPG using ImageMagick."""
-    async with external_task_limit:
-        p = await asyncio.create_subprocess_shell(
-            "convert png:- jpg:-", stdout=PIPE, stdin=PIPE, stderr=PIPE
-        )
-        data, error = await p.communicate(input=png)
-        base = os.path.splitext(file_name)[0]
-        return bytes(data), base + ".jpg", error
+def cache_rasterized_map(key: tuple, rasterized: RasterizedMap) -> None:
+    """Keeps a rasterized map for later use, e.g. by (kind, server id, turn)."""
+    rasterized_maps[key] = rasterized
+    rasterized_maps.move_to_end(key)
+    while len(rasterized_maps) > RASTERIZED_MAP_CACHE_SIZE:
+        rasterized_maps.popitem(last=False)
+
+
+def get_cached_rasterized_map(key: tuple) -> RasterizedMap | None:
+    """Gets a map kept by cache_rasterized_map, if it's still there."""
+    return rasterized_maps.get(key)
+
+
+def evict_rasterized_maps(server_id: int) -> None:
+    """Drops every map kept for a server, for when its boards change."""
+    for key in [key for key in rasterized_maps if key[1] == server_id]:
+        del rasterized_maps[key]
+
+
+def encode_to_size(png: bytes,
+                   file_name: str,
+                   target_size: int,
+                   image_format: str = "jpeg",
+                   min_quality: int = 40) -> tuple[bytes, str]:
+    """Re-encode a PNG as a JPEG or WebP using Pillow, at the highest quality that fits in target_size bytes.
+    The PNG is only decoded once, and the quality is binary searched.
+    If nothing fits, the image at min_quality is returned so the caller can decide what to do."""
+    extension, pillow_format = IMAGE_FORMATS[image_format]
+    with Image.open(io.BytesIO(png)) as decoded:
+        image = decoded.convert("RGB")
+
+    def encode(quality: int) -> bytes:
+        output = io.BytesIO()
+        image.save(output, format=pillow_format, quality=quality)
+        return output.getvalue()
+
+    best = None
+    low, high = min_quality, MAX_QUALITY
+    while low <= high:
+        quality = (low + high) // 2
+        data = encode(quality)
+        if len(data) <= target_size:
+            best = data
+            low = quality + 1
+        else:
+            high = quality - 1
+    if best is None:
+        best = encode(min_quality)
+
+    base = os.path.splitext(file_name)[0]
+    return best, base + extension
+
+
+async def shrink_png(png: bytes, file_name: str, target_size: int) -> tuple[bytes, str]:
+    """Convert an oversized PNG to a smaller format, returning the new image and its file name.
+    Pillow runs in a worker thread, so this doesn't block the event loop."""
+    return await asyncio.to_thread(
+        encode_to_size, png, file_name, target_size, OVERSIZED_IMAGE_FORMAT, OVERSIZED_IMAGE_MIN_QUALITY
+    )
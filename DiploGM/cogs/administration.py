@@ -1,4 +1,5 @@
 """Bot administration commands, to be used by superusers only."""
+import asyncio
 import logging
 import re
 
@@ -8,11 +9,13 @@ from discord.utils import find as discord_find
 
 from DiploGM import config
 from DiploGM import perms
+from DiploGM.adjudicator.utils import svg_to_png
 from DiploGM.config import MAP_ARCHIVE_SAS_TOKEN
 from DiploGM.utils import log_command, parse_season, send_message_and_file, upload_map_to_archive
 from DiploGM.manager import Manager
+from DiploGM.utils.render_queue import RenderPriority, RenderQueueFull
 from DiploGM.utils.sanitise import remove_prefix
-from DiploGM.utils.send_message import send_error, ErrorMessage
+from DiploGM.utils.send_message import send_error, send_render_queue_full_error, ErrorMessage
 
 logger = logging.getLogger(__name__)
 manager = Manager()
@@ -274,12 +277,17 @@ class AdminCog(commands.Cog):
         server_id = int(arguments[0])
         board = manager.get_board(server_id)
         season = parse_season(arguments[1:], board.turn)
-        file, _ = manager.draw_map(
-            server_id,
-            draw_moves=True,
-            turn=season,
-        )
-        await upload_map_to_archive(ctx, server_id, board, file, season)
+        draw_board, _ = manager.get_board_for_map(server_id, turn=season)
+        try:
+            file, file_name = await manager.render(
+                server_id, RenderPriority.BACKGROUND, manager.draw_map_for_board, draw_board, draw_moves=True
+            )
+        except RenderQueueFull as err:
+            log_command(logger, ctx, message=str(err), level=logging.WARNING)
+            await send_render_queue_full_error(ctx.channel)
+            return
+        png_map, _ = await svg_to_png(file, file_name, board.datafile)
+        await upload_map_to_archive(ctx, server_id, board, png_map, season)
 
     @commands.command(hidden=True)
     @perms.superuser_only("Checks the adjacencies of a variant to find potential issues")
@@ -288,7 +296,7 @@ class AdminCog(commands.Cog):
         assert ctx.guild is not None
         gametype = arg if arg else "classic"
 
-        message = manager.verify_adjacencies(gametype)
+        message = await asyncio.to_thread(manager.verify_adjacencies, gametype)
         log_command(logger, ctx, message=message)
         await send_message_and_file(channel=ctx.channel, message=message)
 
@@ -297,7 +305,7 @@ class AdminCog(commands.Cog):
     async def reload_variant(self, ctx: commands.Context, arg) -> None:
         """Reloads the map parser for a given variant. Useful if a map has been updated."""
         assert ctx.guild is not None
-        message = manager.reload_variant(arg)
+        message = await manager.reload_variant(arg)
         log_command(logger, ctx, message=message)
         await send_message_and_file(channel=ctx.channel, message=message)
 
@@ -13,6 +13,7 @@ from DiploGM.bot import DiploGM
 from DiploGM import perms
 from DiploGM.utils import send_message_and_file
 from DiploGM.manager import Manager
+from DiploGM.profiler import profiler
 
 logger = logging.getLogger(__name__)
 manager = Manager()
@@ -22,6 +23,8 @@ class DevelopmentCog(commands.Cog):
     """
     Superuser features primarily used for Development of the bot
     .su_dashboard
+    .render_queue_stats
+    .render_profile
     .shutdown_the_bot_yes_i_want_to_do_this
     """
 
@@ -64,6 +67,42 @@ class DevelopmentCog(commands.Cog):
             footer_content=footer,
         )
 
+    @commands.command(hidden=True)
+    @perms.superuser_only("show render queue statistics")
+    async def render_queue_stats(self, ctx: commands.Context):
+        await send_message_and_file(
+            channel=ctx.channel,
+            title="Render Queue",
+            message=manager.render_queue.get_stats_summary(),
+        )
+
+    @commands.command(hidden=True)
+    @perms.superuser_only("show map render profiling")
+    async def render_profile(self, ctx: commands.Context, action: str = "show", variant: str | None = None):
+        """Shows where render time goes per variant.
+        .render_profile [show|on|off|reset|dump] [variant]"""
+        keyword = action.lower()
+        if keyword == "on":
+            profiler.enabled = True
+            message = "Profiling enabled."
+        elif keyword == "off":
+            profiler.enabled = False
+            message = "Profiling disabled."
+        elif keyword == "reset":
+            profiler.reset()
+            message = "Profile cleared."
+        elif keyword == "dump":
+            message = f"Profile written to `{profiler.dump()}`."
+        else:
+            # anything else is a variant name, which keeps its case
+            message = profiler.get_summary(variant if keyword == "show" else action)
+
+        await send_message_and_file(
+            channel=ctx.channel,
+            title="Render Profile",
+            message=message,
+        )
+
     @commands.command(hidden=True)
     @perms.superuser_only("shutdown the bot")
     async def shutdown_the_bot_yes_i_want_to_do_this(self, ctx: commands.Context):
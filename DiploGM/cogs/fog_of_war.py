@@ -1,6 +1,6 @@
 import asyncio
 import logging
-from typing import Callable
+import time
 
 from discord import TextChannel
 from discord.ext import commands
@@ -13,7 +13,9 @@ from DiploGM.utils import (
 )
 from DiploGM.adjudicator.utils import svg_to_png
 from DiploGM.manager import Manager
+from DiploGM.models.board import Board
 from DiploGM.models.player import Player
+from DiploGM.utils.render_queue import RenderPriority
 from DiploGM.utils.sanitise import remove_prefix
 
 logger = logging.getLogger(__name__)
@@ -31,9 +33,7 @@ class FogOfWarCog(commands.Cog):
 
     # for fog of war
     async def publish_fow_current(self, ctx: commands.Context):
-        await publish_map(
-            ctx, manager, "starting map", lambda m, s, p: m.draw_fow_current_map(s, p)
-        )
+        await publish_map(ctx, manager, "starting map", draw_moves=False)
 
     @commands.command(
         brief="Sends fog of war maps",
@@ -55,13 +55,7 @@ class FogOfWarCog(commands.Cog):
 
         filter_player = board.get_player(remove_prefix(ctx))
 
-        await publish_map(
-            ctx,
-            manager,
-            "moves map",
-            lambda m, s, p: m.draw_fow_moves_map(s, p),
-            filter_player,
-        )
+        await publish_map(ctx, manager, "moves map", draw_moves=True, filter_player=filter_player)
 
     @commands.command(
         brief="Sends fog of war orders",
@@ -120,7 +114,7 @@ async def publish_map(
     ctx: commands.Context,
     manager: Manager,
     name: str,
-    map_caller: Callable[[Manager, int, Player], tuple[bytes, str]],
+    draw_moves: bool,
     filter_player=None,
 ):
     assert ctx.guild is not None
@@ -139,12 +133,8 @@ async def publish_map(
         # FIXME this shouldn't be an Error/this should propagate
         raise RuntimeError("No player category found")
 
-    name_to_player: dict[str, Player] = {}
-    for player in board.get_players():
-        name_to_player[player.name.lower()] = player
-
-    tasks = []
-
+    # players who see the same provinces share one drawn map, which is exported once per distinct side panel
+    views: dict[frozenset[str], dict[str | None, list[tuple[Player, TextChannel]]]] = {}
     for channel in player_category.channels:
         if not isinstance(channel, TextChannel):
             continue
@@ -153,27 +143,53 @@ async def publish_map(
         if not player or (filter_player and player != filter_player):
             continue
 
-        message = f"Here is the {name} for {board.turn}"
-        # capture local of player
-        tasks.append(
-            map_publish_task(
-                lambda player=player: map_caller(manager, guild_id, player),
-                channel,
-                message,
-            )
-        )
+        panels = views.setdefault(get_view_key(board, player), {})
+        panels.setdefault(get_panel_key(board, player), []).append((player, channel))
+
+    start = time.time()
+    message = f"Here is the {name} for {board.turn}"
+    await asyncio.gather(*[publish_view(guild_id, manager, list(panels.values()), draw_moves, message)
+                           for panels in views.values()])
+    logger.info(
+        f"fog_of_war.publish_map drew {len(views)} views with "
+        f"{sum(len(panels) for panels in views.values())} side panels for "
+        f"{sum(len(recipients) for panels in views.values() for recipients in panels.values())} channels "
+        f"in {time.time() - start}s"
+    )
+
+
+def get_view_key(board: Board, player: Player) -> frozenset[str]:
+    """Returns a key that is equal for players whose FoW maps are drawn the same, other than the side panel.
+    Everything on the map itself, including highlighted retreats, depends only on the visible provinces."""
+    return frozenset(province.name for province in board.get_visible_provinces(player))
+
+
+def get_panel_key(board: Board, player: Player) -> str | None:
+    """Returns a key that is equal for players whose FoW maps have the same side panel.
+    The side panel only shows the restricted player their own SC count, and not at all if they're hidden."""
+    return None if board.is_player_hidden(player) else player.name
+
 
-    await asyncio.gather(*tasks)
+async def publish_view(guild_id: int, manager: Manager, panels: list[list[tuple[Player, TextChannel]]],
+                       draw_moves: bool, message: str):
+    maps = await manager.render(guild_id, RenderPriority.RESULTS, manager.draw_fow_view_maps,
+                                guild_id, [recipients[0][0] for recipients in panels], draw_moves)
+    variant = manager.get_board(guild_id).datafile
+    await asyncio.gather(*[map_publish_task(svg, [channel for _, channel in recipients], message, variant)
+                           for svg, recipients in zip(maps, panels)])
 
 
-async def map_publish_task(map_maker, channel, message):
+async def map_publish_task(svg: tuple[bytes, str], channels, message, variant: str | None = None):
+    file, file_name = svg
     async with fow_export_limit:
-        file, file_name = map_maker()
-        file, file_name = await svg_to_png(file, file_name)
-        await send_message_and_file(
+        file, file_name = await svg_to_png(file, file_name, variant)
+    await asyncio.gather(*[
+        send_message_and_file(
             channel=channel,
             message=message,
             file=file,
             file_name=file_name,
             file_in_embed=False,
         )
+        for channel in channels
+    ])
@@ -33,12 +33,15 @@ from DiploGM.utils import (
     send_message_and_file,
     upload_map_to_archive,
 )
-from DiploGM.adjudicator.utils import svg_to_png
+from DiploGM.adjudicator.utils import (
+    MapSize, cache_rasterized_map, get_cached_rasterized_map, svg_to_png, svg_to_pngs
+)
 
 from DiploGM.models.extension import ExtensionEvent, SQLiteExtensionEventRepository
 from DiploGM.models.order import Disband, Build
 from DiploGM.models.player import Player
 from DiploGM.manager import Manager, SEVERENCE_A_ID, SEVERENCE_B_ID
+from DiploGM.utils.render_queue import RenderPriority, RenderQueueFull
 from DiploGM.utils.sanitise import remove_prefix, sanitise_name
 from DiploGM.utils.send_message import ErrorMessage, send_error
 
@@ -864,13 +867,24 @@ class GameManagementCog(commands.Cog):
         if "silent" not in arguments and guild.id not in [SEVERENCE_A_ID, SEVERENCE_B_ID]:
             _ = asyncio.create_task(self._ping_phase_change(guild, board, log_url))
 
-        if MAP_ARCHIVE_SAS_TOKEN:
-            file, _ = manager.draw_map_for_board(board, draw_moves=True)
-            _ = asyncio.create_task(upload_map_to_archive(ctx, guild.id, board, file))
-
         if board.data.get("deadline"):
             _ = asyncio.create_task(self._update_deadline(ctx, guild.id))
 
+        if MAP_ARCHIVE_SAS_TOKEN:
+            # reuse the orders map posted at adjudication if there is one, which also shows failed and DP orders
+            rasterized = get_cached_rasterized_map(("orders", guild.id, board.turn.get_short_name()))
+            if rasterized is None:
+                try:
+                    file, file_name = await manager.render(
+                        guild.id, RenderPriority.BACKGROUND, manager.draw_map_for_board, board, draw_moves=True
+                    )
+                except RenderQueueFull as err:
+                    # the orders are already out, so only the archive copy is lost; .archive_upload can redo it
+                    log_command(logger, ctx, message=f"Skipped archive upload: {err}", level=logging.WARNING)
+                    return
+                rasterized = await svg_to_pngs(file, file_name, (MapSize.FULL,), board.datafile)
+            _ = asyncio.create_task(upload_map_to_archive(ctx, guild.id, board, rasterized.get()))
+
     async def _is_missing_orders(self, board: Board) -> bool:
         if board.turn.is_moves():
             for unit in board.units:
@@ -964,7 +978,10 @@ class GameManagementCog(commands.Cog):
         # We draw the board from the DB to apply failed and DP orders that we want to hide from players
         draw_board = manager.get_board_from_db(guild.id, old_turn)
         manager.apply_adjudication_results(guild.id, draw_board)
-        file, file_name = manager.draw_map_for_board(
+        file, file_name = await manager.render(
+            guild.id,
+            RenderPriority.RESULTS,
+            manager.draw_map_for_board,
             draw_board,
             draw_moves=True,
             color_mode=color_mode,
@@ -976,7 +993,11 @@ class GameManagementCog(commands.Cog):
         converted_file_name: str | None = None
         needs_png = return_svg or (full_adjudicate and _get_maps_channel(guild))
         if needs_png:
-            converted_file, converted_file_name = await svg_to_png(file, file_name)
+            rasterized = await svg_to_pngs(file, file_name, (MapSize.FULL,), board.datafile)
+            converted_file, converted_file_name = rasterized.get(), rasterized.file_name
+            if not test_adjudicate and color_mode is None:
+                # publish_orders archives this map; manager.adjudicate has already dropped any from before a rollback
+                cache_rasterized_map(("orders", guild.id, old_turn.get_short_name()), rasterized)
         await send_message_and_file(
             channel=ctx.channel,
             title=f"{title} Orders Map",
@@ -997,7 +1018,10 @@ class GameManagementCog(commands.Cog):
                 pass
 
         if movement_adjudicate:
-            file, file_name = manager.draw_map_for_board(
+            file, file_name = await manager.render(
+                guild.id,
+                RenderPriority.RESULTS,
+                manager.draw_map_for_board,
                 draw_board,
                 draw_moves=True,
                 color_mode=color_mode,
@@ -1012,13 +1036,16 @@ class GameManagementCog(commands.Cog):
                 file=file,
                 file_name=file_name,
                 convert_svg=return_svg,
+                variant=board.datafile,
             )
 
-        file, file_name = manager.draw_map_for_board(new_board, color_mode=color_mode)
+        file, file_name = await manager.render(
+            guild.id, RenderPriority.RESULTS, manager.draw_map_for_board, new_board, color_mode=color_mode
+        )
 
         needs_png = return_svg or (full_adjudicate and _get_maps_channel(guild))
         if needs_png:
-            converted_file, converted_file_name = await svg_to_png(file, file_name)
+            converted_file, converted_file_name = await svg_to_png(file, file_name, board.datafile)
         await send_message_and_file(
             channel=ctx.channel,
             title=f"{title} Results Map",
@@ -1092,7 +1119,10 @@ class GameManagementCog(commands.Cog):
         """
 
         assert ctx.guild is not None
-        message, file, file_name = manager.rollback(ctx.guild.id)
+        message, board = manager.rollback(ctx.guild.id)
+        file, file_name = await manager.render(
+            ctx.guild.id, RenderPriority.RESULTS, manager.draw_map_for_board, board
+        )
         log_command(logger, ctx, message=message)
         await send_message_and_file(channel=ctx.channel, message=message, file=file, file_name=file_name)
 
@@ -1106,7 +1136,10 @@ class GameManagementCog(commands.Cog):
         """
 
         assert ctx.guild is not None
-        message, file, file_name = manager.reload(ctx.guild.id)
+        message, board = manager.reload(ctx.guild.id)
+        file, file_name = await manager.render(
+            ctx.guild.id, RenderPriority.RESULTS, manager.draw_map_for_board, board
+        )
         log_command(logger, ctx, message=message)
         await send_message_and_file(channel=ctx.channel, message=message, file=file, file_name=file_name)
 
@@ -1147,8 +1180,13 @@ class GameManagementCog(commands.Cog):
         """
         assert ctx.guild is not None
         edit_commands = remove_prefix(ctx)
-        title, message, file, file_name, embed_colour = parse_edit_state(edit_commands, manager.get_board(ctx.guild.id))
+        board = manager.get_board(ctx.guild.id)
+        async with manager.editing(ctx.guild.id):
+            title, message, embed_colour, changed = parse_edit_state(edit_commands, board)
         log_command(logger, ctx, message=title)
+        file, file_name = None, None
+        if changed:
+            file, file_name = await manager.render(ctx.guild.id, RenderPriority.GM, manager.draw_map_for_board, board)
         await send_message_and_file(channel=ctx.channel,
                                     title=title,
                                     message=message,
@@ -1405,9 +1443,13 @@ class GameManagementCog(commands.Cog):
         """
         assert ctx.guild is not None
         param_commands = remove_prefix(ctx)
-        title, message, file, file_name, embed_colour = parse_board_params(param_commands,
-                                                                           manager.get_board(ctx.guild.id))
+        board = manager.get_board(ctx.guild.id)
+        async with manager.editing(ctx.guild.id):
+            title, message, embed_colour, changed = parse_board_params(param_commands, board)
         log_command(logger, ctx, message=title)
+        file, file_name = None, None
+        if changed:
+            file, file_name = await manager.render(ctx.guild.id, RenderPriority.GM, manager.draw_map_for_board, board)
         await send_message_and_file(channel=ctx.channel,
                                     title=title,
                                     message=message,
@@ -1444,7 +1486,8 @@ class GameManagementCog(commands.Cog):
         order_channel_name = player.get_name().lower().replace(" ", "-") + PLAYER_CHANNEL_SUFFIX
         void_channel_name = player.get_name().lower().replace(" ", "-") + "-void"
 
-        has_removed_nickname = board.add_nickname(player, new_name)
+        async with manager.editing(ctx.guild.id):
+            has_removed_nickname = board.add_nickname(player, new_name)
         if has_removed_nickname:
             get_connection().execute_arbitrary_sql(
                 "DELETE FROM board_parameters WHERE board_id = ? AND parameter_key = ?",
@@ -1455,6 +1498,7 @@ class GameManagementCog(commands.Cog):
                 "INSERT OR REPLACE INTO board_parameters (board_id, parameter_key, parameter_value) VALUES (?, ?, ?)",
                 (board.board_id, f"players/{player.name}/nickname", new_name)
             )
+        manager.invalidate_maps(board.board_id)
         message += f"Renamed player {old_name} to {new_name}."
 
         if old_role:
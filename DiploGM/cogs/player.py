@@ -6,13 +6,20 @@ from discord.ext import commands
 
 from DiploGM import config
 from DiploGM import perms
+from DiploGM.adjudicator.utils import MapSize
 from DiploGM.db.database import get_connection
 from DiploGM.parse_order import parse_order, parse_remove_order
 from DiploGM.utils import get_orders, log_command, parse_season, send_message_and_file
+from DiploGM.utils.render_queue import RenderPriority, RenderQueueFull
 from DiploGM.utils.sanitise import remove_prefix
 from DiploGM.manager import Manager, SEVERENCE_A_ID, SEVERENCE_B_ID
 from DiploGM.models.player import ForcedDisbandOption, Player, ViewOrdersTags, OrdersSubsetOption
-from DiploGM.utils.send_message import ErrorMessage, send_error, send_orders_locked_error
+from DiploGM.utils.send_message import (
+    ErrorMessage,
+    send_error,
+    send_orders_locked_error,
+    send_render_queue_full_error,
+)
 
 logger = logging.getLogger(__name__)
 manager = Manager()
@@ -53,7 +60,8 @@ class PlayerCog(commands.Cog):
             await send_orders_locked_error(ctx.channel)
             return
 
-        message = parse_order(ctx.message.content, player, board)
+        async with manager.editing(ctx.guild.id):
+            message = parse_order(ctx.message.content, player, board)
         if "title" in message:
             log_command(logger, ctx, message=message["title"], level=logging.DEBUG)
         elif "message" in message:
@@ -85,7 +93,8 @@ class PlayerCog(commands.Cog):
 
         content = remove_prefix(ctx)
 
-        message = parse_remove_order(content, player, board)
+        async with manager.editing(ctx.guild.id):
+            message = parse_remove_order(content, player, board)
         log_command(logger, ctx, message=message["message"])
         await send_message_and_file(channel=ctx.channel, **message)
 
@@ -117,12 +126,13 @@ class PlayerCog(commands.Cog):
 
         board = manager.get_board(ctx.guild.id)
 
-        if player is None:
-            for unit in board.units:
-                unit.order = None
-        else:
-            for unit in filter(lambda u: u.player == player, board.units):
-                unit.order = None
+        async with manager.editing(ctx.guild.id):
+            if player is None:
+                for unit in board.units:
+                    unit.order = None
+            else:
+                for unit in filter(lambda u: u.player == player, board.units):
+                    unit.order = None
 
         database = get_connection()
         database.save_order_for_units(board, board.units)
@@ -199,6 +209,7 @@ class PlayerCog(commands.Cog):
         color_arguments = list(color_options & set(arguments))
         color_mode = color_arguments[0] if color_arguments else None
         movement_only = "movement" in arguments
+        map_size = MapSize.MEDIUM if "small" in arguments else MapSize.FULL
         turn = parse_season(arguments, board.turn)
 
         if player and show_moves and not board.orders_enabled:
@@ -206,25 +217,41 @@ class PlayerCog(commands.Cog):
             await send_orders_locked_error(ctx.channel)
             return
 
+        # GMs, and commands they schedule, go ahead of ad-hoc player requests
+        priority = RenderPriority.PLAYER if player else RenderPriority.GM
         try:
             if not board.fow:
-                file, file_name = manager.draw_map(
+                draw_board, player_restriction = manager.get_board_for_map(
                     ctx.guild.id,
-                    draw_moves = show_moves,
                     player_restriction = player,
-                    color_mode = color_mode,
                     turn = turn,
-                    movement_only = movement_only and show_moves,
                     is_severance = ctx.guild.id in [SEVERENCE_A_ID, SEVERENCE_B_ID],
                 )
+                file, file_name = await manager.render(
+                    ctx.guild.id,
+                    priority,
+                    manager.draw_map_for_board,
+                    draw_board,
+                    player_restriction = player_restriction,
+                    draw_moves = show_moves,
+                    color_mode = color_mode,
+                    movement_only = movement_only and show_moves,
+                    notify = ctx.channel,
+                )
             elif show_moves:
-                file, file_name = manager.draw_fow_players_moves_map(
-                    ctx.guild.id, player, color_mode
+                file, file_name = await manager.render(
+                    ctx.guild.id, priority, manager.draw_fow_players_moves_map,
+                    ctx.guild.id, player, color_mode, notify=ctx.channel
                 )
             else:
-                file, file_name = manager.draw_fow_current_map(
-                    ctx.guild.id, player, color_mode
+                file, file_name = await manager.render(
+                    ctx.guild.id, priority, manager.draw_fow_current_map,
+                    ctx.guild.id, player, color_mode, notify=ctx.channel
                 )
+        except RenderQueueFull as err:
+            log_command(logger, ctx, message=str(err), level=logging.WARNING)
+            await send_render_queue_full_error(ctx.channel)
+            return
         except Exception as err:
             logger.error(err, exc_info=True)
             log_command(
@@ -253,6 +280,8 @@ class PlayerCog(commands.Cog):
             file=file,
             file_name=file_name,
             convert_svg=convert_svg,
+            map_size=map_size,
+            variant=board.datafile,
             file_in_embed=False,
         )
 
@@ -266,6 +295,7 @@ class PlayerCog(commands.Cog):
         * pass true|t|svg|s to return an svg
         * pass standard, dark, blue, or pink for different color modes if present, or custom for manually configured colours
         * pass season and optionally year for older maps
+        * pass small for a smaller image, e.g. for phones
         """,
         aliases=["viewmap", "vm"],
     )
@@ -281,6 +311,7 @@ class PlayerCog(commands.Cog):
         Arguments: 
         * pass true|t|svg|s to return an svg
         * pass standard, dark, blue, or pink for different color modes if present
+        * pass small for a smaller image, e.g. for phones
         """,
         aliases=["viewcurrent", "vc"],
     )
@@ -308,15 +339,22 @@ class PlayerCog(commands.Cog):
             await send_orders_locked_error(ctx.channel)
             return
 
+        priority = RenderPriority.PLAYER if player else RenderPriority.GM
         try:
             if not board.fow:
-                file, file_name = manager.draw_gui_map(
-                    ctx.guild.id, color_mode=color_mode
+                file, file_name = await manager.render(
+                    ctx.guild.id, priority, manager.draw_gui_map,
+                    ctx.guild.id, color_mode=color_mode, notify=ctx.channel
                 )
             else:
-                file, file_name = manager.draw_fow_gui_map(
-                    ctx.guild.id, player_restriction=player, color_mode=color_mode
+                file, file_name = await manager.render(
+                    ctx.guild.id, priority, manager.draw_fow_gui_map,
+                    ctx.guild.id, player_restriction=player, color_mode=color_mode, notify=ctx.channel
                 )
+        except RenderQueueFull as err:
+            log_command(logger, ctx, message=str(err), level=logging.WARNING)
+            await send_render_queue_full_error(ctx.channel)
+            return
         except Exception as err:
             log_command(
                 logger,
@@ -8,8 +8,10 @@ from discord.ext import commands
 from discord.utils import find as discord_find
 
 from DiploGM import config, perms
+from DiploGM.adjudicator.utils import MapSize
 from DiploGM.utils import send_message_and_file
 from DiploGM.manager import Manager
+from DiploGM.utils.render_queue import RenderPriority, RenderQueueFull
 
 logger = logging.getLogger(__name__)
 manager = Manager()
@@ -170,9 +172,20 @@ class SlashSubstituteCog(commands.Cog):
             f"Don't forget to ping {interaction.user.mention}[{interaction.user.name}] " +
             "so that they know you want to join the game!"
         )
-        file, file_name = manager.draw_map_for_board(
-            board, player_restriction=None, draw_moves=False, color_mode="standard"
-        )
+        try:
+            file, file_name = await manager.render(
+                guild.id,
+                RenderPriority.BACKGROUND,
+                manager.draw_map_for_board,
+                board,
+                player_restriction=None,
+                draw_moves=False,
+                color_mode="standard",
+            )
+        except RenderQueueFull as err:
+            # the advert is still worth posting without its map
+            logger.warning(f"posting substitute advert without a map: {err}")
+            file, file_name = None, None
 
         link = await send_message_and_file(
             channel=locations["advertise_channel"],
@@ -181,6 +194,8 @@ class SlashSubstituteCog(commands.Cog):
             file=file,
             file_name=file_name,
             convert_svg=True,
+            map_size=MapSize.MEDIUM,
+            variant=board.datafile,
         )
         try:
             msg = await locations["advertise_channel"].send(interested_sub_role.mention)
@@ -80,6 +80,23 @@ ERROR_COLOUR = all_config["colours"]["embed_error"]
 # INKSCAPE
 SIMULATRANEOUS_SVG_EXPORT_LIMIT = all_config["inkscape"]["simultaneous_svg_exports_limit"]
 
+# IMAGE
+OVERSIZED_IMAGE_FORMAT: str = all_config["image"]["oversized_format"]
+OVERSIZED_IMAGE_MIN_QUALITY: int = all_config["image"]["oversized_min_quality"]
+
+# MAPPER
+SLIM_SVG: bool = all_config["mapper"]["slim_svg"]
+SLIM_SVG_PRECISION: int = all_config["mapper"]["slim_svg_precision"]
+LIVE_MAPS_PER_SERVER: int = all_config["mapper"]["live_maps_per_server"]
+
+# PROFILER
+PROFILER_ENABLED: bool = all_config["profiler"]["enabled"]
+PROFILER_DUMP_FILE: str = all_config["profiler"]["dump_file"]
+
+# RENDER QUEUE
+RENDER_WORKERS: int = all_config["render_queue"]["workers"]
+RENDER_QUEUE_MAX_DEPTH: int = all_config["render_queue"]["max_depth"]
+
 class ConfigException(Exception):
     pass
 
@@ -80,6 +80,36 @@ class _DatabaseConnection:
         logger.info("Successfully loaded")
         return boards
 
+    def get_phases(self, board_id: int) -> list[str]:
+        """Gets every stored phase of a game, in the order they were played."""
+        cursor = self._connection.cursor()
+        phase_rows = cursor.execute("SELECT phase FROM boards WHERE board_id=?", (board_id,)).fetchall()
+        cursor.close()
+        phases: list[tuple[int, int, str]] = []
+        for (phase_string,) in phase_rows:
+            turn = Turn.turn_from_string(phase_string)
+            if turn is None:
+                logger.warning(f"Could not parse turn string '{phase_string}' for board {board_id}")
+                continue
+            phases.append((turn.year, turn.phase.value, phase_string))
+        return [phase_string for _, _, phase_string in sorted(phases)]
+
+    def get_board_by_phase(self, board_id: int, phase_string: str) -> Board | None:
+        """Gets a board from the database by its stored phase string, as returned by get_phases."""
+        cursor = self._connection.cursor()
+        board_row = cursor.execute(
+            "SELECT data_file, fish, name FROM boards WHERE board_id=? and phase=?",
+            (board_id, phase_string),
+        ).fetchone()
+        turn = Turn.turn_from_string(phase_string)
+        if not board_row or turn is None:
+            cursor.close()
+            return None
+        data_file, fish, name = board_row
+        board = self._get_board(board_id, turn, fish or 0, name, data_file, cursor, year_offset=True)
+        cursor.close()
+        return board
+
     def get_old_board(self, board: Board, turn: Turn) -> Board | None:
         """Finds an older board from that same game"""
         return self.get_board(board.board_id, turn, board.fish, board.name, board.datafile)
@@ -781,3 +811,9 @@ def get_connection() -> _DatabaseConnection:
         return _db_class
     _db_class = _DatabaseConnection()
     return _db_class
+
+
+def open_connection(db_file: str = SQL_FILE_PATH) -> _DatabaseConnection:
+    """Opens a connection of its own rather than the shared one from get_connection,
+    e.g. for batch jobs running in other processes."""
+    return _DatabaseConnection(db_file)
@@ -1,29 +1,41 @@
+import functools
 import logging
+import threading
 import time
 import os
-from itertools import combinations
-from typing import Optional
+from collections import OrderedDict
+from contextlib import AbstractAsyncContextManager
+from typing import Callable, Optional, TypeVar
 
 from discord import Member, User
+from discord.abc import Messageable
 
-from DiploGM.models.province import Province
 from DiploGM.utils import SingletonMeta
 from DiploGM.adjudicator.make_adjudicator import make_adjudicator
 from DiploGM.adjudicator.defs import Resolution
+from DiploGM.adjudicator.utils import evict_rasterized_maps
+from DiploGM.mapper.live import LiveMovesMap
 from DiploGM.mapper.mapper import Mapper
-from DiploGM.map_parser.vector.vector import get_parser
+from DiploGM.mapper.template import clear_map_template
+from DiploGM.map_parser import verify
+from DiploGM.map_parser.vector.vector import Parser, get_parser
 from DiploGM.models.turn import Turn
 from DiploGM.models.board import Board
 from DiploGM.db import database
 from DiploGM.models.player import Player
 from DiploGM.models.spec_request import SpecRequest
+from DiploGM.profiler import current_variant, profiler
+from DiploGM.utils.render_queue import RenderPriority, RenderQueue
 from DiploGM.utils.sanitise import parse_variant_path, simple_player_name
+from DiploGM.config import LIVE_MAPS_PER_SERVER, RENDER_WORKERS, RENDER_QUEUE_MAX_DEPTH
 
 logger = logging.getLogger(__name__)
 
 SEVERENCE_A_ID = 1440703393369821248
 SEVERENCE_B_ID = 1440703645971644648
 
+T = TypeVar("T")
+
 class Manager(metaclass=SingletonMeta):
     """Manager acts as an intermediary between Bot (the Discord API), Board (the board state), the database."""
 
@@ -41,6 +53,10 @@ class Manager(metaclass=SingletonMeta):
         # Ideally we should deepcopy the board, but it requires a custom implementation
         self.last_failed_orders: dict[int, set[str]] = {}
         self.last_dp_orders: dict[int, dict[str, tuple[str, str | None, str | None]]] = {}
+        self.render_queue = RenderQueue(RENDER_WORKERS, RENDER_QUEUE_MAX_DEPTH)
+        # server id -> (player, color mode, movement only) -> moves map kept for the current phase
+        self._live_maps: dict[int, OrderedDict[tuple, LiveMovesMap]] = {}
+        self._live_maps_lock = threading.Lock()
         # TODO: have multiple for each variant?
         # do it like this so that the parser can cache data between board initializations
 
@@ -62,99 +78,14 @@ class Manager(metaclass=SingletonMeta):
 
         return True, f"{self._boards[server_id].data['name']} game created"
 
-    # Gets adjacent provinces, but with High Seas combined into one for the purpose of finding adjacency issues
-    def _get_adjacent_geom(self, province: Province) -> set[Province]:
-        return {a for a in province.adjacency_data.adjacent if a.name[-1] not in "23456789"}
-
-    # A recursive function to find loops of provinces with no internal adjacencies
-    # Generally, two adjacent provinces should share exactly two adjacencies on either side
-    # If there's only one, that typeically means there's a "hole" or the edge of the board
-    # We try to trace a chain of such provinces, and if we reach the start, we have a loop
-    def _find_province_loop(self,
-                            province: Province,
-                            destination: Province,
-                            visited: list[Province],
-                            ignored_provinces: set[Province]) -> Optional[list[Province]]:
-        if province == destination:
-            return None if len(visited) == 2 else visited # A -> B -> A shouldn't count
-        visited.append(province)
-        for adj in self._get_adjacent_geom(province):
-            # ignored_provinces prevents us finding the same loop multiple times
-            if adj in visited[1:] or adj in ignored_provinces:
-                continue
-            if len(self._get_adjacent_geom(province) & self._get_adjacent_geom(adj)) > 1:
-                continue
-            loop = self._find_province_loop(adj, destination, visited, ignored_provinces)
-            if loop is not None:
-                return loop
-        visited.pop()
-        return None
-
-    # This is a function that goes through a map and attempts to find adjacency issues
-    # It will not be fool-proof, but it should detect the majority of potential errors
-    # The list of warnings it generates include the following:
-    # - High Seas provinces in the same region that have different adjacencies
-    #   (e.g. Cape Khoe bordering SAO1 but not SAO2)
-    # - Provinces with zero adjacencies
-    # - Adjacent provinces that have no common adjacencies
-    # - Loops of provinces that have no internal connections (note that this does detect the board edges)
-    # - Groups of four provinces that all border each other
-    # TODO: Potentially simplify this function's complexity
     def verify_adjacencies(self, variant: str) -> str:
         """Checks for potential adjacency issues in a variant.
         This is not guaranteed to find all issues, but should find the majority of them.
-        Returns a string listing any warnings found."""
+        Returns a string listing any warnings found. Safe to call from a worker thread."""
         if not os.path.isdir(parse_variant_path(variant)):
             return f"Game {variant} does not exist."
-        board: Board = get_parser(variant).parse()
-        warnings = []
-        visited_provinces = set()
-
-        # High Seas
-        for province in [p for p in board.provinces if p.name[-1] in "23456789"]:
-            try:
-                comp_province = board.get_province(province.name[:-1] + "1")
-                # Two high seas' adjacencies should differ by only each other
-                if (comp_province.adjacency_data.adjacent ^ province.adjacency_data.adjacent
-                    != {province, comp_province}):
-                    warnings.append(f"Province {province.name} and {comp_province.name} have different adjacencies")
-                visited_provinces.add(province)
-            except ValueError:
-                warnings.append(f"Province {province.name} is named like a high seas province " +
-                                f"but {province.name[:-1]}1 was not found")
-
-        for province in board.provinces - visited_provinces:
-            if len(province.adjacency_data.adjacent) == 0:
-                warnings.append(f"Province {province.name} has no adjacencies")
-            visited_adjacent = set()
-            for adj in self._get_adjacent_geom(province) - visited_provinces:
-                common_adj = self._get_adjacent_geom(province) & self._get_adjacent_geom(adj)
-                if len(common_adj) == 0:
-                    warnings.append(f"Provinces {province.name} and {adj.name} are adjacent " +
-                                    "but have no common adjacencies")
-                    continue
-                # Finding loops of provinces
-                if len(common_adj) == 1:
-                    loop = self._find_province_loop(adj, province, [province], visited_provinces)
-                    # Comparing names of the first and last provinces in the loop so we only report it once
-                    if loop is not None and loop[1].name > loop[-1].name:
-                        warnings.append(f"Found a loop of provinces {', '.join(p.name for p in loop)}. " +
-                                        "If they surround an impassable province or the board edge, this is expected")
-
-                # Searching for groups of four provinces that all share a border
-                for third, fourth in combinations(common_adj - visited_provinces - visited_adjacent, 2):
-                    if fourth not in self._get_adjacent_geom(third):
-                        continue
-                    if min(len(self._get_adjacent_geom(province)),
-                           len(self._get_adjacent_geom(adj)),
-                           len(self._get_adjacent_geom(third)),
-                           len(self._get_adjacent_geom(fourth))) == 3:
-                        # Skips provinces that only border the other three, as that's geometrically possible
-                        continue
-                    warnings.append(f"Provinces {province.name}, {adj.name}, {third.name}, " +
-                                    f"and {fourth.name} all border each other")
-                visited_adjacent.add(adj)
-            visited_provinces.add(province)
+        # This runs off the event loop, so it uses its own parser rather than the shared one
+        warnings = verify.verify_adjacencies(Parser(parse_variant_path(variant, as_filename=False)).parse())
         return "\n".join(warnings) if warnings else "No adjacency issues found"
 
     def get_spec_request(self, server_id: int, user_id: int) -> SpecRequest | None:
@@ -231,6 +162,7 @@ class Manager(metaclass=SingletonMeta):
         """Completely wipes all data for a server."""
         self._database.total_delete(self._boards[server_id])
         del self._boards[server_id]
+        self.invalidate_maps(server_id)
 
     def list_variants(self) -> str:
         """Lists all available variants."""
@@ -269,30 +201,7 @@ class Manager(metaclass=SingletonMeta):
         color_mode: whether to use a special color mode (e.g. dark, pink, etc.)
         turn: whether to draw the map for a previous turn (defaults to current turn)
         movement_only: whether to only draw succcessful moves (used mainly for Carnage)"""
-        cur_board = self.get_board(server_id)
-        if turn is None:
-            board = cur_board
-        else:
-            board = self._database.get_board(
-                cur_board.board_id,
-                turn,
-                cur_board.fish,
-                cur_board.name,
-                cur_board.datafile,
-            )
-            if board is None:
-                raise RuntimeError(
-                    f"There is no {turn} board for this server"
-                )
-            if (
-                board.turn.year < cur_board.turn.year
-                or (board.turn.year == cur_board.turn.year
-                    and board.turn.phase.value < cur_board.turn.phase.value)
-            ):
-                if is_severance:
-                    board = cur_board
-                else:
-                    player_restriction = None
+        board, player_restriction = self.get_board_for_map(server_id, player_restriction, turn, is_severance)
         svg, file_name = self.draw_map_for_board(
             board,
             player_restriction=player_restriction,
@@ -302,6 +211,103 @@ class Manager(metaclass=SingletonMeta):
         )
         return svg, file_name
 
+    def get_live_moves_map(
+        self,
+        server_id: int,
+        board: Board,
+        player_restriction: Player | None = None,
+        color_mode: str | None = None,
+        movement_only: bool = False,
+    ) -> LiveMovesMap:
+        """Gets the kept moves map for the current phase of a server, creating it if the board has changed since."""
+        key = (player_restriction.name if player_restriction else None, color_mode, movement_only)
+        with self._live_maps_lock:
+            live_maps = self._live_maps.setdefault(server_id, OrderedDict())
+            live_map = live_maps.get(key)
+        if live_map is not None and live_map.is_current(board):
+            with self._live_maps_lock:
+                live_maps.move_to_end(key)
+            return live_map
+
+        start = time.time()
+        live_map = LiveMovesMap(board, player_restriction, color_mode, movement_only)
+        with self._live_maps_lock:
+            live_maps = self._live_maps.setdefault(server_id, OrderedDict())
+            # maps made for older boards are never used again
+            for old_key in [k for k, v in live_maps.items() if v.board is not board]:
+                del live_maps[old_key]
+            live_maps[key] = live_map
+            while len(live_maps) > LIVE_MAPS_PER_SERVER:
+                live_maps.popitem(last=False)
+        logger.info(f"manager.get_live_moves_map.{server_id} built in {time.time() - start}s")
+        return live_map
+
+    def invalidate_maps(self, server_id: int) -> None:
+        """Drops the kept moves and rasterized maps for a server, for when the board is changed outside of orders."""
+        with self._live_maps_lock:
+            self._live_maps.pop(server_id, None)
+        evict_rasterized_maps(server_id)
+
+    def get_board_for_map(
+        self,
+        server_id: int,
+        player_restriction: Player | None = None,
+        turn: Turn | None = None,
+        is_severance: bool = False,
+    ) -> tuple[Board, Player | None]:
+        """Gets the board to draw for a server and turn, along with the player restriction to use for it.
+        Restrictions are lifted for previous turns, as their orders are public."""
+        cur_board = self.get_board(server_id)
+        if turn is None:
+            return cur_board, player_restriction
+        board = self._database.get_board(
+            cur_board.board_id,
+            turn,
+            cur_board.fish,
+            cur_board.name,
+            cur_board.datafile,
+        )
+        if board is None:
+            raise RuntimeError(
+                f"There is no {turn} board for this server"
+            )
+        if (
+            board.turn.year < cur_board.turn.year
+            or (board.turn.year == cur_board.turn.year
+                and board.turn.phase.value < cur_board.turn.phase.value)
+        ):
+            if is_severance:
+                board = cur_board
+            else:
+                player_restriction = None
+        return board, player_restriction
+
+    async def render(
+        self,
+        server_id: int,
+        priority: RenderPriority,
+        draw: Callable[..., T],
+        *args,
+        notify: Messageable | None = None,
+        **kwargs,
+    ) -> T:
+        """Runs a draw method through the render queue, off the event loop.
+        The draw method must not touch the database, as the connection can't be shared between threads.
+        It draws the live boards, so commands that change them do so inside editing.
+        notify: channel to tell if the render has to wait in the queue"""
+        board = self._boards.get(server_id)
+        # so the queued job's wait is attributed to the right variant, without leaking into the caller's later records
+        token = current_variant.set(board.datafile if board is not None else None)
+        try:
+            return await self.render_queue.submit(server_id, priority, functools.partial(draw, *args, **kwargs),
+                                                  notify)
+        finally:
+            current_variant.reset(token)
+
+    def editing(self, server_id: int) -> AbstractAsyncContextManager[None]:
+        """Keeps renders off a server's boards while a command changes them, see RenderQueue.editing."""
+        return self.render_queue.editing(server_id)
+
     def draw_map_for_board(
         self,
         board: Board,
@@ -313,7 +319,11 @@ class Manager(metaclass=SingletonMeta):
         """Gets the current map for a board."""
         start = time.time()
 
-        if draw_moves:
+        if draw_moves and board is self._boards.get(board.board_id) and not board.turn.is_builds():
+            # orders on the current phase keep changing, so keep the map around and only redraw what changed
+            live_map = self.get_live_moves_map(board.board_id, board, player_restriction, color_mode, movement_only)
+            svg, file_name = live_map.draw()
+        elif draw_moves:
             svg, file_name = Mapper(board, color_mode=color_mode).draw_moves_map(
                 board.turn,
                 player_restriction=player_restriction,
@@ -323,6 +333,7 @@ class Manager(metaclass=SingletonMeta):
             svg, file_name = Mapper(board, color_mode=color_mode).draw_current_map()
 
         elapsed = time.time() - start
+        profiler.record("mapper.total", elapsed, board.datafile)
         logger.info(f"manager.draw_map_for_board took {elapsed}s")
         return svg, file_name
 
@@ -350,6 +361,7 @@ class Manager(metaclass=SingletonMeta):
         if not test:
             self._boards[new_board.board_id] = new_board
             self._database.save_board(new_board.board_id, new_board)
+            self.invalidate_maps(new_board.board_id)
 
         elapsed = time.time() - start
         logger.info(f"manager.adjudicate.{server_id}.{elapsed}s")
@@ -411,6 +423,25 @@ class Manager(metaclass=SingletonMeta):
         logger.info(f"manager.draw_fow_moves_map.{server_id}.{elapsed}s")
         return svg, file_name
 
+    def draw_fow_view_maps(
+        self, server_id: int, players: list[Player], draw_moves: bool = False
+    ) -> list[tuple[bytes, str]]:
+        """Draws the fog of war map, or moves map, once for players who can all see the same provinces,
+        and exports it once for each of them with their own side panel."""
+        start = time.time()
+
+        board = self._boards[server_id]
+        mapper = Mapper(board, players[0])
+        if draw_moves:
+            svg, file_name = mapper.draw_moves_svg(board.turn, None)
+        else:
+            svg, file_name = mapper.draw_current_svg()
+        maps = [(exported, file_name) for exported in mapper.export_for_players(svg, players)]
+
+        elapsed = time.time() - start
+        logger.info(f"manager.draw_fow_view_maps.{server_id}.{len(players)}.{elapsed}s")
+        return maps
+
     def draw_fow_gui_map(
         self,
         server_id: int,
@@ -426,7 +457,7 @@ class Manager(metaclass=SingletonMeta):
         ).draw_gui_map(self._boards[server_id].turn, None)
 
         elapsed = time.time() - start
-        logger.info(f"manager.draw_fow_moves_map.{server_id}.{elapsed}s")
+        logger.info(f"manager.draw_fow_gui_map.{server_id}.{elapsed}s")
         return svg, file_name
 
     def draw_gui_map(
@@ -443,11 +474,11 @@ class Manager(metaclass=SingletonMeta):
         ).draw_gui_map(self._boards[server_id].turn, player_restriction)
 
         elapsed = time.time() - start
-        logger.info(f"manager.draw_moves_map.{server_id}.{elapsed}s")
+        logger.info(f"manager.draw_gui_map.{server_id}.{elapsed}s")
         return svg, file_name
 
-    def rollback(self, server_id: int) -> tuple[str, bytes, str]:
-        """Rolls back the board to the previous turn."""
+    def rollback(self, server_id: int) -> tuple[str, Board]:
+        """Rolls back the board to the previous turn, returning the board to draw."""
         logger.info(f"Rolling back in server {server_id}")
         board = self.get_board(server_id)
         last_turn = board.turn.get_previous_turn()
@@ -467,11 +498,10 @@ class Manager(metaclass=SingletonMeta):
 
         self._database.delete_board(board)
         self._boards[old_board.board_id] = old_board
-        mapper = Mapper(old_board)
+        self.invalidate_maps(old_board.board_id)
 
         message = f"Rolled back to {old_board.turn.get_indexed_name()}"
-        file, file_name = mapper.draw_current_map()
-        return message, file, file_name
+        return message, old_board
 
     def get_previous_board(self, server_id: int) -> Board | None:
         """Gets the previous board for a server. Returns None if it doesn't exist."""
@@ -486,8 +516,8 @@ class Manager(metaclass=SingletonMeta):
         )
         return old_board
 
-    def reload(self, server_id: int) -> tuple[str, bytes, str]:
-        """Reloads the board for a server."""
+    def reload(self, server_id: int) -> tuple[str, Board]:
+        """Reloads the board for a server, returning the board to draw."""
         logger.info(f"Reloading server {server_id}")
         board = self.get_board(server_id)
 
@@ -500,33 +530,44 @@ class Manager(metaclass=SingletonMeta):
             )
 
         self._boards[board.board_id] = loaded_board
-        mapper = Mapper(loaded_board)
+        self.invalidate_maps(board.board_id)
 
         message = f"Reloaded board for phase {loaded_board.turn.get_indexed_name()}"
-        file, file_name = mapper.draw_current_map()
-        return message, file, file_name
+        return message, loaded_board
 
-    def reload_variant(self, variant: str) -> str:
-        """Reloads a variant, including adjacencies and all boards."""
+    async def reload_variant(self, variant: str) -> str:
+        """Reloads a variant, including adjacencies and all boards.
+        Boards are updated in place with the new map data where possible, and otherwise reloaded from the database."""
         if not os.path.isdir(parse_variant_path(variant)):
             return f"Variant {variant} does not exist."
-
-        # Remove adjacency cache to force a reload
-        if os.path.isfile(f"assets/{variant}_adjacencies.txt"):
-            os.remove(f"assets/{variant}_adjacencies.txt")
-
-        get_parser(variant, force_refresh=True).parse()
-        for server_id, board in self._boards.items():
-            if board.datafile == variant:
-                logger.info(f"Reloading board for server {server_id}")
-                loaded_board = self._database.get_board(
-                    server_id, board.turn, board.fish, board.name, board.datafile
-                )
-                if loaded_board is None:
-                    logger.warning(f"There is no {board.turn} board for this server")
-                    continue
-                self._boards[board.board_id] = loaded_board
-        return f"Reloaded variant {variant}"
+        variant = parse_variant_path(variant, as_filename=False)
+
+        # province shapes and adjacencies are reused if the SVG hasn't changed,
+        # and the adjacency cache rebuilds itself if it has
+        variant_board = get_parser(variant, force_refresh=True).parse()
+        clear_map_template(variant)
+        rebound = reloaded = 0
+        for server_id, board in list(self._boards.items()):
+            if board.datafile != variant:
+                continue
+            async with self.editing(server_id):
+                self.invalidate_maps(server_id)
+                rebound_in_place = board.rebind_variant(variant_board)
+                if rebound_in_place:
+                    board.run_variant_scripts()
+            if rebound_in_place:
+                rebound += 1
+                continue
+            logger.info(f"Reloading board for server {server_id}")
+            loaded_board = self._database.get_board(
+                server_id, board.turn, board.fish, board.name, board.datafile
+            )
+            if loaded_board is None:
+                logger.warning(f"There is no {board.turn} board for this server")
+                continue
+            self._boards[board.board_id] = loaded_board
+            reloaded += 1
+        return f"Reloaded variant {variant}: {rebound} boards updated in place, {reloaded} reloaded from the database"
 
     def get_member_player_object(self, member: Member | User) -> Player | None:
         """Gets the player object associated with a Discord member, if it exists."""
@@ -4,10 +4,13 @@ ARMIES_IMAGE = "assets/armies.png"
 FLEETS_IMAGE = "assets/fleets.png"
 
 BORDER_COLOR = [0, 0, 0, 255]
+# How far, in pixels, provinces are grown into the borders around them to find which provinces meet
+BORDER_EXPANSION = 6
 
 # Include oceans, impassables, neutrals, and all players
 PROVINCE_COLOR_TYPE_MAP = {
     (0, 38, 255): "ocean",
+    (128, 128, 128): "impassable",
     (0, 255, 33): "green",
     (255, 0, 0): "red",
 }
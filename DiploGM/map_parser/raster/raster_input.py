@@ -1,46 +1,136 @@
+import logging
+from dataclasses import dataclass, field
+
 import numpy as np
+import shapely
 from PIL import Image
 from scipy import ndimage
-from skimage.segmentation import expand_labels, find_boundaries
 
 from DiploGM.map_parser.raster.config import *
+from DiploGM.models.province import Province, ProvinceType
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class RasterMap:
+    """Provinces and adjacencies in the same form as Parser.read_map, with the owners and units found on the map."""
+    provinces: set[Province]
+    adjacencies: set[tuple[str, str]]
+    province_owners: dict[str, str] = field(default_factory=dict)
+    armies: dict[str, dict] = field(default_factory=dict)
+    fleets: dict[str, dict] = field(default_factory=dict)
 
 
-def read_map_data():
+def read_map_data() -> RasterMap:
     provinces_image = np.asarray(Image.open(PROVINCES_IMAGE).convert("RGBA"))
     centers_image = np.asarray(Image.open(CENTERS_IMAGE).convert("RGBA"))
     armies_image = np.asarray(Image.open(ARMIES_IMAGE).convert("RGBA"))
     fleets_image = np.asarray(Image.open(FLEETS_IMAGE).convert("RGBA"))
 
     province_id_map, num_provinces = ndimage.label((provinces_image != BORDER_COLOR).any(-1), structure=np.ones((3, 3)))
-    province_id_map_expanded = expand_labels(province_id_map, distance=6)
+    province_id_map_expanded = expand_labels(province_id_map, distance=BORDER_EXPANSION)
 
-    adjacencies = get_adjacencies(province_id_map_expanded, num_provinces)
+    adjacencies = get_adjacencies(province_id_map_expanded)
     province_owners = get_province_owners(provinces_image, province_id_map, num_provinces)
     centers = get_centers(province_id_map, centers_image)
     armies = get_units(province_id_map, armies_image)
     fleets = get_units(province_id_map, fleets_image)
 
-
-def get_adjacencies(province_id_map_expanded, num_provinces):
-    adjacencies = {}
-
-    for province_id in range(1, num_provinces + 1):
-        boundaries = find_boundaries(province_id_map_expanded == province_id, mode="outer")
-        adjacencies[province_id] = np.setdiff1d(np.unique(province_id_map_expanded * boundaries), [0])
-
-    return adjacencies
+    provinces = set()
+    for province_id, geometry in get_province_geometries(province_id_map).items():
+        owner = province_owners[province_id]
+        province = Province(str(province_id), geometry, ProvinceType.SEA if owner == "ocean" else ProvinceType.LAND)
+        # like the vector parser, impassable provinces are land that nothing can enter
+        province.is_impassable = owner == "impassable"
+        province.has_supply_center = province_id in centers
+        provinces.add(province)
+
+    return RasterMap(
+        provinces,
+        {(str(first), str(second)) for first, second in adjacencies},
+        {str(province_id): owner for province_id, owner in province_owners.items()},
+        {str(province_id): unit for province_id, unit in armies.items()},
+        {str(province_id): unit for province_id, unit in fleets.items()},
+    )
+
+
+# Grows each province into the unlabelled pixels within distance of it, so that provinces either side of a border meet
+def expand_labels(label_map: np.ndarray, distance: float) -> np.ndarray:
+    distances, (rows, columns) = ndimage.distance_transform_edt(label_map == 0, return_indices=True)
+    expanded = label_map[rows, columns]
+    expanded[distances > distance] = 0
+    return expanded
+
+
+# Traces each province's pixels, in (column, row) coordinates, by joining up the runs of it in each row
+def get_province_geometries(province_id_map: np.ndarray) -> dict[int, shapely.Polygon | shapely.MultiPolygon]:
+    height, width = province_id_map.shape
+    padded = np.pad(province_id_map, ((0, 0), (1, 1)))
+    # every column where a new run starts, with the end of each row closing its last run
+    rows, starts = np.nonzero(padded[:, 1:] != padded[:, :-1])
+    same_row = rows[:-1] == rows[1:]
+    rows, ends, starts = rows[:-1][same_row], starts[1:][same_row], starts[:-1][same_row]
+    labels = province_id_map[rows, np.minimum(starts, width - 1)]
+    is_province = (labels != 0) & (starts < width)
+    rows, starts, ends, labels = rows[is_province], starts[is_province], ends[is_province], labels[is_province]
+
+    runs = shapely.box(starts, rows, ends, rows + 1)
+    order = np.argsort(labels, kind="stable")
+    province_ids, first_runs = np.unique(labels[order], return_index=True)
+    # simplifying with no tolerance only drops the points where runs of different rows met along a straight edge
+    return {province_id: shapely.simplify(shapely.union_all(province_runs), 0)
+            for province_id, province_runs in zip(province_ids.tolist(), np.split(runs[order], first_runs[1:]))}
+
+
+# Two provinces are adjacent if any of their pixels touch horizontally or vertically
+def get_adjacencies(province_id_map_expanded: np.ndarray) -> set[tuple[int, int]]:
+    pairs = np.concatenate((
+        np.stack((province_id_map_expanded[:, :-1].ravel(), province_id_map_expanded[:, 1:].ravel()), axis=1),
+        np.stack((province_id_map_expanded[:-1, :].ravel(), province_id_map_expanded[1:, :].ravel()), axis=1),
+    ))
+    pairs = pairs[(pairs[:, 0] != pairs[:, 1]) & (pairs != 0).all(axis=1)]
+    pairs.sort(axis=1)
+    return {(first, second) for first, second in np.unique(pairs, axis=0).tolist()}
+
+
+# Packs RGBA pixels into single integers that sort the same way as the colors
+def _pack_colors(image: np.ndarray) -> np.ndarray:
+    image = image.astype(np.uint32)
+    return (image[..., 0] << 24) | (image[..., 1] << 16) | (image[..., 2] << 8) | image[..., 3]
+
+
+def _unpack_color(color: int) -> tuple[int, int, int]:
+    return (color >> 24) & 0xFF, (color >> 16) & 0xFF, (color >> 8) & 0xFF
+
+
+# Finds the most common value under each label, and how many distinct values there are, in a single pass
+def _get_label_modes(label_map: np.ndarray, values: np.ndarray) -> dict[int, tuple[int, int]]:
+    mask = label_map != 0
+    pairs = (label_map[mask].astype(np.uint64) << np.uint64(32)) | values[mask].astype(np.uint64)
+    unique, counts = np.unique(pairs, return_counts=True)
+    labels, label_values = unique >> np.uint64(32), unique & np.uint64(0xFFFFFFFF)
+    # for each label, the highest count first, with ties going to the lowest value like np.argmax would
+    order = np.lexsort((-counts, labels))
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = labels[order][1:] != labels[order][:-1]
+    distinct = np.bincount(np.searchsorted(labels[order][first], labels))
+    return {label: (value, count)
+            for label, value, count in zip(labels[order][first].tolist(),
+                                           label_values[order][first].tolist(),
+                                           distinct.tolist())}
 
 
 def get_province_owners(provinces, province_id_map, num_provinces):
     province_owners = {}
 
+    modes = _get_label_modes(province_id_map, _pack_colors(provinces))
     for province_id in range(1, num_provinces + 1):
-        colors, frequency = np.unique(provinces[province_id_map == province_id], return_counts=True, axis=0)
-        if len(colors) != 1:
-            print(f"Province #{province_id} is not one solid color: {colors} with frequency: {frequency}.")
+        top_color, num_colors = modes[province_id]
+        if num_colors != 1:
+            logger.warning(f"Province #{province_id} is not one solid color: it has {num_colors} colors.")
 
-        top_color = tuple(colors[np.argmax(frequency)][:3])
+        top_color = _unpack_color(top_color)
         assert (
             top_color in PROVINCE_COLOR_TYPE_MAP
         ), f"{top_color} is not in the color to province type dictionary (province #{province_id})."
@@ -51,7 +141,7 @@ def get_province_owners(provinces, province_id_map, num_provinces):
 
 # If a center overlaps multiple provinces all provinces will be considered a center
 def get_centers(province_id_map, centers_image):
-    return set(np.setdiff1d(np.unique(province_id_map * (centers_image[:, :, 3] != 0)), [0]))
+    return set(np.setdiff1d(np.unique(province_id_map[centers_image[:, :, 3] != 0]), [0]).tolist())
 
 
 # Requires separate calls per unit type (armies, fleets)
@@ -60,19 +150,29 @@ def get_units(province_id_map, units_image):
     units = {}
 
     unit_id_map, num_units = ndimage.label((units_image[:, :, 3] != 0), structure=np.ones((3, 3)))
-    for unit_id in range(1, num_units + 1):
-        province_ids, frequency = np.unique(province_id_map[unit_id_map == unit_id], return_counts=True)
-        province_id = province_ids[frequency.argmax()]
-
-        unit_colors = np.unique(units_image[unit_id_map == unit_id], axis=0)
-        unit_player = None
-        for color in unit_colors:
-            color = tuple(color[:3])
-            if color in UNIT_COLOR_TYPE_MAP:
-                unit_player = UNIT_COLOR_TYPE_MAP[color]
-                break
-        assert unit_player is not None, f"Could not find player for unit {unit_id} with colors {unit_colors}"
-        units[province_id] = {"unit_number": unit_id, "player": unit_player}
+    if num_units == 0:
+        return units
+    # only the parts of units over a province count towards where they are
+    positions = _get_label_modes(np.where(province_id_map != 0, unit_id_map, 0), province_id_map)
+
+    # each unit's player comes from the first of its colors, in sorted order, that belongs to a player
+    colors = _pack_colors(units_image)
+    player_colors = np.array(sorted((r << 24) | (g << 16) | (b << 8) for r, g, b in UNIT_COLOR_TYPE_MAP),
+                             dtype=np.uint32)
+    is_player_color = np.isin(colors & np.uint32(0xFFFFFF00), player_colors)
+    unit_ids = np.arange(1, num_units + 1)
+    unit_colors = ndimage.minimum(np.where(is_player_color, colors, np.iinfo(np.uint32).max).astype(np.float64),
+                                  unit_id_map, unit_ids)
+    has_player = ndimage.maximum(is_player_color, unit_id_map, unit_ids)
+
+    for unit_id, color, found in zip(unit_ids.tolist(), np.atleast_1d(unit_colors).tolist(),
+                                     np.atleast_1d(has_player).tolist()):
+        assert found, f"Could not find player for unit {unit_id}"
+        if unit_id not in positions:
+            logger.warning(f"Unit {unit_id} isn't over any province, ignoring it")
+            continue
+        province_id, _ = positions[unit_id]
+        units[province_id] = {"unit_number": unit_id, "player": UNIT_COLOR_TYPE_MAP[_unpack_color(int(color))]}
 
     return units
 
@@ -0,0 +1,130 @@
+"""Validates every variant under variants/ and builds their caches, for use before a deploy.
+
+Usage: python -m DiploGM.map_parser.validate [-j JOBS] [-o REPORT] [--strict] [variant ...]
+Each variant is parsed in its own process: its SVG is checked with Parser.verify_svg, its board is parsed
+(which builds the adjacency cache) and its adjacencies are linted with verify_adjacencies.
+A JSON report with per-variant timings is written to stdout, or to REPORT.
+Exits with 1 if any variant fails to parse or has SVG errors, or with --strict, has adjacency warnings."""
+from __future__ import annotations
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any
+
+from DiploGM.map_parser.verify import verify_adjacencies
+from DiploGM.map_parser.vector.vector import Parser
+
+logger = logging.getLogger(__name__)
+
+
+class _RecordCollector(logging.Handler):
+    """Keeps the messages of every record logged while it's attached."""
+    def __init__(self, level: int):
+        super().__init__(level)
+        self.messages: list[str] = []
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self.messages.append(record.getMessage())
+
+
+def find_variants(directory: str = "variants") -> list[str]:
+    """Gets the name of every variant and variant version with a config.json under directory."""
+    return sorted(os.path.basename(os.path.dirname(path))
+                  for path in glob.glob(os.path.join(directory, "**", "config.json"), recursive=True))
+
+
+def validate_variant(variant: str) -> dict[str, Any]:
+    """Parses and checks a single variant, returning its entry in the report. Never raises."""
+    result: dict[str, Any] = {"variant": variant, "ok": False, "svg_valid": None, "svg_errors": [],
+                              "adjacency_warnings": [], "provinces": None, "error": None, "timings": {}}
+    timings = result["timings"]
+    start = stage_start = time.perf_counter()
+
+    def end_stage(name: str) -> None:
+        nonlocal stage_start
+        now = time.perf_counter()
+        timings[name] = round(now - stage_start, 4)
+        stage_start = now
+
+    collector = _RecordCollector(logging.ERROR)
+    try:
+        parser = Parser(variant)
+        end_stage("load")
+
+        logging.getLogger().addHandler(collector)
+        try:
+            result["svg_valid"] = parser.verify_svg()
+        finally:
+            logging.getLogger().removeHandler(collector)
+        result["svg_errors"] = collector.messages
+        end_stage("verify_svg")
+
+        board = parser.parse()
+        result["provinces"] = len(board.provinces)
+        end_stage("parse")
+
+        result["adjacency_warnings"] = verify_adjacencies(board)
+        end_stage("verify_adjacencies")
+        result["ok"] = result["svg_valid"]
+    except Exception as err:  # pylint: disable=broad-exception-caught
+        result["error"] = f"{type(err).__name__}: {err}"
+    timings["total"] = round(time.perf_counter() - start, 4)
+    return result
+
+
+def validate_variants(variants: list[str], jobs: int | None = None) -> list[dict[str, Any]]:
+    """Validates variants in a pool of processes, returning their report entries in the order given."""
+    results: dict[str, dict[str, Any]] = {}
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        futures = {executor.submit(validate_variant, variant): variant for variant in variants}
+        for future in as_completed(futures):
+            variant = futures[future]
+            try:
+                result = future.result()
+            except Exception as err:  # pylint: disable=broad-exception-caught
+                # the worker itself died, e.g. it ran out of memory
+                result = {"variant": variant, "ok": False, "error": f"{type(err).__name__}: {err}", "timings": {}}
+            results[variant] = result
+            status = "ok" if result["ok"] else f"FAILED ({result['error'] or 'SVG errors'})"
+            logger.info(f"{variant}: {status} in {result['timings'].get('total', 0):.2f}s")
+    return [results[variant] for variant in variants]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Validates variants and builds their caches.")
+    parser.add_argument("variants", nargs="*", help="variants to validate, defaults to every variant under variants/")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="number of processes, defaults to one per CPU")
+    parser.add_argument("-o", "--output", help="file to write the JSON report to, defaults to stdout")
+    parser.add_argument("--strict", action="store_true", help="also fail on adjacency warnings")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s:%(levelname)s | %(message)s", stream=sys.stderr)
+    start = time.perf_counter()
+    results = validate_variants(args.variants or find_variants(), args.jobs)
+    failed = [result["variant"] for result in results
+              if not result["ok"] or (args.strict and result.get("adjacency_warnings"))]
+    report = {
+        "ok": not failed,
+        "failed": failed,
+        "wall_time": round(time.perf_counter() - start, 4),
+        "variants": results,
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    logger.info(f"{len(results) - len(failed)}/{len(results)} variants passed in {report['wall_time']:.2f}s")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Cache of the adjacencies found from each variant's geometry, see Parser._get_adjacencies.
+
+A cache is only used if it was built from the same SVG (by content hash), parser version and border_margin_hint,
+so it never has to be deleted by hand when a variant changes; a stale cache is simply rebuilt.
+
+Usage: python -m DiploGM.map_parser.vector.adjacency_cache [variant ...]
+prebuilds the caches for the given variants, or every variant under variants/, so the bot doesn't build them
+on the first command after a deploy."""
+from __future__ import annotations
+import argparse
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import time
+from dataclasses import asdict, dataclass
+
+import numpy as np
+
+from DiploGM.utils.sanitise import parse_variant_path
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIRECTORY = "assets"
+MAGIC = b"DGMADJ"
+FORMAT_VERSION = 1
+# magic, format version, header length, number of pairs
+_PREFIX = struct.Struct(f"<{len(MAGIC)}sHII")
+
+
+@dataclass(frozen=True)
+class AdjacencyCacheKey:
+    """Everything the adjacencies of a variant depend on."""
+    svg_hash: str
+    parser_version: int
+    border_margin_hint: float
+
+
+def hash_file(path: str) -> str:
+    """Gets the SHA-256 of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(2**20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def get_cache_path(datafile: str, directory: str = CACHE_DIRECTORY) -> str:
+    return os.path.join(directory, f"{datafile}_adjacencies.bin")
+
+
+def load_adjacencies(datafile: str,
+                     key: AdjacencyCacheKey,
+                     directory: str = CACHE_DIRECTORY) -> set[tuple[str, str]] | None:
+    """Loads the cached adjacencies for a variant, or None if there is no cache or it was built from something else."""
+    path = get_cache_path(datafile, directory)
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        magic, version, header_length, pair_count = _PREFIX.unpack_from(data)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"unknown format {magic!r} version {version}")
+        header_end = _PREFIX.size + header_length
+        header = json.loads(data[_PREFIX.size:header_end])
+        pairs = np.frombuffer(data, dtype="<u4", count=pair_count * 2, offset=header_end).reshape(-1, 2)
+        cached_key, names = header["key"], header["provinces"]
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError, KeyError, struct.error) as err:
+        logger.warning(f"{datafile}: ignoring unreadable adjacency cache {path}: {err}")
+        return None
+
+    if cached_key != asdict(key):
+        logger.info(f"{datafile}: adjacency cache is out of date, rebuilding")
+        return None
+    return {(names[first], names[second]) for first, second in pairs.tolist()}
+
+
+def save_adjacencies(datafile: str,
+                     key: AdjacencyCacheKey,
+                     adjacencies: set[tuple[str, str]],
+                     directory: str = CACHE_DIRECTORY) -> None:
+    """Writes the adjacencies for a variant, replacing the old cache atomically so readers never see half a file."""
+    names = sorted({name for pair in adjacencies for name in pair})
+    index = {name: i for i, name in enumerate(names)}
+    pairs = np.array([(index[first], index[second]) for first, second in sorted(adjacencies)], dtype="<u4")
+    header = json.dumps({"key": asdict(key), "provinces": names}, separators=(",", ":")).encode()
+    data = _PREFIX.pack(MAGIC, FORMAT_VERSION, len(header), len(pairs)) + header + pairs.tobytes()
+
+    path = get_cache_path(datafile, directory)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{datafile}_adjacencies.")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.remove(temp_path)
+            raise
+    except OSError as err:
+        logger.warning(f"{datafile}: couldn't write adjacency cache {path}: {err}")
+
+
+def get_variant_names() -> list[str]:
+    """Gets the latest version of every variant under variants/."""
+    variants = []
+    for variant in sorted(os.listdir("variants")):
+        if not os.path.isdir(os.path.join("variants", variant)):
+            continue
+        try:
+            variants.append(parse_variant_path(variant, as_filename=False))
+        except ValueError:
+            continue
+    return variants
+
+
+def main() -> None:
+    # imported here, as the parser imports this module
+    from DiploGM.map_parser.vector.vector import Parser  # pylint: disable=import-outside-toplevel
+    parser = argparse.ArgumentParser(description="Builds the adjacency caches of variants that are missing or stale.")
+    parser.add_argument("variants", nargs="*", help="variants to build, defaults to every variant under variants/")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s:%(levelname)s | %(message)s")
+    failed = 0
+    for variant in args.variants or get_variant_names():
+        start = time.time()
+        try:
+            Parser(variant).read_map()
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            failed += 1
+            logger.error(f"{variant}: couldn't build adjacency cache: {err}")
+            continue
+        logger.info(f"{variant}: adjacency cache ready in {time.time() - start:.2f}s")
+    if failed:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
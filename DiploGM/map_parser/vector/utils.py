@@ -3,7 +3,7 @@ import re
 import numpy as np
 from typing import Callable
 
-from shapely.geometry import Point
+import shapely
 from xml.etree.ElementTree import Element, ElementTree
 
 from DiploGM.map_parser.vector.transform import TransGL3
@@ -85,8 +85,7 @@ def get_unit_coordinates(
         path = unit_data.findall("{http://www.w3.org/2000/svg}path")[0]
         pathstr = path.get("d")
         assert pathstr is not None
-        coordinates = parse_path(pathstr, TransGL3(path))
-        coordinates = np.array(sum(coordinates, start = []))
+        coordinates = np.concatenate(parse_path(pathstr, TransGL3(path)))
         minp = np.min(coordinates, axis=0)
         maxp = np.max(coordinates, axis=0)
         return ((minp + maxp) / 2).tolist()
@@ -96,100 +95,69 @@ def get_unit_coordinates(
     return TransGL3(path).transform((x, y))
 
 
-def move_coordinate(
-    former_coordinate: tuple[float, float],
-    coordinate: tuple[float, float],
-) -> tuple[float, float]:
-    """Moves a coordinate by a given offset."""
-    return (former_coordinate[0] + coordinate[0], former_coordinate[1] + coordinate[1])
-
+# numbers (including exponents) and single letter commands; commas and whitespace are skipped,
+# so glued tokens like "m20,70" and "10-20" are split
+PATH_TOKEN_PATTERN = re.compile(r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|[A-Za-z]")
+ARGUMENTS_BY_COMMAND = {"a": 7, "c": 6, "h": 1, "l": 2, "m": 2, "q": 4, "s": 4, "t": 2, "v": 1}
 
 
-# returns:
-# new base_coordinate (= base_coordinate if not applicable),
-# new former_coordinate (= former_coordinate if not applicable),
-def _parse_path_command(
-    command: str,
-    args: tuple[float, float],
-    coordinate: tuple[float, float],
-) -> tuple[float, float]:
-    is_absolute = command.isupper()
-    command = command.lower()
-
-    if command in ["m", "c", "l", "t", "s", "q", "a"]:
-        return args if is_absolute else move_coordinate(coordinate, args)  # Ignore all args except the last
-    if command in ["h", "v"]:
-        coordlist = list(coordinate)
-        index = 0 if command == "h" else 1
-        if is_absolute:
-            coordlist[index] = 0
-        coordlist[index] += args[0]
-        return (coordlist[0], coordlist[1])
-    raise RuntimeError(f"Unknown SVG path command: {command}")
-
-def parse_path(path_string: str, translation: TransGL3) -> list[list[tuple[float, float]]]:
-    """Parses an SVG path string into a list of coordinates."""
-    province_coordinates = [[]]
+def parse_path(path_string: str, translation: TransGL3) -> list[np.ndarray]:
+    """Parses an SVG path string into an (n, 2) array of coordinates per subpath.
+    Only the end point of each command is kept, and the translation is applied to each subpath at once."""
+    tokens = PATH_TOKEN_PATTERN.findall(path_string)
+    subpaths: list[list[tuple[float, float]]] = [[]]
     command = None
-    arguments_by_command = {"a": 7, "c": 6, "h": 1, "l": 2, "m": 2, "q": 4, "s": 4, "t": 2, "v": 1}
     expected_arguments = 0
     current_index = 0
-    path: list[str] = re.split(r"[ ,]+", path_string.strip())
 
     start = None
-    coordinate = (0, 0)
-    while current_index < len(path):
-        if path[current_index][0].isalpha():
-            if len(path[current_index]) != 1:
-                # m20,70 is valid syntax, so move the 20,70 to the next element
-                path.insert(current_index + 1, path[current_index][1:])
-                path[current_index] = path[current_index][0]
-
-            command = path[current_index]
-            if command.lower() == "z":
+    x, y = 0.0, 0.0
+    while current_index < len(tokens):
+        if tokens[current_index].isalpha():
+            command = tokens[current_index]
+            if command in "zZ":
                 if start is None:
                     raise Exception("Invalid geometry: got 'z' on first element in a subgeometry")
-                province_coordinates[-1].append(translation.transform(start))
+                subpaths[-1].append(start)
                 start = None
                 current_index += 1
-                if current_index < len(path):
+                if current_index < len(tokens):
                     # If we are closing, and there is more, there must be a second polygon (Chukchi Sea)
-                    province_coordinates += [[]]
+                    subpaths.append([])
                     continue
-                else:
-                    break
+                break
 
-            elif command.lower() in arguments_by_command:
-                expected_arguments = arguments_by_command[command.lower()]
-            else:
+            if command.lower() not in ARGUMENTS_BY_COMMAND:
                 raise RuntimeError(f"Unknown SVG path command {command}")
-
+            expected_arguments = ARGUMENTS_BY_COMMAND[command.lower()]
             current_index += 1
 
         if command is None:
             raise RuntimeError("Path string does not start with a command")
-        if command.lower() == "z":
+        if command in "zZ":
             raise Exception("Invalid path, 'z' was followed by arguments")
 
         final_index = current_index + expected_arguments
-        if len(path) < final_index:
+        if len(tokens) < final_index:
             raise RuntimeError(f"Ran out of arguments for {command}")
 
-        if expected_arguments == 1:
-            args = (float(path[current_index]), 0.0)
+        # only the end point of each command matters, so curve control points and arc parameters are skipped
+        is_absolute = command.isupper()
+        if command in "hH":
+            x = (0 if is_absolute else x) + float(tokens[current_index])
+        elif command in "vV":
+            y = (0 if is_absolute else y) + float(tokens[current_index])
+        elif is_absolute:
+            x, y = float(tokens[final_index - 2]), float(tokens[final_index - 1])
         else:
-            args = (float(path[final_index - 2]), float(path[final_index - 1]))
-
-        coordinate = _parse_path_command(
-            command, args, coordinate
-        )
+            x, y = x + float(tokens[final_index - 2]), y + float(tokens[final_index - 1])
 
         if start is None:
-            start = coordinate
-
-        province_coordinates[-1].append(translation.transform(coordinate))
+            start = (x, y)
+        subpaths[-1].append((x, y))
         current_index = final_index
-    return province_coordinates
+
+    return [translation.transform_array(np.array(subpath, dtype=float).reshape(-1, 2)) for subpath in subpaths]
 
 # Initializes relevant province data
 # resident_dataset: SVG element whose children each live in some province
@@ -201,27 +169,35 @@ def initialize_province_resident_data(
     resident_dataset: Element | list[Element],
     get_coordinates: Callable[[Element], tuple[float | None, float | None]],
     resident_data_callback: Callable[[Province, Element, str | None], None],
+    description: str = "elements",
 ) -> None:
-    resident_dataset = list(resident_dataset)
-    for province in provinces:
-        remove = set()
-
-        # found = False
-        for resident_data in resident_dataset:
-            x, y = get_coordinates(resident_data)
-
-            if not x or not y:
-                remove.add(resident_data)
-                continue
-
-            point = Point((x, y))
-            if province.geometry.contains(point):
-                # found = True
-                resident_data_callback(province, resident_data, None)
-                remove.add(resident_data)
-
-        # if not found:
-        #     print("Not found!")
-
-        for resident_data in remove:
-            resident_dataset.remove(resident_data)
+    """Calls resident_data_callback for each element with the province containing its coordinates.
+    Elements are matched in one spatial index query; if several provinces contain an element, the first one is used.
+    Elements that aren't in any province are logged together."""
+    provinces = list(provinces)
+    elements: list[Element] = []
+    points: list[tuple[float, float]] = []
+    no_coordinates = 0
+    for resident_data in resident_dataset:
+        x, y = get_coordinates(resident_data)
+        if not x or not y:
+            no_coordinates += 1
+            continue
+        elements.append(resident_data)
+        points.append((x, y))
+
+    tree = shapely.STRtree([province.geometry for province in provinces])
+    element_indices, province_indices = tree.query(shapely.points(np.array(points).reshape(-1, 2)), predicate="within")
+    # element -> first province containing it
+    matches: dict[int, int] = {}
+    for element_index, province_index in zip(element_indices.tolist(), province_indices.tolist()):
+        if province_index < matches.get(element_index, len(provinces)):
+            matches[element_index] = province_index
+
+    for element_index, province_index in sorted(matches.items(), key=lambda match: (match[1], match[0])):
+        resident_data_callback(provinces[province_index], elements[element_index], None)
+
+    unmatched = [elements[i].get("id") for i in range(len(elements)) if i not in matches]
+    if unmatched or no_coordinates:
+        logger.warning(f"{len(unmatched)} {description} aren't in any province ({', '.join(map(str, unmatched))}), "
+                     f"{no_coordinates} have no coordinates")
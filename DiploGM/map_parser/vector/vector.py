@@ -1,16 +1,18 @@
+from __future__ import annotations
 import copy
-import itertools
 import json
 import logging
 import re
 import time
 import numpy as np
+from typing import Iterable
 from xml.etree.ElementTree import Element, tostring
 
 import shapely
 from deepmerge.merger import Merger
 from lxml import etree
 
+from DiploGM.map_parser.vector.adjacency_cache import AdjacencyCacheKey, hash_file, load_adjacencies, save_adjacencies
 from DiploGM.map_parser.vector.transform import TransGL3
 from DiploGM.map_parser.vector.utils import (
     find_svg_element, get_element_color, get_unit_coordinates,
@@ -28,12 +30,17 @@ from DiploGM.utils.sanitise import parse_variant_path
 # TODO: (BETA) all attribute getting should be in utils which we import and call utils.my_unit()
 # TODO: (BETA) consistent in bracket formatting
 HIGH_PROVINCES_KEY = "high provinces"
+# bump when a parser change can change province geometry, so that cached adjacencies are rebuilt
+PARSER_VERSION = 1
 LAYER_NAMES = set(LAYER_DICTIONARY.keys())
 
 logger = logging.getLogger(__name__)
 
 class Parser:
-    def __init__(self, data: str):
+    def __init__(self, data: str, previous: Parser | None = None):
+        """Loads a variant's config and SVG.
+        If previous is the variant's last parser, and neither the SVG nor its layer config has changed,
+        its SVG layers, province shapes and adjacencies are reused rather than parsed again."""
         self.datafile = data
 
         # Loads the config files for the variant
@@ -55,33 +62,44 @@ class Parser:
                 self.data = config_merger.merge(self.data, variant_data)
         except FileNotFoundError:
             self.data = variant_data
-        keys_to_delete = [p[0] for p in self.data["players"].items() if p[1].get("disabled", "False").lower() == "true"]
-        for key in keys_to_delete:
-            del self.data["players"][key]
+        # chaos variants have "players": "chaos" rather than a list of players
+        if isinstance(self.data["players"], dict):
+            keys_to_delete = [p[0] for p in self.data["players"].items()
+                              if p[1].get("disabled", "False").lower() == "true"]
+            for key in keys_to_delete:
+                del self.data["players"][key]
 
         self.data["file"] = f"{parse_variant_path(data)}/{self.data['file']}"
-
-        svg_root = etree.parse(self.data["file"])
+        self.svg_hash = hash_file(self.data["file"])
 
         self.layers = self.data[SVG_CONFIG_KEY]
         self.layer_data: dict[str, Element] = {}
 
-        # Gets the SVG elements for each layer, and stores them in the Parser
-        for layer in LAYER_NAMES:
-            l = find_svg_element(svg_root, layer, self.layers)
-            if l is None:
-                if layer in {"island_borders", "island_fill_layer"}:
-                    logger.warning(f"Layer {layer} not found in SVG, but it might not be necessary")
-                    continue
-                raise ValueError(f"Layer {layer} not found in SVG")
-            self.layer_data[layer] = l
-
-        # If there are starting units in the map, get that layer as well
-        if self.layers["detect_starting_units"]:
-            starting_units = find_svg_element(svg_root, "starting_units", self.layers)
-            if starting_units is None:
-                raise ValueError("Starting_units layer expected but not found in SVG")
-            self.layer_data["starting_units"] = starting_units
+        self.reuses_geometry = (previous is not None
+                                and previous.svg_hash == self.svg_hash
+                                and previous.layers == self.layers)
+        if previous is not None and self.reuses_geometry:
+            logger.info(f"{data}: SVG is unchanged, reusing its province shapes and adjacencies")
+            self.layer_data = previous.layer_data
+        else:
+            svg_root = etree.parse(self.data["file"])
+
+            # Gets the SVG elements for each layer, and stores them in the Parser
+            for layer in LAYER_NAMES:
+                l = find_svg_element(svg_root, layer, self.layers)
+                if l is None:
+                    if layer in {"island_borders", "island_fill_layer"}:
+                        logger.warning(f"Layer {layer} not found in SVG, but it might not be necessary")
+                        continue
+                    raise ValueError(f"Layer {layer} not found in SVG")
+                self.layer_data[layer] = l
+
+            # If there are starting units in the map, get that layer as well
+            if self.layers["detect_starting_units"]:
+                starting_units = find_svg_element(svg_root, "starting_units", self.layers)
+                if starting_units is None:
+                    raise ValueError("Starting_units layer expected but not found in SVG")
+                self.layer_data["starting_units"] = starting_units
 
         self.fow = self.layers.get("fow", False)
         # TODO: Move this out of SVG layers and update configs accordingly
@@ -96,6 +114,10 @@ class Parser:
 
         self.cache_provinces: set[Province] | None = None
         self.cache_adjacencies: set[tuple[str, str]] | None = None
+        if previous is not None and self.reuses_geometry:
+            # these are only ever deep copied, so they can be shared
+            self.cache_provinces = previous.cache_provinces
+            self.cache_adjacencies = previous.cache_adjacencies
 
         self.players: set[Player] = set()
         self.autodetect_players = False
@@ -124,6 +146,10 @@ class Parser:
                 else:
                     seen_names.add(name)
 
+        # High provinces aren't in the SVG, they're added from the config
+        for name, data in self.data.get("overrides", {}).get(HIGH_PROVINCES_KEY, {}).items():
+            seen_names.update(name + str(index) for index in range(1, data["num"] + 1))
+
         # All elements in these layers should have names that reference known provinces
         for layer_name in ["island_fill_layer", "supply_center_icons",
                            "army", "retreat_army", "fleet", "retreat_fleet"]:
@@ -408,13 +434,14 @@ class Parser:
         if provinces_layer is None:
             return set()
         provinces = set()
+        layer_translation = TransGL3(provinces_layer)
         for province_data in list(provinces_layer):
             path_string = province_data.get("d")
             if not path_string:
                 print(tostring(province_data))
                 continue
                 raise RuntimeError("Province path data not found")
-            translation = TransGL3(provinces_layer) * TransGL3(province_data)
+            translation = layer_translation * TransGL3(province_data)
 
             province_coordinates = parse_path(path_string, translation)
 
@@ -474,7 +501,8 @@ class Parser:
         initialize_province_resident_data(provinces,
                                           list(self.layer_data["names_layer"]),
                                           get_coordinates,
-                                          set_province_name)
+                                          set_province_name,
+                                          f"{self.datafile} province names")
 
     def _initialize_supply_centers_assisted(self) -> None:
         for center_data in self.layer_data["supply_center_icons"]:
@@ -521,7 +549,8 @@ class Parser:
         initialize_province_resident_data(provinces,
                                           self.layer_data["supply_center_icons"],
                                           get_coordinates,
-                                          set_province_supply_center)
+                                          set_province_supply_center,
+                                          f"{self.datafile} supply centers")
 
     def _set_province_unit(self, province: Province, unit_data: Element, coast: str | None = None) -> None:
         if province.unit:
@@ -562,7 +591,8 @@ class Parser:
         initialize_province_resident_data(provinces,
                                           self.layer_data["starting_units"],
                                           get_coordinates,
-                                          self._set_province_unit)
+                                          self._set_province_unit,
+                                          f"{self.datafile} starting units")
 
     def _set_phantom_unit_coordinates(self) -> None:
         army_layer_to_key = [
@@ -620,21 +650,13 @@ class Parser:
 
     # Returns province adjacency set
     def _get_adjacencies(self, provinces: set[Province]) -> set[tuple[str, str]]:
-        adjacencies = set()
-        try:
-            f = open(f"assets/{self.datafile}_adjacencies.txt", "r", encoding="utf-8")
-        except FileNotFoundError:
-            f = open(f"assets/{self.datafile}_adjacencies.txt", "w", encoding="utf-8")
-            # Combinations so that we only have (A, B) and not (B, A) or (A, A)
-            for province1, province2 in itertools.combinations(provinces, 2):
-                if shapely.dwithin(province1.geometry, province2.geometry, self.layers["border_margin_hint"]):
-                    adjacencies.add((province1.name, province2.name))
-                    f.write(f"{province1.name},{province2.name}\n")
-        else:
-            for line in f:
-                adjacencies.add(tuple(line[:-1].split(',')))
-        finally:
-            f.close()
+        key = AdjacencyCacheKey(self.svg_hash, PARSER_VERSION, self.layers["border_margin_hint"])
+        adjacencies = load_adjacencies(self.datafile, key)
+        if adjacencies is None:
+            start = time.time()
+            adjacencies = get_geometry_adjacencies(provinces, self.layers["border_margin_hint"])
+            logger.info(f"{self.datafile}: found {len(adjacencies)} adjacencies in {time.time() - start:.2f}s")
+            save_adjacencies(self.datafile, key, adjacencies)
         return adjacencies
 
     def get_element_player(self, element: Element, province_name: str="") -> Player | None:
@@ -690,6 +712,17 @@ class Parser:
             raise RuntimeError(f"Unit has {num_sides} sides which does not match any unit definition.")
 
 
+def get_geometry_adjacencies(provinces: Iterable[Province], margin: float) -> set[tuple[str, str]]:
+    """Finds every pair of provinces whose geometries are within margin of each other.
+    Uses a spatial index, so only nearby pairs are checked; pairs are named in the order the provinces are given,
+    the same as itertools.combinations."""
+    provinces = list(provinces)
+    geometries = [province.geometry for province in provinces]
+    sources, targets = shapely.STRtree(geometries).query(geometries, predicate="dwithin", distance=margin)
+    return {(provinces[source].name, provinces[target].name)
+            for source, target in zip(sources.tolist(), targets.tolist()) if source < target}
+
+
 parsers = {}
 
 
@@ -697,7 +730,7 @@ def get_parser(name: str, force_refresh: bool=False) -> Parser:
     name = parse_variant_path(name, as_filename=False)
     if force_refresh or name not in parsers:
         logger.info(f"Creating new Parser for board named {name}")
-        new_parser = Parser(name)
+        new_parser = Parser(name, previous=parsers.get(name))
         if new_parser.verify_svg():
             parsers[name] = new_parser
         else:
@@ -0,0 +1,149 @@
+"""Checks for adjacency issues in a parsed variant, shared by the admin command and the variant validation tool."""
+from collections import deque
+from typing import Iterable, Optional
+
+from DiploGM.models.board import Board
+from DiploGM.models.province import Province
+
+
+def _is_high_seas_copy(province: Province) -> bool:
+    return province.name[-1] in "23456789"
+
+
+class _AdjacencyGraph:
+    """The adjacencies of a board with High Seas combined into one, for the purpose of finding adjacency issues.
+    Provinces are checked in name order; each province's neighbours are sorted by name, and the neighbours
+    that each adjacent pair have in common are found once, up front."""
+    def __init__(self, provinces: Iterable[Province]):
+        self.order = sorted(provinces, key=lambda p: p.name)
+        self.rank = {province: i for i, province in enumerate(self.order)}
+        self.neighbours: dict[Province, list[Province]] = {
+            province: sorted((a for a in province.adjacency_data.adjacent if not _is_high_seas_copy(a)),
+                             key=self.rank.__getitem__)
+            for province in self.order
+        }
+        self.neighbour_sets = {province: frozenset(adjacent) for province, adjacent in self.neighbours.items()}
+        self.common = self._get_common_neighbours()
+        # Adjacent pairs with at most one neighbour in common, which is what makes up a loop of provinces
+        self.loop_neighbours = {
+            province: [a for a in adjacent if len(self.get_common(province, a)) <= 1]
+            for province, adjacent in self.neighbours.items()
+        }
+
+    def get_common(self, province: Province, other: Province) -> frozenset[Province]:
+        return self.common.get((province, other), frozenset())
+
+    def _get_common_neighbours(self) -> dict[tuple[Province, Province], frozenset[Province]]:
+        """Finds the common neighbours of every adjacent pair by listing every triangle of provinces once.
+        Each adjacency is pointed from the province with fewer adjacencies to the one with more, so a province
+        only has to be compared with the neighbours it points to, which keeps the sets being intersected small."""
+        undirected = {province: set(adjacent) for province, adjacent in self.neighbour_sets.items()}
+        for province, adjacent in self.neighbour_sets.items():
+            for a in adjacent:
+                undirected.setdefault(a, set()).add(province)
+
+        def key(province: Province) -> tuple[int, str]:
+            return len(undirected[province]), province.name
+        forward = {province: {a for a in adjacent if key(a) > key(province)} for province, adjacent in undirected.items()}
+
+        common: dict[tuple[Province, Province], set[Province]] = {}
+        for first, later in forward.items():
+            for second in later:
+                for third in later & forward[second]:
+                    # Adjacencies can be one-sided, so only count a shared neighbour both provinces list
+                    for x, y, z in ((first, second, third), (first, third, second), (second, third, first)):
+                        if z in self.neighbour_sets.get(x, ()) and z in self.neighbour_sets.get(y, ()):
+                            common.setdefault((x, y), set()).add(z)
+                            common.setdefault((y, x), set()).add(z)
+        return {pair: frozenset(shared) for pair, shared in common.items()}
+
+    def find_province_loop(self, start: Province, destination: Province) -> Optional[list[Province]]:
+        """Finds the shortest loop of provinces going from destination to start and back to destination,
+        through provinces checked after destination, where no two consecutive provinces share more than one
+        neighbour."""
+        min_rank = self.rank[destination]
+        previous: dict[Province, Optional[Province]] = {start: None}
+        queue = deque([start])
+        while queue:
+            province = queue.popleft()
+            for adj in self.loop_neighbours[province]:
+                if adj == destination:
+                    if province == start:
+                        continue # A -> B -> A shouldn't count
+                    loop = [province]
+                    while (prev := previous[loop[-1]]) is not None:
+                        loop.append(prev)
+                    return [destination] + loop[::-1]
+                if adj not in previous and self.rank[adj] > min_rank:
+                    previous[adj] = province
+                    queue.append(adj)
+        return None
+
+
+# This is a function that goes through a map and attempts to find adjacency issues
+# It will not be fool-proof, but it should detect the majority of potential errors
+# The list of warnings it generates include the following:
+# - High Seas provinces in the same region that have different adjacencies
+#   (e.g. Cape Khoe bordering SAO1 but not SAO2)
+# - Provinces with zero adjacencies
+# - Adjacent provinces that have no common adjacencies
+# - Loops of provinces that have no internal connections (note that this does detect the board edges)
+# - Groups of four provinces that all border each other
+def verify_adjacencies(board: Board) -> list[str]:
+    """Checks for potential adjacency issues in a board.
+    This is not guaranteed to find all issues, but should find the majority of them.
+    Returns a list of the warnings found."""
+    warnings = []
+    high_seas = set()
+
+    # High Seas
+    for province in sorted((p for p in board.provinces if _is_high_seas_copy(p)), key=lambda p: p.name):
+        try:
+            comp_province = board.get_province(province.name[:-1] + "1")
+            # Two high seas' adjacencies should differ by only each other
+            if (comp_province.adjacency_data.adjacent ^ province.adjacency_data.adjacent
+                != {province, comp_province}):
+                warnings.append(f"Province {province.name} and {comp_province.name} have different adjacencies")
+            high_seas.add(province)
+        except ValueError:
+            warnings.append(f"Province {province.name} is named like a high seas province " +
+                            f"but {province.name[:-1]}1 was not found")
+
+    graph = _AdjacencyGraph(board.provinces - high_seas)
+    for province in graph.order:
+        if len(province.adjacency_data.adjacent) == 0:
+            warnings.append(f"Province {province.name} has no adjacencies")
+        rank = graph.rank[province]
+        visited_adjacent = set()
+        found_loops: set[frozenset[Province]] = set()
+        # Every pair is checked once, from the province that comes first
+        for adj in (a for a in graph.neighbours[province] if graph.rank[a] > rank):
+            common_adj = graph.get_common(province, adj)
+            if len(common_adj) == 0:
+                warnings.append(f"Provinces {province.name} and {adj.name} are adjacent " +
+                                "but have no common adjacencies")
+                continue
+            # Finding loops of provinces
+            if len(common_adj) == 1:
+                loop = graph.find_province_loop(adj, province)
+                # The same loop can be found going either way round, so we only report it once
+                if loop is not None and frozenset(loop) not in found_loops:
+                    found_loops.add(frozenset(loop))
+                    if loop[1].name < loop[-1].name:
+                        loop = loop[:1] + loop[:0:-1]
+                    warnings.append(f"Found a loop of provinces {', '.join(p.name for p in loop)}. " +
+                                    "If they surround an impassable province or the board edge, this is expected")
+
+            # Searching for groups of four provinces that all share a border, each group from its first two
+            candidates = sorted((p for p in common_adj if graph.rank[p] > rank and p not in visited_adjacent),
+                                key=graph.rank.__getitem__)
+            for i, third in enumerate(candidates):
+                third_adjacent = graph.neighbour_sets[third]
+                for fourth in (p for p in candidates[i + 1:] if p in third_adjacent):
+                    if min(len(graph.neighbours[p]) for p in (province, adj, third, fourth)) == 3:
+                        # Skips provinces that only border the other three, as that's geometrically possible
+                        continue
+                    warnings.append(f"Provinces {province.name}, {adj.name}, {third.name}, " +
+                                    f"and {fourth.name} all border each other")
+            visited_adjacent.add(adj)
+    return warnings
@@ -0,0 +1,167 @@
+"""Batch job that renders every phase of a game, e.g. for the map archive or end-of-game reviews.
+
+Usage: python -m DiploGM.mapper.history <server id> <output directory or .tar/.tar.gz> [--workers N] [--png]
+
+Phases are streamed from the database in order and rendered in a pool of worker processes,
+each with its own database connection and variant template, so nothing is shared with the running bot.
+At most a couple of phases per worker are in flight at once, which bounds memory on long games."""
+from __future__ import annotations
+import argparse
+import functools
+import io
+import logging
+import os
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+
+from DiploGM.adjudicator.utils import svg_to_png_sync
+from DiploGM.db import database
+from DiploGM.mapper.mapper import Mapper
+
+logger = logging.getLogger(__name__)
+
+# phases waiting on or being rendered, per worker
+PENDING_PER_WORKER = 2
+# lowers worker priority so a batch job doesn't slow down the bot on the same machine
+WORKER_NICENESS = 10
+
+
+@dataclass
+class HistoryStats:
+    """Throughput of a history render."""
+    phases: int = 0
+    maps: int = 0
+    bytes: int = 0
+    failed: int = 0
+    elapsed: float = 0
+
+    def __str__(self) -> str:
+        rate = self.phases / self.elapsed if self.elapsed else 0
+        return (f"Rendered {self.maps} maps for {self.phases} phases in {self.elapsed:.1f}s "
+                f"({rate:.2f} phases/s, {self.bytes / 2**20:.1f} MiB), {self.failed} phases failed")
+
+
+def _init_worker(niceness: int) -> None:
+    if niceness:
+        os.nice(niceness)
+
+
+@functools.cache
+def _get_connection(db_file: str):
+    """Each worker process opens its own connection once and uses it for all of its phases."""
+    return database.open_connection(db_file)
+
+
+def render_phase(board_id: int,
+                 phase: str,
+                 index: int,
+                 png: bool = False,
+                 db_file: str = database.SQL_FILE_PATH) -> list[tuple[str, bytes]]:
+    """Renders the current and moves maps of a stored phase, returning file names and contents.
+    File names are prefixed with the phase's position in the game, so they sort in order."""
+    board = _get_connection(db_file).get_board_by_phase(board_id, phase)
+    if board is None:
+        raise ValueError(f"There is no {phase} board for server {board_id}")
+
+    # both maps are drawn from the same recolored state, so it's only drawn once
+    mapper = Mapper(board)
+    maps = [
+        mapper.draw_current_map(),
+        mapper.draw_moves_map(board.turn, None),
+    ]
+    outputs = []
+    for svg, file_name in maps:
+        if png:
+            svg, file_name = svg_to_png_sync(svg, file_name)
+        outputs.append((f"{index:03d}_{file_name}", svg))
+    return outputs
+
+
+class _Output:
+    """Writes rendered maps to a directory, or to a tarball if the path ends in .tar, .tar.gz or .tgz."""
+    def __init__(self, path: str):
+        self.tar: tarfile.TarFile | None = None
+        self.path = path
+        if path.endswith((".tar", ".tar.gz", ".tgz")):
+            self.tar = tarfile.open(path, "w:gz" if path.endswith("gz") else "w")
+        else:
+            os.makedirs(path, exist_ok=True)
+
+    def write(self, file_name: str, data: bytes) -> None:
+        if self.tar is not None:
+            info = tarfile.TarInfo(file_name)
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self.tar.addfile(info, io.BytesIO(data))
+        else:
+            with open(os.path.join(self.path, file_name), "wb") as f:
+                f.write(data)
+
+    def close(self) -> None:
+        if self.tar is not None:
+            self.tar.close()
+
+
+def render_history(board_id: int,
+                   output_path: str,
+                   workers: int = 2,
+                   png: bool = False,
+                   db_file: str = database.SQL_FILE_PATH,
+                   niceness: int = WORKER_NICENESS) -> HistoryStats:
+    """Renders every stored phase of a game to output_path, and returns how long it took."""
+    start = time.time()
+    stats = HistoryStats()
+    phases = database.open_connection(db_file).get_phases(board_id)
+    logger.info(f"history.{board_id} rendering {len(phases)} phases with {workers} workers")
+
+    output = _Output(output_path)
+    pending: deque[tuple[str, Future]] = deque()
+
+    def collect() -> None:
+        phase, future = pending.popleft()
+        try:
+            for file_name, data in future.result():
+                output.write(file_name, data)
+                stats.maps += 1
+                stats.bytes += len(data)
+            stats.phases += 1
+        except Exception as err:
+            stats.failed += 1
+            logger.error(f"history.{board_id} failed to render {phase}", exc_info=err)
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_worker,
+                                 initargs=(niceness,)) as executor:
+            for index, phase in enumerate(phases):
+                if len(pending) >= workers * PENDING_PER_WORKER:
+                    collect()
+                pending.append((phase, executor.submit(render_phase, board_id, phase, index, png, db_file)))
+            while pending:
+                collect()
+    finally:
+        output.close()
+
+    stats.elapsed = time.time() - start
+    logger.info(f"history.{board_id} {stats}")
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Renders the current and moves maps of every phase of a game.")
+    parser.add_argument("server_id", type=int, help="server (board) id of the game")
+    parser.add_argument("output", help="output directory, or a .tar/.tar.gz file")
+    parser.add_argument("--workers", type=int, default=2, help="number of worker processes")
+    parser.add_argument("--png", action="store_true", help="convert maps to PNG with Inkscape")
+    parser.add_argument("--db", default=database.SQL_FILE_PATH, help="path to the bot database")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s:%(levelname)s | %(message)s")
+    print(render_history(args.server_id, args.output, args.workers, args.png, args.db))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""Moves maps that are kept between renders, so order edits during a phase only redraw the orders that changed."""
+from __future__ import annotations
+import logging
+import threading
+import time
+from typing import TYPE_CHECKING
+from xml.etree.ElementTree import Element
+
+from DiploGM.mapper.mapper import Mapper
+from DiploGM.models.order import Move, Support
+from DiploGM.profiler import profiler
+
+if TYPE_CHECKING:
+    from DiploGM.models.board import Board
+    from DiploGM.models.order import UnitOrder
+    from DiploGM.models.player import Player
+    from DiploGM.models.province import Province
+    from DiploGM.models.unit import Unit
+
+logger = logging.getLogger(__name__)
+
+
+def _get_name(province: Province | None) -> str | None:
+    return province.name if province is not None else None
+
+
+def _get_order_signature(order: UnitOrder | None) -> tuple | None:
+    if order is None:
+        return None
+    return (type(order).__name__, _get_name(order.source), _get_name(order.destination),
+            order.destination_coast, order.has_failed)
+
+
+def get_board_state(board: Board) -> tuple:
+    """Gets everything drawn on the state layer and side panel of a map, other than orders."""
+    units = frozenset((unit.unit_type, unit.province.name, unit.coast, _get_name(unit.player),
+                       unit == unit.province.dislodged_unit)
+                      for unit in board.units)
+    owners = frozenset((province.name, _get_name(province.owner), _get_name(province.core_data.core),
+                        _get_name(province.core_data.half_core))
+                       for province in board.provinces)
+    # the side panel draws each player's name, nickname, starting and victory centers, and hides hidden players
+    players = frozenset((name, data.get("nickname"), data.get("iscc"), data.get("vscc"), data.get("hidden"))
+                        for name, data in board.data.get("players", {}).items())
+    victory = board.data.get("victory_conditions"), board.data.get("victory_count")
+    return board.turn.get_indexed_name(), units, owners, players, victory
+
+
+class LiveMovesMap:
+    """A moves map for one phase of a board, as seen by one player (or the GM).
+    The state layer is only drawn once, and each unit's order elements are kept
+    and redrawn only when something they depend on changes."""
+    def __init__(self,
+                 board: Board,
+                 player_restriction: Player | None,
+                 color_mode: str | None = None,
+                 movement_only: bool = False):
+        self.board = board
+        self.state = get_board_state(board)
+        self.movement_only = movement_only
+        self.mapper = Mapper(board, color_mode=color_mode)
+        self.arrow_layer: Element = self.mapper.start_moves_map(board.turn, player_restriction)
+        self.mapper.panel_drawer.draw_side_panel(self.mapper._moves_svg)
+        self.mapper.clean_layers(self.mapper._moves_svg)
+        # unit -> (signature of everything its order drawing depends on, drawn elements)
+        self.drawn: dict[Unit, tuple[tuple, list[Element]]] = {}
+        self.lock = threading.Lock()
+
+    def is_current(self, board: Board) -> bool:
+        """Checks whether the state layer still matches the board."""
+        return board is self.board and get_board_state(board) == self.state
+
+    def _get_signature(self, unit: Unit, order: UnitOrder | None) -> tuple:
+        convoy_paths = self.mapper.order_drawer.convoy_paths
+        signature: list = [_get_order_signature(order)]
+        if isinstance(order, Move):
+            signature.append(tuple(tuple(p.name for p in path) for path in convoy_paths.get(unit.province, [])))
+        elif isinstance(order, Support):
+            # supports are drawn to match the supported unit's order, and mutual support holds are drawn once
+            for province in (order.source, order.destination):
+                if province.unit is not None:
+                    signature.append(_get_order_signature(province.unit.order))
+            signature.append(tuple(tuple(p.name for p in path) for path in convoy_paths.get(order.source, [])))
+        return tuple(signature)
+
+    def _remove(self, elements: list[Element]) -> None:
+        for element in elements:
+            parent = element.getparent()
+            if parent is not None:
+                parent.remove(element)
+
+    def draw(self) -> tuple[bytes, str]:
+        """Brings the order layer up to date with the board's orders, and exports the map."""
+        with self.lock:
+            start = time.time()
+            current_turn = self.board.turn
+            with profiler.span("mapper.convoys", self.mapper.variant):
+                self.mapper.find_convoy_paths()
+            orders_to_draw = self.mapper.get_orders_to_draw(current_turn, self.movement_only)
+
+            redrawn = 0
+            drawn: dict[Unit, tuple[tuple, list[Element]]] = {}
+            with profiler.span("mapper.live_orders", self.mapper.variant):
+                for unit, order, unit_locs in orders_to_draw:
+                    signature = self._get_signature(unit, order)
+                    previous = self.drawn.pop(unit, None)
+                    if previous is not None and previous[0] == signature:
+                        drawn[unit] = previous
+                        continue
+                    if previous is not None:
+                        self._remove(previous[1])
+                    redrawn += 1
+                    drawn[unit] = (signature,
+                                   self.mapper.draw_unit_order(self.arrow_layer, unit, order, unit_locs, current_turn))
+                # anything left over no longer has an order to draw
+                for _, elements in self.drawn.values():
+                    self._remove(elements)
+                self.drawn = drawn
+
+                # redrawn orders were added at the end of the arrow layer or the root (holds, convoys and the like),
+                # so put everything back in display priority order
+                for unit, _, _ in orders_to_draw:
+                    for element in drawn[unit][1]:
+                        parent = element.getparent()
+                        if parent is not None:
+                            parent.append(element)
+
+            root = self.mapper._moves_svg.getroot()
+            assert root is not None
+            svg = self.mapper._export_svg(root, keep=True)
+            logger.info(f"live_map.draw redrew {redrawn}/{len(orders_to_draw)} orders in {time.time() - start}s")
+            return svg, f"{str(self.board.turn).replace(' ', '_')}_moves_map.svg"
+
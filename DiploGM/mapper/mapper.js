@@ -7,15 +7,18 @@ const True = true;
 const False = false;
 const None = undefined;
 
-// dict with name: primary_loc
+// data that is the same for every phase of a variant
 // fed in by mapper.py
 
-const location_data = %s;
-const svg_config = %s;
+const gui_data = %s;
 
-const coast_to_province = %s;
+// dict with name: primary_loc, with the locations of units in this phase applied on top
+const location_data = Object.assign(gui_data["location_data"], %s);
+const svg_config = gui_data["svg_config"];
+
+const coast_to_province = gui_data["coast_to_province"];
 const province_to_unit_type = %s;
-const province_to_province_type = %s;
+const province_to_province_type = gui_data["province_to_province_type"];
 
 const arrow_layer = document.getElementById(svg_config["arrow_output"]);
 
@@ -1,7 +1,8 @@
 """The Mapper module, for drawing maps with or without orders on them."""
 import copy
 import itertools
-import sys
+import json
+from typing import Iterable
 from xml.etree.ElementTree import ElementTree, Element, register_namespace
 from xml.etree.ElementTree import tostring as elementToString
 
@@ -16,16 +17,20 @@ from DiploGM.map_parser.vector.utils import (
     get_unit_coordinates, initialize_province_resident_data,
     NAMESPACE, SVG_CONFIG_KEY
 )
+from DiploGM.config import SLIM_SVG, SLIM_SVG_PRECISION
 from DiploGM.db.database import logger
 from DiploGM.mapper.order_drawer import OrderDrawer
 from DiploGM.mapper.panel import PanelDrawer
+from DiploGM.mapper.slim import slim_svg
+from DiploGM.mapper.template import get_map_template
 from DiploGM.mapper.utils import MapperUtils
 from DiploGM.models import turn
 from DiploGM.models.board import Board
-from DiploGM.models.order import Move, Support, RetreatMove, Build, PlayerOrder
+from DiploGM.models.order import Move, Support, RetreatMove, Build, PlayerOrder, UnitOrder
 from DiploGM.models.player import Player
-from DiploGM.models.province import ProvinceType, Province, UnitLocation
+from DiploGM.models.province import Province, UnitLocation
 from DiploGM.models.unit import Unit, UnitType
+from DiploGM.profiler import profiler
 
 from DiploGM.map_parser.vector.transform import TransGL3
 from DiploGM.map_parser.vector.vector import Parser
@@ -33,6 +38,17 @@ from DiploGM.map_parser.vector.vector import Parser
 # if you make any rendering changes,
 # make sure to sync them with mapper.js
 
+_gui_script: str | None = None
+
+
+def get_gui_script() -> str:
+    """Gets the GUI map script template, which is only read from disk once."""
+    global _gui_script
+    if _gui_script is None:
+        with open("DiploGM/mapper/mapper.js", 'r', encoding='utf-8') as f:
+            _gui_script = f.read()
+    return _gui_script
+
 class Mapper:
     """The main Mapper class."""
     def __init__(self, board: Board, restriction: Player | None = None, color_mode: str | None = None):
@@ -44,9 +60,13 @@ class Mapper:
 
         self.board: Board = board
         self.board_svg_data: dict = board.data[SVG_CONFIG_KEY]
-        self.utils = MapperUtils(self.board_svg_data)
         self.current_turn: turn.Turn = board.turn
-        self.board_svg: ElementTree = etree.parse(self.board.data["file"])
+        self.variant = board.datafile
+        with profiler.span("mapper.template", self.variant):
+            self.template = get_map_template(board)
+        self.utils = MapperUtils(self.board_svg_data, self.template.coordinate_arrays)
+        with profiler.span("mapper.copy.template", self.variant):
+            self.board_svg: ElementTree = self.template.copy_svg()
         self.player_restriction: str | None = restriction.name if restriction else None
 
         # different colors
@@ -56,13 +76,14 @@ class Mapper:
             self.replacements = None
         self.load_colors(color_mode)
         if color_mode is not None:
-            self.replace_colors(color_mode)
+            with profiler.span("mapper.replace_colors", self.variant):
+                self.replace_colors(color_mode)
 
-        self.panel_drawer = PanelDrawer(self.utils, self.board_svg, self.board, self.player_colors, restriction)
+        self.panel_drawer = PanelDrawer(self.utils, self.board_svg, self.board, self.player_colors, restriction,
+                                        self.template.panel_layout)
 
-        self.utils.add_arrow_definition_to_svg(self.board_svg, self.board, self.player_colors)
-
-        clear_svg_element(self.board_svg, "starting_units", self.board_svg_data)
+        self.utils.add_half_core_gradients_to_svg(self.board_svg, self.board, self.player_colors,
+                                                  self.template.gradient_defs)
 
         self.cached_elements = {}
         for element_name in ["army", "fleet", "retreat_army", "retreat_fleet", "unit_output"]:
@@ -75,19 +96,23 @@ class Mapper:
         self.adjacent_provinces: set[str] = {p.name for p in visible_provinces}
 
         # TODO: Switch to passing the SVG directly, as that's simpiler (self.svg = draw_units(svg)?)
-        self._draw_units()
-        self._color_provinces()
-        self._color_centers()
+        with profiler.span("mapper.units", self.variant):
+            self._draw_units()
+        with profiler.span("mapper.recolor", self.variant):
+            self._color_provinces()
+            self._color_centers()
         self.panel_drawer.draw_side_panel(self.board_svg)
 
 
-        self._moves_svg = copy.deepcopy(self.board_svg)
+        with profiler.span("mapper.copy.moves", self.variant):
+            self._moves_svg = copy.deepcopy(self.board_svg)
         self.order_drawer = OrderDrawer(self.utils, self._moves_svg, self.board_svg_data, self.adjacent_provinces)
         self.cached_elements["unit_output_moves"] = find_svg_element(
             self._moves_svg, "unit_output", self.board_svg_data
         )
 
-        self.state_svg = copy.deepcopy(self.board_svg)
+        with profiler.span("mapper.copy.state", self.variant):
+            self.state_svg = copy.deepcopy(self.board_svg)
         self.clean_layers(self.state_svg)
 
         self._highlight_retreating_units(self.state_svg)
@@ -99,7 +124,20 @@ class Mapper:
 
     def draw_moves_and_retreats(self, arrow_layer: Element, current_turn: turn.Turn, movement_only: bool):
         """Draws move and retreat arrows."""
+        for unit, order, unit_locs in self.get_orders_to_draw(current_turn, movement_only):
+            self.draw_unit_order(arrow_layer, unit, order, unit_locs, current_turn)
+
+    def get_orders_to_draw(self,
+                           current_turn: turn.Turn,
+                           movement_only: bool
+                           ) -> list[tuple[Unit, UnitOrder | None, Iterable[tuple[float, float]]]]:
+        """Gets each unit whose order should be drawn, in drawing order,
+        along with the order and the coordinates to draw it from."""
         units = sorted(self.board.units, key=lambda unit: 0 if unit.order is None else unit.order.display_priority)
+        # unit, order, coordinates to draw from and how many of them are arrow endpoints still to be resolved
+        to_draw: list[tuple[Unit, UnitOrder | None, set[tuple[float, float]], int]] = []
+        endpoint_locs: list[np.ndarray] = []
+        endpoint_coords: list[tuple[float, float]] = []
         for unit in units:
             if not self.order_drawer.utils.is_moveable(unit,
                                                        self.adjacent_provinces,
@@ -126,7 +164,6 @@ class Mapper:
 
             # TODO: Maybe there's a better way to handle convoys?
             if isinstance(order, (RetreatMove, Move, Support)):
-                new_locs = []
                 dest_coords = order.destination.all_coordinates
                 if len(dest_coords) == 0:
                     e_list = [UnitLocation((0, 0), (0, 0))]
@@ -139,30 +176,79 @@ class Mapper:
                                              dest_coords.get(UnitType.ARMY.name,
                                                              {UnitLocation((0, 0), (0, 0))}))
 
+                # the starting points for every arrow are resolved in one batch below
+                unit_locs_array = np.array(list(unit_locs), dtype=float)
                 for endpoint in e_list:
-                    new_locs += [self.utils.normalize(
-                        self.utils.get_closest_loc(unit_locs, endpoint.primary_coordinate))]
-                unit_locs = new_locs
-            try:
-                for loc in unit_locs:
-                    val = self.order_drawer.draw_order(unit, order, loc, current_turn)
-                    if val is None:
-                        continue
-                    if not isinstance(val, list):
-                        val = [val]
-                    for path in val:
-                        # if something returns, that means it could potentially go across the edge
-                        # copy it 3 times (-1, 0, +1)
-                        lval = copy.deepcopy(path)
-                        rval = copy.deepcopy(path)
-                        lval.attrib["transform"] = f"translate({-self.board.data['svg config']['map_width']}, 0)"
-                        rval.attrib["transform"] = f"translate({self.board.data['svg config']['map_width']}, 0)"
-
-                        arrow_layer.append(lval)
-                        arrow_layer.append(rval)
-                        arrow_layer.append(path)
-            except Exception as err:
-                logger.error("Drawing move failed for %s", unit, exc_info=err)
+                    endpoint_locs.append(unit_locs_array)
+                    endpoint_coords.append(endpoint.primary_coordinate)
+                to_draw.append((unit, order, unit_locs, len(e_list)))
+            else:
+                to_draw.append((unit, order, unit_locs, 0))
+
+        closest_locs = iter(self.utils.get_closest_locs(endpoint_locs, endpoint_coords))
+        orders_to_draw = []
+        for unit, order, unit_locs, endpoint_count in to_draw:
+            if endpoint_count:
+                unit_locs = [self.utils.normalize(next(closest_locs)) for _ in range(endpoint_count)]
+            orders_to_draw.append((unit, order, unit_locs))
+        return orders_to_draw
+
+    def draw_unit_order(self,
+                        arrow_layer: Element,
+                        unit: Unit,
+                        order: UnitOrder | None,
+                        unit_locs: Iterable[tuple[float, float]],
+                        current_turn: turn.Turn) -> list[Element]:
+        """Draws a unit's order from each of its coordinates, and returns the elements that were added."""
+        root = self._moves_svg.getroot()
+        assert root is not None
+        root_size = len(root)
+        drawn: list[Element] = []
+        try:
+            for loc in unit_locs:
+                val = self.order_drawer.draw_order(unit, order, loc, current_turn)
+                if val is None:
+                    continue
+                if not isinstance(val, list):
+                    val = [val]
+                for path in val:
+                    # if something returns, that means it could potentially go across the edge
+                    # copy it 3 times (-1, 0, +1)
+                    lval = copy.deepcopy(path)
+                    rval = copy.deepcopy(path)
+                    lval.attrib["transform"] = f"translate({-self.board.data['svg config']['map_width']}, 0)"
+                    rval.attrib["transform"] = f"translate({self.board.data['svg config']['map_width']}, 0)"
+
+                    arrow_layer.append(lval)
+                    arrow_layer.append(rval)
+                    arrow_layer.append(path)
+                    drawn += [lval, rval, path]
+        except Exception as err:
+            logger.error("Drawing move failed for %s", unit, exc_info=err)
+        # holds, convoys and the like are drawn straight onto the root
+        return list(root[root_size:]) + drawn
+
+    def start_moves_map(self, current_turn: turn.Turn, player_restriction: Player | None) -> Element:
+        """Starts a fresh moves map to draw orders on, and returns the arrow layer."""
+        self._reset_moves_map()
+        self.player_restriction = player_restriction.name if player_restriction else None
+        self.order_drawer.player_restriction = self.player_restriction
+        self.current_turn = current_turn
+
+        arrow_layer = find_svg_element(self._moves_svg, "arrow_output", self.board_svg_data)
+        if arrow_layer is None:
+            raise ValueError("Arrow layer not found in SVG")
+        return arrow_layer
+
+    def find_convoy_paths(self) -> None:
+        """Finds the convoy routes for every visible move."""
+        self.order_drawer.clear_convoy_paths()
+        for unit in self.board.units:
+            # Since we draw supports before moves, we need to find convoy routes first
+            # so the supports can know where to draw support arrows
+            if (isinstance(unit.order, Move)
+                and self.utils.is_moveable(unit, self.adjacent_provinces, self.player_restriction)):
+                self.order_drawer.find_convoy_path(unit.province, unit.order.destination)
 
     def draw_moves_map(self,
                        current_turn: turn.Turn,
@@ -171,27 +257,25 @@ class Mapper:
         """Draws the map with orders.
         If player_restriction is not None, then only show orders for that player.
         If movement_only is True, then only show moves that succeed (no failed moves or supports/convoys)."""
-        logger.info("mapper.draw_moves_map")
+        svg, svg_file_name = self.draw_moves_svg(current_turn, player_restriction, movement_only)
+        root = svg.getroot()
+        assert root is not None
+        return self._export_svg(root), svg_file_name
 
-        self._reset_moves_map()
-        self.player_restriction = player_restriction.name if player_restriction else None
-        self.order_drawer.player_restriction = self.player_restriction
-        self.current_turn = current_turn
+    def draw_moves_svg(self,
+                       current_turn: turn.Turn,
+                       player_restriction: Player | None,
+                       movement_only: bool = False) -> tuple[ElementTree, str]:
+        """Draws the map with orders like draw_moves_map, without exporting it."""
+        logger.info("mapper.draw_moves_map")
 
-        t = self._moves_svg.getroot()
-        assert t is not None
-        arrow_layer = find_svg_element(self._moves_svg, "arrow_output", self.board_svg_data)
-        if arrow_layer is None:
-            raise ValueError("Arrow layer not found in SVG")
+        arrow_layer = self.start_moves_map(current_turn, player_restriction)
 
         if not current_turn.is_builds():
-            for unit in self.board.units:
-                # Since we draw supports before moves, we need to find convoy routes first
-                # so the supports can know where to draw support arrows
-                if (isinstance(unit.order, Move)
-                    and self.utils.is_moveable(unit, self.adjacent_provinces, self.player_restriction)):
-                    self.order_drawer.find_convoy_path(unit.province, unit.order.destination)
-            self.draw_moves_and_retreats(arrow_layer, current_turn, movement_only)
+            with profiler.span("mapper.convoys", self.variant):
+                self.find_convoy_paths()
+            with profiler.span("mapper.orders", self.variant):
+                self.draw_moves_and_retreats(arrow_layer, current_turn, movement_only)
         else:
             if self.player_restriction is None or (current_player := self.board.get_player(self.player_restriction)) is None:
                 build_orders = {(player, order) for player in self.board.players for order in player.build_orders}
@@ -210,7 +294,7 @@ class Mapper:
         self.clean_layers(self._moves_svg)
 
         svg_file_name = f"{str(self.board.turn).replace(' ', '_')}_moves_map.svg"
-        return elementToString(t, encoding="utf-8"), svg_file_name
+        return self._moves_svg, svg_file_name
 
     def draw_gui_map(self, current_turn: turn.Turn, player_restriction: Player | None) -> tuple[bytes, str]:
         """Draws the interactive GUI map."""
@@ -224,56 +308,24 @@ class Mapper:
             raise ValueError("SVG root is None")
         clear_svg_element(self._moves_svg, "sidebar", self.board_svg_data)
         clear_svg_element(self._moves_svg, "power_banners", self.board_svg_data)
-        with open("DiploGM/mapper/mapper.js", 'r', encoding='utf-8') as f:
-            js = f.read()
-
-        locdict = {}
-
-        for province in self.board.provinces:
-            coast = None
-            if province.unit:
-                unit_type = province.unit.unit_type
-                coast = province.unit.coast
-            else:
-                unit_type = UnitType.FLEET if province.type == ProvinceType.SEA else UnitType.ARMY
-            locdict[province.name] = list(province.get_unit_coordinates(unit_type, coast))
-            for coast in province.get_multiple_coasts():
-                locdict[province.get_name(coast)] = list(province.get_unit_coordinates(UnitType.FLEET, coast))
-
         script = etree.Element("script")
 
-        coast_to_province = {}
-        for province in self.board.provinces:
-            for coast in province.get_multiple_coasts():
-                coast_to_province[province.get_name(coast)] = province.name
-
         province_to_unit_type = {}
         for province in self.board.provinces:
-            s = None
             if province.name not in self.adjacent_provinces:
-                s = '?'
+                province_to_unit_type[province.name] = '?'
             elif province.unit:
-                s = 'f' if province.unit.unit_type == UnitType.FLEET else 'a'
-            province_to_unit_type[province.name] = s
-
-        province_to_province_type = {}
-        for province in self.board.provinces:
-            if province.type == ProvinceType.SEA:
-                province_type = 'sea'
-            elif province.type == ProvinceType.ISLAND:
-                province_type = 'island'
-            elif province.type == ProvinceType.LAND:
-                province_type = 'land'
-            else:
-                raise ValueError(f"Unknown province type {province.type} for province {province.name}")
-            province_to_province_type[province.name] = province_type
+                province_to_unit_type[province.name] = 'f' if province.unit.unit_type == UnitType.FLEET else 'a'
 
         immediate = [unit.province.get_name(unit.coast)
                      for unit in self.board.units
                      if self.order_drawer.utils.is_moveable(unit, self.adjacent_provinces, self.player_restriction)]
 
-        script.text = js % (str(locdict), self.board_svg_data, coast_to_province,
-                            province_to_unit_type, province_to_province_type, immediate)
+        script.text = get_gui_script() % (self.template.get_gui_data(self.board),
+                                          json.dumps(self.template.get_gui_location_overrides(self.board)),
+                                          json.dumps(province_to_unit_type),
+                                          json.dumps(immediate))
+        logger.info(f"mapper.draw_gui_map script payload is {len(script.text)} bytes")
         root.append(script)
 
         coasts = find_svg_element(root, "coast_markers", self.board_svg_data)
@@ -288,7 +340,8 @@ class Mapper:
             e.set("oncontextmenu", f'obj_clicked(event, "{p} {e[0].text}", false)')
 
         if coasts is not None:
-            initialize_province_resident_data(self.board.provinces, coasts, get_text_coordinate, match)
+            initialize_province_resident_data(self.board.provinces, coasts, get_text_coordinate, match,
+                                              f"{self.variant} coast markers")
 
         def get_sc_coordinates(supply_center_data: Element) -> tuple[float | None, float | None]:
             circles = supply_center_data.findall(".//svg:circle", namespaces=NAMESPACE)
@@ -312,7 +365,8 @@ class Mapper:
         initialize_province_resident_data(self.board.provinces,
                                           supply_center_icons,
                                           get_sc_coordinates,
-                                          set_province_supply_center)
+                                          set_province_supply_center,
+                                          f"{self.variant} supply center icons")
 
         for layer_name in ("land_layer", "island_borders", "island_ring_layer", "island_fill_layer", "sea_borders"):
             layer = find_svg_element(root, layer_name, self.board_svg_data)
@@ -418,64 +472,70 @@ class Mapper:
     def draw_current_map(self) -> tuple[bytes, str]:
         """Draws the map without orders"""
         logger.info("mapper.draw_current_map")
-        svg_file_name = f"{str(self.board.turn).replace(' ', '_')}_map.svg"
-        root = self.state_svg.getroot()
+        svg, svg_file_name = self.draw_current_svg()
+        root = svg.getroot()
         if root is None:
             raise ValueError("SVG root is None")
-        return elementToString(root, encoding="utf-8"), svg_file_name
+        return self._export_svg(root), svg_file_name
+
+    def draw_current_svg(self) -> tuple[ElementTree, str]:
+        """Gets the map without orders like draw_current_map, without exporting it."""
+        return self.state_svg, f"{str(self.board.turn).replace(' ', '_')}_map.svg"
+
+    def export_for_players(self, svg: ElementTree, players: list[Player]) -> list[bytes]:
+        """Exports a drawn map once for each player, redrawing only the side panel for each of them.
+        Players with the same visible provinces see the same map other than the panel, which shows them their own
+        SC count, so a fog of war map only has to be drawn once for all of them."""
+        root = svg.getroot()
+        assert root is not None
+        exported = []
+        for player in players:
+            self.panel_drawer.restriction = player
+            self.panel_drawer.draw_side_panel(svg)
+            exported.append(self._export_svg(root, keep=True))
+        return exported
+
+    def _export_svg(self, root: Element, keep: bool = False) -> bytes:
+        """Serializes a map, slimming it first if enabled.
+        keep: slim a copy instead, so root can be drawn on again"""
+        with profiler.span("mapper.serialize", self.variant):
+            svg = elementToString(root, encoding="utf-8")
+        profiler.record("mapper.svg_bytes", len(svg), self.variant)
+        if not SLIM_SVG:
+            return svg
+        if keep:
+            with profiler.span("mapper.copy.export", self.variant):
+                root = copy.deepcopy(root)
+        with profiler.span("mapper.slim", self.variant):
+            slim_svg(root, SLIM_SVG_PRECISION)
+            slimmed = elementToString(root, encoding="utf-8")
+        logger.info(f"mapper.slim_svg reduced {len(svg)} bytes to {len(slimmed)} bytes")
+        return slimmed
 
     def _reset_moves_map(self):
-        self._moves_svg = copy.deepcopy(self.board_svg)
+        with profiler.span("mapper.copy.moves", self.variant):
+            self._moves_svg = copy.deepcopy(self.board_svg)
         self.order_drawer.moves_svg = self._moves_svg
 
     def _color_provinces(self) -> None:
-        province_layer = find_svg_element(self.board_svg, "land_layer", self.board_svg_data)
-        island_fill_layer = find_svg_element(self.board_svg, "island_fill_layer", self.board_svg_data)
-        island_ring_layer = find_svg_element(self.board_svg, "island_ring_layer", self.board_svg_data)
-        sea_layer = find_svg_element(self.board_svg, "sea_borders", self.board_svg_data)
-        island_layer = find_svg_element(self.board_svg, "island_borders", self.board_svg_data)
-        if sea_layer is None or province_layer is None:
+        if (find_svg_element(self.board_svg, "sea_borders", self.board_svg_data) is None
+            or find_svg_element(self.board_svg, "land_layer", self.board_svg_data) is None):
             raise ValueError("Missing a layer in SVG!")
-        island_fill_layer = island_fill_layer or []
-        island_layer = island_layer or []
-        island_ring_layer = island_ring_layer or []
-
-        visited_provinces: set[str] = set()
-
-        for province_element in itertools.chain(province_layer or [], island_fill_layer or []):
-            try:
-                province = self._get_province_from_element_by_label(province_element)
-            except ValueError as ex:
-                print(f"Error during recoloring provinces: {ex}", file=sys.stderr)
-                continue
-
-            visited_provinces.add(province.name)
-            color = self.impassable_color if province.is_impassable else self.neutral_color
-            if province.name not in self.adjacent_provinces:
-                color = self.board_svg_data["unknown"]
-            elif province.owner:
-                color = self.player_colors[province.owner.name]
-
-            self.utils.color_element(province_element, color)
-
-        for province_element in itertools.chain(sea_layer, island_layer):
-            try:
-                province = self._get_province_from_element_by_label(province_element)
-            except ValueError as ex:
-                print(f"Error during recoloring provinces: {ex}", file=sys.stderr)
-                continue
+        land_elements = self.template.get_layer_elements(self.board_svg, "land_layer")
+        island_fill_elements = self.template.get_layer_elements(self.board_svg, "island_fill_layer")
+        island_ring_elements = self.template.get_layer_elements(self.board_svg, "island_ring_layer")
+        sea_elements = self.template.get_layer_elements(self.board_svg, "sea_borders")
+        island_elements = self.template.get_layer_elements(self.board_svg, "island_borders")
 
+        for province in self.board.provinces:
             if province.name in self.adjacent_provinces:
-                self.utils.color_element(province_element, self.clear_seas_color)
+                for province_element in itertools.chain(sea_elements.get(province.name, []),
+                                                        island_elements.get(province.name, [])):
+                    self.utils.color_element(province_element, self.clear_seas_color)
 
-            visited_provinces.add(province.name)
-
-        # Try to combine this with the code above? A lot of repeated stuff here
-        for island_ring in island_ring_layer:
-            try:
-                province = self._get_province_from_element_by_label(island_ring)
-            except ValueError as ex:
-                print(f"Error during recoloring provinces: {ex}", file=sys.stderr)
+            filled_elements = land_elements.get(province.name, []) + island_fill_elements.get(province.name, [])
+            ring_elements = island_ring_elements.get(province.name, [])
+            if not filled_elements and not ring_elements:
                 continue
 
             color = self.impassable_color if province.is_impassable else self.neutral_color
@@ -483,26 +543,19 @@ class Mapper:
                 color = self.board_svg_data["unknown"]
             elif province.owner:
                 color = self.player_colors[province.owner.name]
-            self.utils.color_element(island_ring, color, key="stroke")
 
-        for province in self.board.provinces:
-            if province.name not in visited_provinces and (self.board.fow or province.type != ProvinceType.SEA):
-                print(f"Warning: Province {province.name} was not recolored by mapper!")
+            for province_element in filled_elements:
+                self.utils.color_element(province_element, color)
+            for island_ring in ring_elements:
+                self.utils.color_element(island_ring, color, key="stroke")
 
     def _color_centers(self) -> None:
-        centers_layer = find_svg_element(self.board_svg, "supply_center_icons", self.board_svg_data)
-        if centers_layer is None:
+        if find_svg_element(self.board_svg, "supply_center_icons", self.board_svg_data) is None:
             raise ValueError("Supply Center layer not found in SVG")
+        center_elements = self.template.get_layer_elements(self.board_svg, "supply_center_icons")
 
-        for center_element in centers_layer:
-            try:
-                province = self._get_province_from_element_by_label(center_element)
-            except ValueError as ex:
-                print(f"Error during recoloring centers: {ex}", file=sys.stderr)
-                continue
-
-            if not province.has_supply_center:
-                print(f"Province {province.name} says it has no supply center, but it does", file=sys.stderr)
+        for province in self.board.provinces:
+            if province.name not in center_elements:
                 continue
 
             if province.name not in self.adjacent_provinces:
@@ -524,7 +577,7 @@ class Mapper:
             # for path in center_element.getchildren():
             #     print(f"\t{path}")
             #     self.color_element(path, color)
-            for elem in center_element:
+            for elem in itertools.chain.from_iterable(center_elements[province.name]):
                 if elem.attrib["id"].startswith("Capital_Marker"):
                     continue
                 if (f"{NAMESPACE['inkscape']}label" in elem.attrib
@@ -541,15 +594,6 @@ class Mapper:
                 else:
                     self.utils.color_element(elem, core_color)
 
-    def _get_province_from_element_by_label(self, element: Element) -> Province:
-        province_name = element.get(f"{NAMESPACE['inkscape']}label")
-        if province_name is None:
-            raise ValueError(f"Unlabeled element {element}")
-        province = self.board.get_province(province_name)
-        if province is None:
-            raise ValueError(f"Could not find province for label {province_name}")
-        return province
-
     def _draw_units(self) -> None:
         for unit in self.board.units:
             if unit.province.name in self.adjacent_provinces:
@@ -634,7 +678,6 @@ class Mapper:
         unit_locs = self._get_unit_coordinates(unit, True)
 
         for retreat_province, retreat_coast in unit.retreat_options:
-            new_locs = []
             if unit.unit_type not in retreat_province.all_coordinates:
                 e_list = next(iter(retreat_province.all_coordinates.values()))
             elif retreat_coast:
@@ -645,8 +688,8 @@ class Mapper:
                     retreat_province.all_coordinates.get(UnitType.ARMY.name, {UnitLocation((0, 0), (0, 0))}))
 
             # Unspecified coast, so default to army location
-            for endpoint in e_list:
-                new_locs += [self.utils.normalize(self.utils.get_closest_loc(unit_locs, endpoint.primary_coordinate))]
+            new_locs = [self.utils.normalize(loc) for loc in self.utils.get_closest_locs(
+                [unit_locs] * len(e_list), [endpoint.primary_coordinate for endpoint in e_list])]
 
             for loc in new_locs:
                 root.append(
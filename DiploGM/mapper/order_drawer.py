@@ -1,5 +1,6 @@
 """Module to draw orders (moves, support, etc.) on the map."""
 from __future__ import annotations
+from collections import deque
 import numpy as np
 from typing import TYPE_CHECKING, Any
 from xml.etree.ElementTree import ElementTree
@@ -19,6 +20,21 @@ if TYPE_CHECKING:
     from DiploGM.models.order import UnitOrder, PlayerOrder
     from DiploGM.mapper.utils import MapperUtils
 
+# Bounds on convoy path search, so large convoy networks don't blow up rendering
+MAX_CONVOY_PATHS = 16
+MAX_CONVOY_SEARCH = 5000
+
+def _normalize_rows(points: np.ndarray) -> np.ndarray:
+    return points / np.sqrt(np.sum(points**2, axis=1, keepdims=True))
+
+
+def get_control_points(points: np.ndarray) -> np.ndarray:
+    """Given the (n, 2) points of a convoy path, gets the Bezier control point for each of the n - 2 inner points."""
+    inner = points[1:-1]
+    # TODO: possible div / 0 if the two convoyed points are in a straight line with the convoyer on one side
+    vec = (points[:-2] - inner) - _normalize_rows(points[2:] - inner)
+    return _normalize_rows(vec) * 30 + inner
+
 class OrderDrawer:
     """Class to draw orders on the map."""
     def __init__(self,
@@ -33,6 +49,7 @@ class OrderDrawer:
         self.adjacent_provinces = adjacent_provinces
         self.player_restriction = player_restriction
         self.convoy_paths: dict[Province, list[list[Province]]] = {}
+        self._convoy_path_cache: dict[tuple[Province, Province, str | None], list[list[Province]]] = {}
 
     def draw_order(self,
                    unit: Unit,
@@ -160,36 +177,49 @@ class OrderDrawer:
         )
         return order_path
 
-    def _path_helper(
-        self, source: Province, destination: Province, current: Province, already_checked=()
-    ) -> list[list[Province]]:
-        if current in already_checked:
-            return []
-        options = []
-        new_checked = already_checked + (current,)
-        for possibility in current.adjacency_data.adjacent:
-            if possibility.name not in self.adjacent_provinces:
-                continue
-
-            if possibility == destination:
-                options += [[destination]]
-                continue
-            if (unit := possibility.unit) is None:
-                continue
-            is_convoying_fleet = (
-                possibility.can_convoy
-                and unit is not None
+    def _is_convoying_fleet(self, province: Province, source: Province, destination: Province) -> bool:
+        if province.name not in self.adjacent_provinces or (unit := province.unit) is None:
+            return False
+        if (self.player_restriction is not None
+            and (unit.player is None or unit.player.name != self.player_restriction)):
+            return False # Don't draw if the player doesn't know that fleet is convoying
+        return (province.can_convoy
                 and unit.unit_type == UnitType.FLEET
                 and isinstance(unit.order, ConvoyTransport)
                 and unit.order.source == source
-                and unit.order.destination == destination
-            )
-            if (self.player_restriction is not None
-                and (unit.player is None or unit.player.name != self.player_restriction)):
-                continue # Don't draw if the player doesn't know that fleet is convoying
-            if is_convoying_fleet:
-                options += self._path_helper(source, destination, possibility, new_checked)
-        return list(map((lambda t: [current] + t), options))
+                and unit.order.destination == destination)
+
+    def _path_helper(self, source: Province, destination: Province) -> list[list[Province]]:
+        """Finds convoy paths through at least one fleet, shortest first.
+        A path is skipped if any two of its provinces are adjacent without being consecutive,
+        as the shortcut gives another path through a subset of its provinces."""
+        if destination.name not in self.adjacent_provinces:
+            return []
+        options: list[list[Province]] = []
+        queue: deque[list[Province]] = deque([[source]])
+        searched = 0
+        while queue and len(options) < MAX_CONVOY_PATHS and searched < MAX_CONVOY_SEARCH:
+            path = queue.popleft()
+            searched += 1
+            for possibility in path[-1].adjacency_data.adjacent:
+                if possibility in path:
+                    continue
+                is_destination = possibility == destination
+                if is_destination and len(path) == 1:
+                    continue
+                if not is_destination and not self._is_convoying_fleet(possibility, source, destination):
+                    continue
+                # a direct move alongside the convoy doesn't count as a shortcut
+                if any(possibility in earlier.adjacency_data.adjacent
+                       for earlier in path[1 if is_destination else 0:-1]):
+                    continue
+                if is_destination:
+                    options.append(path + [destination])
+                    if len(options) >= MAX_CONVOY_PATHS:
+                        break
+                else:
+                    queue.append(path + [possibility])
+        return options
 
     def _draw_path(self, d: str, marker_end="arrow", stroke_color="black"):
         order_path = self.utils.create_element(
@@ -205,20 +235,18 @@ class OrderDrawer:
         )
         return order_path
 
+    def clear_convoy_paths(self) -> None:
+        """Forgets found convoy paths, as they go stale whenever convoy orders change."""
+        self.convoy_paths = {}
+        self._convoy_path_cache = {}
+
     def find_convoy_path(self, start: Province, end: Province) -> list[list[Province]]:
         """Finds convoy paths between two provinces, if they exist. Caches results.
         We need to do this before drawing anything, as otherwise supports won't know where to draw to."""
-        valid_convoys = self._path_helper(start, end, start)
-        if valid_convoys:
-            if len(valid_convoys) > 1 and [start, end] in valid_convoys:
-                valid_convoys.remove([start, end])
-        else:
-            valid_convoys = [[start, end]]
-        valid_convoys.sort(key = len)
-        shortest_convoys: list[list[Province]] = []
-        for convoy in valid_convoys:
-            if not any(set(shortest).issubset(convoy) for shortest in shortest_convoys):
-                shortest_convoys.append(convoy)
+        key = (start, end, self.player_restriction)
+        if key not in self._convoy_path_cache:
+            self._convoy_path_cache[key] = self._path_helper(start, end) or [[start, end]]
+        shortest_convoys = self._convoy_path_cache[key]
         self.convoy_paths[start] = shortest_convoys
         return shortest_convoys
 
@@ -226,9 +254,6 @@ class OrderDrawer:
         def f(point: tuple[float, float]):
             return " ".join(map(str, point))
 
-        def norm(point: tuple[float, float]) -> tuple[float, float]:
-            return point / ((np.sum(np.array(point)**2)) ** 0.5)
-
         valid_convoys = self.convoy_paths.get(unit.province, [[unit.province, order.destination]])
         latest_paths = []
         for path in valid_convoys:
@@ -243,19 +268,11 @@ class OrderDrawer:
 
             p = np.array(p)
 
-            # given surrounding points, generate a control point
-            def g(point: np.ndarray) -> tuple[float, float]:
-                centered = point[::2] - point[1]
-
-                # TODO: possible div / 0 if the two convoyed points are in a straight line with the convoyer on one side
-                vec = tuple(np.subtract(centered[0], norm(centered[1])))
-                return norm(vec) * 30 + point[1]
-
             # this is a bit weird, because the loop is in-between two values
             # (S LO)(OP LO)(OP E)
             s = f"M {f(p[0])} C {f(p[1])}, "
-            for x in range(1, len(p) - 1):
-                s += f"{f(g(p[x-1:x+2]))}, {f(p[x])} S "
+            for control, point in zip(get_control_points(p), p[1:-1]):
+                s += f"{f(control)}, {f(point)} S "
 
             s += f"{f(p[-2])}, {f(p[-1])}"
             stroke_color = "red" if has_failed else "black"
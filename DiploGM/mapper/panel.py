@@ -1,17 +1,53 @@
 """Module responsible for drawing the side panel on the map, which includes the date and scoreboard."""
 from __future__ import annotations
 import re
+from dataclasses import dataclass
 from typing import TYPE_CHECKING
 from xml.etree.ElementTree import ElementTree, Element
 
 from DiploGM.map_parser.vector.utils import get_element_color, find_svg_element
 from DiploGM.map_parser.vector.transform import TransGL3
+from DiploGM.profiler import profiler
 
 if TYPE_CHECKING:
     from DiploGM.models.board import Board
     from DiploGM.models.player import Player
     from DiploGM.mapper.utils import MapperUtils
 
+@dataclass
+class BannerLayout:
+    """Where a power banner sits in the variant SVG, before anything is drawn on it."""
+    position: int
+    color: str | None
+    # position of the banner's rectangle before the banner's own transform is applied
+    pretransform_coordinates: tuple[float, float]
+    coordinates: tuple[float, float]
+
+
+class PanelLayout:
+    """The static layout of the side panel for a variant, parsed once per MapTemplate."""
+    def __init__(self, svg: ElementTree, svg_config: dict):
+        self.banners: list[BannerLayout] = []
+        self.scoreboard_power_locations: list[tuple[float, float]] = []
+
+        all_power_banners_element = find_svg_element(svg, "power_banners", svg_config)
+        if all_power_banners_element is None:
+            return
+        for position, power_element in enumerate(all_power_banners_element):
+            if len(power_element) == 0:
+                continue
+            pretransform_coordinates = TransGL3(power_element[0]).transform((float(power_element[0].get("x", 0)),
+                                                                             float(power_element[0].get("y", 0))))
+            coordinates = TransGL3(power_element).transform(pretransform_coordinates)
+            self.banners.append(BannerLayout(position, get_element_color(power_element[0]),
+                                             pretransform_coordinates, coordinates))
+            self.scoreboard_power_locations.append(coordinates)
+
+        # each power is placed in the right spot based on the transform field which has value of
+        # "translate($x,$y)" where x,y are floating point numbers; we parse these via regex and sort by y-value
+        self.scoreboard_power_locations.sort(key=lambda loc: loc[1])
+
+
 class PanelDrawer:
     """Class responsible for drawing the panel on the map."""
     def __init__(self,
@@ -19,51 +55,35 @@ class PanelDrawer:
                  board_svg: ElementTree,
                  board: Board,
                  player_colors: dict[str, str],
-                 restriction: Player | None = None):
+                 restriction: Player | None = None,
+                 layout: PanelLayout | None = None):
         self.utils = utils
         self.board_svg = board_svg
         self.board = board
         self.board_svg_data = board.data["svg config"]
         self.player_colors = player_colors
         self.restriction = restriction
-
-        all_power_banners_element = find_svg_element(
-            self.board_svg, "power_banners", self.board_svg_data
-        )
-        if all_power_banners_element is None:
-            return
-        self.scoreboard_power_locations: list[tuple[float, float]] = []
-        for power_element in all_power_banners_element or []:
-            destination_pretransform_coordinates = TransGL3(power_element[0]).transform((float(power_element[0].get("x", 0)),
-                                                                                         float(power_element[0].get("y", 0))))
-            destination_coordinates = TransGL3(power_element).transform(destination_pretransform_coordinates)
-            self.scoreboard_power_locations.append(destination_coordinates)
-
-        # each power is placed in the right spot based on the transform field which has value of
-        # "translate($x,$y)" where x,y are floating point numbers; we parse these via regex and sort by y-value
-        self.scoreboard_power_locations.sort(key=lambda loc: loc[1])
-
+        # usually shared through the MapTemplate, as the layout doesn't change between renders
+        self.layout = layout if layout is not None else PanelLayout(board_svg, self.board_svg_data)
+        self.scoreboard_power_locations = self.layout.scoreboard_power_locations
 
     def draw_side_panel(self, svg: ElementTree) -> None:
         """Draws the side panel with the date and scoreboard."""
-        self._draw_side_panel_date(svg)
-        self._draw_side_panel_scoreboard(svg)
-
-    def _draw_power_banner(self, power_element: Element, player: Player,
-                           banner_index: int, high_player_count: bool) -> bool:
-        if len(power_element) == 0:
-            return False
-        initial_pretransform_coordinates = TransGL3(power_element[0]).transform((float(power_element[0].get("x", 0)),
-                                                                                 float(power_element[0].get("y", 0))))
-        banner_coordinates = TransGL3(power_element).transform(initial_pretransform_coordinates)
-        if high_player_count and banner_coordinates != self.scoreboard_power_locations[banner_index]:
-            return False
-        if not high_player_count and get_element_color(power_element[0]) != player.default_color:
-            return False
+        with profiler.span("mapper.panel", self.board.datafile):
+            self._draw_side_panel_date(svg)
+            self._draw_side_panel_scoreboard(svg)
+
+    def _is_banner_for(self, banner: BannerLayout, player: Player, banner_index: int, high_player_count: bool) -> bool:
+        if high_player_count:
+            return banner.coordinates == self.scoreboard_power_locations[banner_index]
+        return banner.color == player.default_color
+
+    def _draw_power_banner(self, power_element: Element, banner: BannerLayout, player: Player,
+                           banner_index: int, high_player_count: bool) -> None:
         player_data = self.board.data["players"][player.name]
         if player_data.get("hidden") == "true":
             power_element.clear()
-            return True
+            return
 
        # TODO: Add support for chaos "points" and perhaps simplify this whole thing
         name_index = self.board_svg_data.get("power_name_index", 1)
@@ -72,8 +92,8 @@ class PanelDrawer:
         vscc_index = self.board_svg_data.get("power_vscc_index", 7)
 
         self.utils.color_element(power_element[0], self.player_colors[player.name])
-        new_translation = (self.scoreboard_power_locations[banner_index][0] - initial_pretransform_coordinates[0],
-                            self.scoreboard_power_locations[banner_index][1] - initial_pretransform_coordinates[1])
+        new_translation = (self.scoreboard_power_locations[banner_index][0] - banner.pretransform_coordinates[0],
+                            self.scoreboard_power_locations[banner_index][1] - banner.pretransform_coordinates[1])
         power_element.set("transform", f"translate({new_translation[0]}, {new_translation[1]})")
         if high_player_count or player_data.get("nickname"):
             power_element[name_index][0].text = player.get_name()
@@ -94,7 +114,10 @@ class PanelDrawer:
             power_element[vscc_index][0].text = str(self.board.data["victory_count"])
         elif vscc_index > -1:
             power_element[vscc_index][0].text = str(player_data["vscc"])
-        return True
+
+    def _is_high_player_count(self) -> bool:
+        return (len(self.board.get_players()) > len(self.scoreboard_power_locations)
+                or self.board.data.get("vassals") == "enabled")
 
     def _draw_side_panel_scoreboard(self, svg: ElementTree) -> None:
         """
@@ -120,14 +143,18 @@ class PanelDrawer:
         players = sorted(players, key=lambda hidden_player:
                                   self.board.is_player_hidden(hidden_player))
 
-        high_player_count = (len(self.board.get_players()) > len(self.scoreboard_power_locations)
-                             or self.board.data.get("vassals") == "enabled")
+        high_player_count = self._is_high_player_count()
+        power_elements = list(all_power_banners_element)
+        used_banners: set[int] = set()
         for i, player in enumerate(self.board.get_players_sorted_by_score()):
             if i >= len(self.scoreboard_power_locations):
                 break
-            for power_element in all_power_banners_element:
-                if self._draw_power_banner(power_element, player, i, high_player_count):
-                    break
+            for banner in self.layout.banners:
+                if banner.position in used_banners or not self._is_banner_for(banner, player, i, high_player_count):
+                    continue
+                used_banners.add(banner.position)
+                self._draw_power_banner(power_elements[banner.position], banner, player, i, high_player_count)
+                break
 
     def _draw_side_panel_date(self, svg: ElementTree) -> None:
         date = find_svg_element(svg, "season", self.board_svg_data)
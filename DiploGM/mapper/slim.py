@@ -0,0 +1,161 @@
+"""Post-processing that shrinks rendered SVGs before they are rasterized or sent."""
+import re
+from collections import Counter
+from xml.etree.ElementTree import Element
+
+from DiploGM.map_parser.vector.utils import NAMESPACE
+
+SVG_NAMESPACE = "http://www.w3.org/2000/svg"
+EDITOR_NAMESPACES = (f"{{{NAMESPACE['inkscape']}}}", f"{{{NAMESPACE['sodipodi']}}}")
+EDITOR_ELEMENTS = {f"{{{SVG_NAMESPACE}}}metadata", f"{{{NAMESPACE['sodipodi']}}}namedview"}
+GROUP_TAG = f"{{{SVG_NAMESPACE}}}g"
+DEFS_TAG = f"{{{SVG_NAMESPACE}}}defs"
+STYLE_TAG = f"{{{SVG_NAMESPACE}}}style"
+HREF_ATTRIBUTES = ("href", "{http://www.w3.org/1999/xlink}href")
+
+_number_regex = re.compile(r"([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)")
+_url_regex = re.compile(r"url\(\s*['\"]?#([^)'\"]+)['\"]?\s*\)")
+_display_none_regex = re.compile(r"(?:^|;)\s*display\s*:\s*none\s*(?:;|$)")
+
+
+def slim_svg(root: Element, precision: int = 2) -> None:
+    """Shrinks an SVG in place without changing how it renders.
+    Strips editor metadata, drops hidden elements, empty groups and unused defs,
+    moves repeated styles into classes and rounds path coordinates to the given number of decimals."""
+    _strip_editor_data(root)
+    _remove_hidden_elements(root)
+    _remove_empty_groups(root)
+    _remove_unused_defs(root)
+    _round_path_data(root, precision)
+    _deduplicate_styles(root)
+
+
+def _strip_editor_data(root: Element) -> None:
+    for element in list(root.iter()):
+        if not isinstance(element.tag, str):
+            continue
+        if element.tag in EDITOR_ELEMENTS:
+            parent = element.getparent()
+            if parent is not None:
+                parent.remove(element)
+            continue
+        for key in [key for key in element.attrib if key.startswith(EDITOR_NAMESPACES)]:
+            del element.attrib[key]
+
+
+def _is_hidden(element: Element) -> bool:
+    if element.get("display") == "none":
+        return True
+    style = element.get("style")
+    return style is not None and _display_none_regex.search(style) is not None
+
+
+def _remove_hidden_elements(root: Element) -> None:
+    referenced = _get_referenced_ids(root)
+    stack = [root]
+    while stack:
+        element = stack.pop()
+        for child in list(element):
+            if not isinstance(child.tag, str) or child.tag == DEFS_TAG:
+                continue
+            if _is_hidden(child) and child.get("id") not in referenced:
+                element.remove(child)
+            else:
+                stack.append(child)
+
+
+def _remove_empty_groups(root: Element) -> None:
+    # children come after their parents in iter(), so walking backwards empties nested groups first
+    for element in reversed(list(root.iter(GROUP_TAG))):
+        if len(element) == 0 and not (element.text or "").strip():
+            parent = element.getparent()
+            if parent is not None:
+                parent.remove(element)
+
+
+def _get_referenced_ids(root: Element) -> set[str]:
+    referenced: set[str] = set()
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue
+        for key, value in element.attrib.items():
+            if key in HREF_ATTRIBUTES and value.startswith("#"):
+                referenced.add(value[1:])
+            elif "url(" in value:
+                referenced.update(_url_regex.findall(value))
+        if element.tag == STYLE_TAG and element.text:
+            referenced.update(_url_regex.findall(element.text))
+    return referenced
+
+
+def _remove_unused_defs(root: Element) -> None:
+    for defs in root.iter(DEFS_TAG):
+        # gradients can reference each other, so repeat until nothing else is removed
+        while True:
+            referenced = _get_referenced_ids(root)
+            unused = [child for child in defs
+                      if isinstance(child.tag, str) and child.tag != STYLE_TAG and child.get("id") not in referenced]
+            if not unused:
+                break
+            for child in unused:
+                defs.remove(child)
+
+
+def _format_number(token: str, precision: int) -> str:
+    if "." not in token and "e" not in token and "E" not in token:
+        return token
+    formatted = f"{float(token):.{precision}f}".rstrip("0").rstrip(".")
+    return "0" if formatted in ("-0", "") else formatted
+
+
+def round_numbers(data: str, precision: int) -> str:
+    """Rounds every number in path data or a point list, keeping adjacent numbers separated."""
+    pieces = _number_regex.split(data)
+    output: list[str] = []
+    for i, piece in enumerate(pieces):
+        if i % 2 == 0:
+            output.append(piece)
+            continue
+        number = _format_number(piece, precision)
+        # "1.5.5" is two numbers, so rounding the first to "2" would merge them without a separator
+        if output and output[-1] == "" and i > 1 and number[0] not in "-+":
+            output.append(" ")
+        output.append(number)
+    return "".join(output)
+
+
+def _round_path_data(root: Element, precision: int) -> None:
+    for element in root.iter():
+        if not isinstance(element.tag, str):
+            continue
+        for key in ("d", "points"):
+            value = element.get(key)
+            if value is not None:
+                element.set(key, round_numbers(value, precision))
+
+
+def _deduplicate_styles(root: Element) -> None:
+    # inline styles beat stylesheet rules, so moving them into classes is only safe without other stylesheets
+    if next(root.iter(STYLE_TAG), None) is not None:
+        return
+    styled = [element for element in root.iter() if isinstance(element.tag, str) and element.get("style")]
+    counts = Counter(element.get("style") for element in styled)
+    class_names: dict[str, str] = {}
+    for style, count in counts.most_common():
+        if count < 2:
+            break
+        class_names[style] = f"s{len(class_names)}"
+    if not class_names:
+        return
+
+    for element in styled:
+        style = element.attrib["style"]
+        if style not in class_names:
+            continue
+        del element.attrib["style"]
+        existing = element.get("class")
+        element.set("class", f"{existing} {class_names[style]}" if existing else class_names[style])
+
+    style_element = root.makeelement(STYLE_TAG, {})
+    style_element.text = "".join(f".{name}{{{style}}}" for style, name in class_names.items())
+    root.insert(0, style_element)
@@ -0,0 +1,156 @@
+"""Per-variant map templates, so the Mapper doesn't have to re-parse and re-resolve the SVG on every render."""
+from __future__ import annotations
+import copy
+import json
+import logging
+import threading
+from typing import TYPE_CHECKING
+from xml.etree.ElementTree import Element
+
+import lxml.etree as etree
+import numpy as np
+
+from DiploGM.map_parser.vector.utils import clear_svg_element, find_svg_element, NAMESPACE, SVG_CONFIG_KEY
+from DiploGM.mapper.panel import PanelLayout
+from DiploGM.mapper.utils import add_marker_definitions_to_svg, get_coordinate_array
+from DiploGM.models.province import ProvinceType
+from DiploGM.models.unit import UnitType
+
+if TYPE_CHECKING:
+    from xml.etree.ElementTree import ElementTree
+    from DiploGM.models.board import Board
+
+logger = logging.getLogger(__name__)
+
+# layers whose elements are recolored per province
+INDEXED_LAYERS = (
+    "land_layer",
+    "island_fill_layer",
+    "island_ring_layer",
+    "sea_borders",
+    "island_borders",
+    "supply_center_icons",
+)
+
+
+class MapTemplate:
+    """The parsed SVG for a variant, along with the position of each province's elements in the recolored layers."""
+    def __init__(self, board: Board):
+        self.svg_config: dict = board.data[SVG_CONFIG_KEY]
+        self.svg: ElementTree = etree.parse(board.data["file"])
+        clear_svg_element(self.svg, "starting_units", self.svg_config)
+        add_marker_definitions_to_svg(self.svg)
+
+        # layer name -> province name -> child positions within the layer
+        self.layer_index: dict[str, dict[str, list[int]]] = {}
+        problems: list[str] = []
+        for layer_name in INDEXED_LAYERS:
+            self.layer_index[layer_name] = {}
+            layer = find_svg_element(self.svg, layer_name, self.svg_config)
+            if layer is None:
+                continue
+            for position, element in enumerate(layer):
+                label = element.get(f"{NAMESPACE['inkscape']}label")
+                if label is None:
+                    problems.append(f"unlabeled element {element.get('id')} in {layer_name}")
+                    continue
+                try:
+                    province = board.get_province(label)
+                except ValueError as ex:
+                    problems.append(f"{layer_name}: {ex}")
+                    continue
+                if layer_name == "supply_center_icons" and not province.has_supply_center:
+                    problems.append(f"{layer_name}: province {province.name} says it has no supply center, but it does")
+                    continue
+                self.layer_index[layer_name].setdefault(province.name, []).append(position)
+
+        colored = set().union(*(self.layer_index[layer_name] for layer_name in
+                                ("land_layer", "island_fill_layer", "sea_borders", "island_borders")))
+        for province in board.provinces:
+            if province.name not in colored:
+                note = " (only affects fog of war)" if province.type == ProvinceType.SEA else ""
+                problems.append(f"province {province.name} will not be recolored by mapper{note}")
+
+        for problem in problems:
+            logger.warning(f"Map template for {board.datafile}: {problem}")
+
+        # (province name, unit type or coast, retreats) -> coordinates, see MapperUtils.get_coordinate_array
+        self.coordinate_arrays: dict[tuple[str, str, bool], np.ndarray] = {
+            (province.name, key, use_retreats): get_coordinate_array(locations, use_retreats)
+            for province in board.provinces
+            for key, locations in province.all_coordinates.items()
+            for use_retreats in (False, True)
+        }
+
+        self.panel_layout = PanelLayout(self.svg, self.svg_config)
+
+        # (half core, core, half core color, core color) -> half-core gradient, see MapperUtils.add_half_core_gradients_to_svg
+        self.gradient_defs: dict[tuple[str, str, str, str], Element] = {}
+
+        self._gui_data: str | None = None
+        self._default_locations: dict[str, list[float]] = {}
+
+    def copy_svg(self) -> ElementTree:
+        """Returns a fresh copy of the variant SVG to draw on."""
+        return copy.deepcopy(self.svg)
+
+    def get_gui_data(self, board: Board) -> str:
+        """Gets the phase-independent data used by the GUI map script as compact JSON."""
+        if self._gui_data is None:
+            location_data: dict[str, list[float]] = {}
+            coast_to_province: dict[str, str] = {}
+            province_to_province_type: dict[str, str] = {}
+            for province in board.provinces:
+                unit_type = UnitType.FLEET if province.type == ProvinceType.SEA else UnitType.ARMY
+                location_data[province.name] = list(province.get_unit_coordinates(unit_type))
+                for coast in province.get_multiple_coasts():
+                    location_data[province.get_name(coast)] = list(province.get_unit_coordinates(UnitType.FLEET, coast))
+                    coast_to_province[province.get_name(coast)] = province.name
+                province_to_province_type[province.name] = province.type.name.lower()
+            self._default_locations = location_data
+            self._gui_data = json.dumps({
+                "location_data": location_data,
+                "svg_config": self.svg_config,
+                "coast_to_province": coast_to_province,
+                "province_to_province_type": province_to_province_type,
+            }, separators=(",", ":"))
+        return self._gui_data
+
+    def get_gui_location_overrides(self, board: Board) -> dict[str, list[float]]:
+        """Gets the unit locations that differ from the defaults in get_gui_data for the current phase."""
+        self.get_gui_data(board)
+        overrides: dict[str, list[float]] = {}
+        for unit in board.units:
+            province = unit.province
+            if unit != province.unit:
+                continue
+            location = list(province.get_unit_coordinates(unit.unit_type, unit.coast))
+            if location != self._default_locations.get(province.name):
+                overrides[province.name] = location
+        return overrides
+
+    def get_layer_elements(self, svg: ElementTree, layer_name: str) -> dict[str, list[Element]]:
+        """Given a copy of the template SVG, gets the elements in a layer belonging to each province."""
+        layer = find_svg_element(svg, layer_name, self.svg_config)
+        if layer is None:
+            return {}
+        children = list(layer)
+        return {name: [children[position] for position in positions]
+                for name, positions in self.layer_index[layer_name].items()}
+
+
+templates: dict[str, MapTemplate] = {}
+templates_lock = threading.Lock()
+
+
+def get_map_template(board: Board, force_refresh: bool = False) -> MapTemplate:
+    with templates_lock:
+        if force_refresh or board.datafile not in templates:
+            logger.info(f"Creating new MapTemplate for board named {board.datafile}")
+            templates[board.datafile] = MapTemplate(board)
+        return templates[board.datafile]
+
+
+def clear_map_template(datafile: str) -> None:
+    with templates_lock:
+        templates.pop(datafile, None)
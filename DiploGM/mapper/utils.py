@@ -3,22 +3,77 @@ from __future__ import annotations
 import copy
 import math
 import re
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Iterable
 from xml.etree.ElementTree import ElementTree, Element
 import lxml.etree as etree
 import numpy as np
 
 if TYPE_CHECKING:
     from DiploGM.models.board import Board
-    from DiploGM.models.province import Province
+    from DiploGM.models.province import Province, UnitLocation
     from DiploGM.models.unit import Unit, UnitType
     from DiploGM.models.player import Player
     from DiploGM.models.turn import Turn
 
+def get_coordinate_array(locations: Iterable[UnitLocation], use_retreats: bool = False) -> np.ndarray:
+    """Gets the unique coordinates of some unit locations as an (n, 2) array."""
+    return np.array(list({loc.retreat_coordinate if use_retreats else loc.primary_coordinate
+                          for loc in locations}), dtype=float).reshape(-1, 2)
+
+def get_defs(svg: ElementTree) -> Element:
+    """Gets the SVG's defs element, creating it if needed."""
+    defs = svg.find("{http://www.w3.org/2000/svg}defs")
+    if defs is None:
+        defs = etree.Element("{http://www.w3.org/2000/svg}defs")
+        root = svg.getroot()
+        assert root is not None
+        root.append(defs)
+    return defs
+
+def add_marker_definitions_to_svg(svg: ElementTree) -> None:
+    """Adds the arrow and ball markers used by order arrows to the SVG.
+    These don't depend on the board, so they are added once to the MapTemplate."""
+    defs = get_defs(svg)
+    # TODO: Check if 'arrow' id is already defined in defs
+
+    arrow_data: dict[str, str] = {
+        "id": "arrow",
+        "viewbox": "0 0 3 3",
+        "refX": "1.5",
+        "refY": "1.5",
+        "markerWidth": "3",
+        "markerHeight": "3",
+        "orient": "auto-start-reverse",
+    }
+    ball_marker_data: dict[str, str] = {
+        "id": "ball",
+        "viewbox": "0 0 3 3",
+        # "refX": "1.5",
+        # "refY": "1.5",
+        "markerWidth": "3",
+        "markerHeight": "3",
+        "orient": "auto-start-reverse",
+        "shape-rendering": "geometricPrecision", # Needed bc firefox is weird
+        "overflow": "visible"
+    }
+    markers = (
+        (arrow_data, "arrow", "path", {"d": "M 0,0 L 3,1.5 L 0,3 z"}),
+        (arrow_data, "redarrow", "path", {"d": "M 0,0 L 3,1.5 L 0,3 z", "fill": "red"}),
+        (ball_marker_data, "ball", "circle", {"r": "2", "fill": "black"}),
+        (ball_marker_data, "redball", "circle", {"r": "2", "fill": "red"}),
+    )
+    for marker_data, marker_id, shape, shape_data in markers:
+        marker = etree.SubElement(defs, "marker", {**marker_data, "id": marker_id})
+        etree.SubElement(marker, shape, shape_data)
+
 class MapperUtils:
     """Utility functions for the mapper."""
-    def __init__(self, board_svg_data: dict[str, Any]):
+    def __init__(self,
+                 board_svg_data: dict[str, Any],
+                 coordinate_arrays: dict[tuple[str, str, bool], np.ndarray] | None = None):
         self.board_svg_data = board_svg_data
+        # (province name, unit type or coast, retreats) -> coordinates, usually shared through the MapTemplate
+        self.coordinate_arrays = coordinate_arrays if coordinate_arrays is not None else {}
 
     def create_element(self, tag: str, attributes: dict[str, Any]) -> etree.Element:
         """Creates an XML element with the given tag and attributes."""
@@ -43,30 +98,41 @@ class MapperUtils:
         """Normalizes a point to be within the bounds of the map, wrapping horizontally."""
         return (point[0] % self.board_svg_data["map_width"], point[1])
 
-    def get_closest_loc(self, possibilities: set[tuple[float, float]],
+    def get_coordinate_array(self, province: Province, key: str, use_retreats: bool = False) -> np.ndarray:
+        """Gets the unique unit coordinates of a province under a unit type or coast name as an (n, 2) array."""
+        cache_key = (province.name, key, use_retreats)
+        if (coords := self.coordinate_arrays.get(cache_key)) is None:
+            coords = get_coordinate_array(province.all_coordinates[key], use_retreats)
+            self.coordinate_arrays[cache_key] = coords
+        return coords
+
+    def get_closest_loc(self, possibilities: set[tuple[float, float]] | np.ndarray,
                         coord: tuple[float, float]) -> tuple[float, float]:
         """Gets the closest point to the given coordinate, accounting for horizontal wrapping of the map."""
-        possibilities_list = list(possibilities)
-        crossed_pos = []
-        crossed = []
+        return self.get_closest_locs([possibilities], [coord])[0]
+
+    def get_closest_locs(self, possibilities: list[set[tuple[float, float]] | np.ndarray],
+                         coords: list[tuple[float, float]]) -> list[tuple[float, float]]:
+        """Batched get_closest_loc, resolving the closest of possibilities[i] to coords[i] for every i at once."""
+        if not coords:
+            return []
+        arrays = [p if isinstance(p, np.ndarray) else np.array(list(p), dtype=float) for p in possibilities]
+        # pad to a rectangular array, padding is never picked as it's infinitely far away
+        width = max(len(p) for p in arrays)
+        points = np.full((len(arrays), width, 2), np.nan)
+        for i, p in enumerate(arrays):
+            points[i, :len(p)] = p
+        target = np.array(coords, dtype=float)[:, np.newaxis, :]
+
         map_width = self.board_svg_data["map_width"]
-        for p in possibilities_list:
-            x = p[0]
-            cx = coord[0]
-            if abs(x - cx) > map_width / 2:
-                crossed += [1]
-                x += map_width if x < cx else -map_width
-            else:
-                crossed += [0]
-            crossed_pos += [(x, p[1])]
-
-        crossed = np.array(crossed)
-        crossed_pos = np.array(crossed_pos)
-
-        dists = crossed_pos - coord
+        x = points[..., 0]
+        crossed = np.abs(x - target[..., 0]) > map_width / 2
+        points[..., 0] = np.where(crossed, np.where(x < target[..., 0], x + map_width, x - map_width), x)
+
         # penalty for crossing map is 500 px
-        short_ind = np.argmin(np.linalg.norm(dists, axis=1) + 500 * crossed)
-        return crossed_pos[short_ind].tolist()
+        dists = np.sqrt(np.sum((points - target) ** 2, axis=2)) + 500 * crossed
+        short_ind = np.argmin(np.where(np.isnan(dists), np.inf, dists), axis=1)
+        return points[np.arange(len(arrays)), short_ind].tolist()
 
     def loc_to_point(self, loc: Province, unit_type: UnitType, coast: str | None,
                     current: tuple[float, float], use_retreats=False) -> tuple[float, float]:
@@ -78,14 +144,13 @@ class MapperUtils:
             coast = loc.unit.coast
 
         if coast and coast in loc.all_coordinates:
-            coords = loc.all_coordinates[coast]
+            key = coast
         elif unit_type.name in loc.all_coordinates:
-            coords = loc.all_coordinates[unit_type.name]
+            key = unit_type.name
         else:
-            coords = next(iter(loc.all_coordinates.values()))
-        coords = {c.retreat_coordinate if use_retreats else c.primary_coordinate for c in coords}
+            key = next(iter(loc.all_coordinates))
 
-        return self.get_closest_loc(coords, current)
+        return self.get_closest_loc(self.get_coordinate_array(loc, key, use_retreats), current)
 
     def pull_coordinate(
         self,
@@ -115,89 +180,18 @@ class MapperUtils:
         scale = pull / distance
         return cx + dx * scale, cy + dy * scale
 
-    def add_arrow_definition_to_svg(self,
-                                    svg: ElementTree,
-                                    board: Board,
-                                    player_colors: dict[str, str]) -> None:
-        """ Adds arrow marker definitions and half-core gradients to the SVG."""
-        defs = svg.find("{http://www.w3.org/2000/svg}defs")
-        if defs is None:
-            defs = self.create_element("defs", {})
-            root = svg.getroot()
-            assert root is not None
-            root.append(defs)
-        # TODO: Check if 'arrow' id is already defined in defs
-
-        arrow_data: dict[str, str] = {
-            "id": "arrow",
-            "viewbox": "0 0 3 3",
-            "refX": "1.5",
-            "refY": "1.5",
-            "markerWidth": "3",
-            "markerHeight": "3",
-            "orient": "auto-start-reverse",
-        }
-        arrow_marker: Element = self.create_element(
-            "marker",
-            arrow_data
-        )
-        arrow_path: Element = self.create_element(
-            "path",
-            {"d": "M 0,0 L 3,1.5 L 0,3 z"},
-        )
-        arrow_marker.append(arrow_path)
-        defs.append(arrow_marker)
-
-        red_arrow_data: dict[str, str] = copy.deepcopy(arrow_data)
-        red_arrow_data["id"] = "redarrow"
-        red_arrow_marker: Element = self.create_element(
-            "marker",
-            red_arrow_data
-        )
-        red_arrow_path: Element = self.create_element(
-            "path",
-            {"d": "M 0,0 L 3,1.5 L 0,3 z", "fill": "red"},
-        )
-        red_arrow_marker.append(red_arrow_path)
-        defs.append(red_arrow_marker)
-
-        ball_marker_data: dict[str, str] = {
-            "id": "ball",
-            "viewbox": "0 0 3 3",
-            # "refX": "1.5",
-            # "refY": "1.5",
-            "markerWidth": "3",
-            "markerHeight": "3",
-            "orient": "auto-start-reverse",
-            "shape-rendering": "geometricPrecision", # Needed bc firefox is weird
-            "overflow": "visible"
-        }
-        ball_marker: Element = self.create_element(
-            "marker",
-            ball_marker_data
-        )
-        ball_def: Element = self.create_element(
-            "circle",
-            {"r": "2", "fill": "black"},
-        )
-        ball_marker.append(ball_def)
-        defs.append(ball_marker)
-
-        red_ball_data: dict[str, str] = copy.deepcopy(ball_marker_data)
-        red_ball_data["id"] = "redball"
-        red_ball_marker: Element = self.create_element(
-            "marker",
-            red_ball_data
-        )
-        red_ball_def: Element = self.create_element(
-            "circle",
-            {"r": "2", "fill": "red"},
-        )
-        red_ball_marker.append(red_ball_def)
-        defs.append(red_ball_marker)
-
+    def add_half_core_gradients_to_svg(self,
+                                       svg: ElementTree,
+                                       board: Board,
+                                       player_colors: dict[str, str],
+                                       gradient_cache: dict[tuple[str, str, str, str], Element] | None = None) -> None:
+        """Adds the half-core gradients referenced by the board's supply centers to the SVG.
+        Gradients are reused from gradient_cache (usually the MapTemplate's) when the same pair of colors was drawn before."""
         if board.data.get("build_options") != "cores":
             return
+        if gradient_cache is None:
+            gradient_cache = {}
+        defs = get_defs(svg)
         created_defs = set()
 
         for province in board.provinces:
@@ -210,16 +204,20 @@ class MapperUtils:
 
             created_defs.add(mapping)
 
-            gradient_def: Element = self.create_element("linearGradient", {"id": f"{mapping[0]}_{mapping[1]}"})
-            first: Element = self.create_element(
-                "stop", {"offset": "50%", "stop-color": f"#{player_colors[mapping[0]]}"}
-            )
-            second: Element = self.create_element(
-                "stop", {"offset": "50%", "stop-color": f"#{player_colors[mapping[1]]}"}
-            )
-            gradient_def.append(first)
-            gradient_def.append(second)
-            defs.append(gradient_def)
+            key = (*mapping, player_colors[mapping[0]], player_colors[mapping[1]])
+            gradient_def = gradient_cache.get(key)
+            if gradient_def is None:
+                gradient_def = self.create_element("linearGradient", {"id": f"{mapping[0]}_{mapping[1]}"})
+                first: Element = self.create_element(
+                    "stop", {"offset": "50%", "stop-color": f"#{key[2]}"}
+                )
+                second: Element = self.create_element(
+                    "stop", {"offset": "50%", "stop-color": f"#{key[3]}"}
+                )
+                gradient_def.append(first)
+                gradient_def.append(second)
+                gradient_cache[key] = gradient_def
+            defs.append(copy.deepcopy(gradient_def))
 
     def color_element(self, element: Element, color: str, key="fill"):
         """Colors a specific element with a given color."""
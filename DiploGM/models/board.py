@@ -1,19 +1,23 @@
 """The board for a given turn, containing all the game state information."""
 from __future__ import annotations
+import copy
+import hashlib
 import json
 import logging
 import os
 import re
 import time
+from types import CodeType
 from typing import Dict, Optional, TYPE_CHECKING
 
 from discord import Thread, TextChannel
 
 from DiploGM.config import PLAYER_CHANNEL_SUFFIX, is_player_category
 from DiploGM.models.order import NMR, Move, Hold, Support, ConvoyTransport, Core, Transform, RetreatMove, RetreatDisband
-from DiploGM.models.province import ProvinceType
+from DiploGM.models.province import ProvinceAdjacency, ProvinceType
 from DiploGM.models.unit import Unit, UnitType, DPAllocation
 from DiploGM.models.turn import Turn
+from DiploGM.profiler import profiler
 from DiploGM.utils.sanitise import parse_variant_path, sanitise_name, simple_player_name
 
 if TYPE_CHECKING:
@@ -25,6 +29,49 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+
+# scripts.py path -> (modification time, size, SHA-256, compiled code)
+# Only scripts that compile are cached, so a broken script is read again on the next run
+_compiled_scripts: dict[str, tuple[int, int, str, CodeType]] = {}
+
+
+def _get_compiled_script(scripts_path: str, variant: str | None = None) -> CodeType | None:
+    """Gets the compiled code of a variant's scripts.py, or None if it doesn't have one.
+    The file is only read again if its modification time or size changes, and only compiled again if its
+    contents do. variant is only used to attribute the compile time."""
+    try:
+        stat = os.stat(scripts_path)
+    except FileNotFoundError:
+        _compiled_scripts.pop(scripts_path, None)
+        return None
+    cached = _compiled_scripts.get(scripts_path)
+    if cached is not None and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+        return cached[3]
+
+    with open(scripts_path, "rb") as f:
+        source = f.read()
+    digest = hashlib.sha256(source).hexdigest()
+    if cached is not None and cached[2] == digest:
+        script_code = cached[3]
+    else:
+        start = time.perf_counter()
+        script_code = compile(source, scripts_path, "exec")
+        elapsed = time.perf_counter() - start
+        profiler.record("variant_scripts.compile", elapsed, variant)
+        logger.info(f"Compiled {scripts_path} in {elapsed:.3f}s")
+    _compiled_scripts[scripts_path] = (stat.st_mtime_ns, stat.st_size, digest, script_code)
+    return script_code
+
+
+def _merge_custom_data(data: dict, custom_data: dict) -> None:
+    for key, value in custom_data.items():
+        if isinstance(value, dict):
+            if not isinstance(data.get(key), dict):
+                data[key] = {}
+            _merge_custom_data(data[key], value)
+        else:
+            data[key] = copy.deepcopy(value)
+
 class Board:
     """The board for a given turn, containing all the game state information."""
     def __init__(
@@ -55,6 +102,7 @@ class Board:
         self.datafile = datafile
         self.name: str | None = None
         self.fow = fow
+        self._visibility_cache: dict[str, tuple[tuple, frozenset[Province]]] = {}
 
         # store as lower case for user input purposes
         self.name_to_player: Dict[str, Player] = {player.name.lower(): player for player in self.players}
@@ -94,12 +142,17 @@ class Board:
     def run_variant_scripts(self):
         """Runs the variant's scripts.py if it exists, in a sandboxed environment."""
         variant_path = parse_variant_path(self.datafile)
-        scripts_path = os.path.join(variant_path, "scripts.py")
-        if os.path.isfile(scripts_path):
-            with open(scripts_path, "r", encoding="utf-8") as f:
-                script_code = f.read()
-            allowed_globals = {"__builtins__": __builtins__, "board": self}
-            exec(compile(script_code, scripts_path, "exec"), allowed_globals)
+        script_code = _get_compiled_script(os.path.join(variant_path, "scripts.py"), self.datafile)
+        if script_code is None:
+            return
+        # each run gets its own globals, so nothing a script does carries over to the next board
+        allowed_globals = {"__builtins__": __builtins__, "board": self}
+        with profiler.span("variant_scripts.run", self.datafile):
+            try:
+                exec(script_code, allowed_globals)
+            except Exception:
+                logger.exception(f"{self.datafile}: variant script failed")
+                raise
 
     def update_players(self):
         """Goes through the datafile and adds any missing players/nicknames."""
@@ -110,6 +163,72 @@ class Board:
             if (nickname := self.data["players"][player.name].get("nickname")):
                 self.add_nickname(player, nickname)
 
+    def rebind_variant(self, variant_board: Board) -> bool:
+        """Replaces the map data of this board (shapes, adjacencies, coasts, unit coordinates, supply centers and
+        config) with that of a newly parsed board of the same variant, keeping the game state.
+        Returns False without changing anything if the boards can't be matched up,
+        e.g. if provinces or players were added or removed, in which case the board should be reloaded instead."""
+        provinces = {province.name: province for province in self.provinces}
+        new_provinces = {province.name: province for province in variant_board.provinces}
+        player_names = {player.name for player in self.players}
+        new_player_names = {player.name for player in variant_board.players}
+        custom_player_names = set(self.custom_data.get("players", {}))
+        if (provinces.keys() != new_provinces.keys()
+            or variant_board.year_offset != self.year_offset
+            or not new_player_names <= player_names
+            or not player_names - new_player_names <= custom_player_names):
+            return False
+        for unit in self.units:
+            if unit.coast and unit.coast not in new_provinces[unit.province.name].get_multiple_coasts():
+                return False
+
+        def rebind(location: Province | tuple[Province, str | None]) -> Province | tuple[Province, str | None]:
+            if isinstance(location, tuple):
+                return provinces[location[0].name], location[1]
+            return provinces[location.name]
+
+        for name, province in provinces.items():
+            new_province = new_provinces[name]
+            province.geometry = new_province.geometry
+            province.type = new_province.type
+            province.can_convoy = new_province.can_convoy
+            province.has_supply_center = new_province.has_supply_center
+            province.unit_coordinates = dict(new_province.unit_coordinates)
+            province.all_coordinates = {key: set(locations) for key, locations in new_province.all_coordinates.items()}
+            new_adjacency = new_province.adjacency_data
+            if isinstance(new_adjacency.fleet_adjacent, dict):
+                fleet_adjacent = {coast: {rebind(location) for location in locations}
+                                  for coast, locations in new_adjacency.fleet_adjacent.items()}
+            else:
+                fleet_adjacent = {rebind(location) for location in new_adjacency.fleet_adjacent}
+            province.adjacency_data = ProvinceAdjacency(
+                {provinces[adjacent.name] for adjacent in new_adjacency.adjacent},
+                fleet_adjacent,
+                set(new_adjacency.nonadjacent_coasts),
+                set(new_adjacency.difficult_adjacencies),
+            )
+
+        # The board's config is the variant's, with this game's own parameters on top, as when it's loaded
+        self.data = copy.deepcopy(variant_board.data)
+        _merge_custom_data(self.data, self.custom_data)
+        self.fow = variant_board.fow
+        new_players = {player.name: player for player in variant_board.players}
+        for player in self.players:
+            if player.name in new_players:
+                player.color_dict = new_players[player.name].color_dict
+                player.default_color = new_players[player.name].default_color
+            player.centers = {province for province in self.provinces
+                              if province.owner == player and province.has_supply_center}
+        if self.data["players"] != "chaos":
+            self.update_players()
+
+        self.name_to_coast = {}
+        for location in self.provinces:
+            for coast in location.get_multiple_coasts():
+                self.name_to_coast[location.get_name(coast)] = (location, coast)
+        self._visibility_cache.clear()
+        return True
+
     def get_player(self, name: str) -> Optional[Player]:
         """Gets a player by their name or nickname."""
         name = sanitise_name(name)
@@ -228,20 +347,34 @@ class Board:
 
     def get_visible_provinces(self, player: Player) -> set[Province]:
         """Gets a set of provinces that a player can see in Fog of War games."""
+        # Units and cores can be changed directly by the adjudicators and edit commands,
+        # so cached entries are validated against the state visibility depends on
+        state = self._get_visibility_state(player)
+        cached = self._visibility_cache.get(player.name)
+        if cached is None or cached[0] != state:
+            cached = (state, frozenset(self._compute_visible_provinces(player)))
+            self._visibility_cache[player.name] = cached
+        return set(cached[1])
+
+    def get_all_visible_provinces(self) -> dict[Player, set[Province]]:
+        """Gets the visible provinces for every player at once."""
+        return {player: self.get_visible_provinces(player) for player in self.players}
+
+    def _get_visibility_state(self, player: Player) -> tuple:
+        units = frozenset((unit.unit_type, unit.province.name, unit.coast) for unit in player.units)
+        cores = frozenset(province.name for province in player.centers if province.core_data.core == player)
+        return self.turn.get_indexed_name(), units, frozenset(p.name for p in player.centers), cores
+
+    def _compute_visible_provinces(self, player: Player) -> set[Province]:
         visible: set[Province] = set()
-        for province in self.provinces:
-            for unit in player.units:
-                if (unit.unit_type == UnitType.ARMY
-                    and province in unit.province.adjacency_data.adjacent
-                    and province.type != ProvinceType.SEA):
-                    visible.add(province)
-
-                if (unit.unit_type == UnitType.FLEET
-                    and unit.province.is_coastally_adjacent((province, None), unit.coast)):
-                    visible.add(province)
-
         for unit in player.units:
             visible.add(unit.province)
+            if unit.unit_type == UnitType.ARMY:
+                visible.update(province for province in unit.province.adjacency_data.adjacent
+                               if province.type != ProvinceType.SEA)
+            elif unit.unit_type == UnitType.FLEET:
+                for location in unit.province.get_coastal_adjacent(unit.coast):
+                    visible.add(location[0] if isinstance(location, tuple) else location)
 
         for province in player.centers:
             if province.core_data.core == player:
@@ -12,6 +12,7 @@ if TYPE_CHECKING:
 
 class Order:
     """Order is a player's game state API."""
+    __slots__ = ()
 
     def __init__(self):
         pass
@@ -20,6 +21,7 @@ class Order:
 # moves, holds, etc.
 class UnitOrder(Order):
     """Unit orders are orders that units execute themselves."""
+    __slots__ = ("has_failed", "destination", "destination_coast", "source", "is_support_holdable")
     display_priority: int = 0
 
     def __init__(self):
@@ -42,6 +44,7 @@ class UnitOrder(Order):
 
 class ComplexOrder(UnitOrder):
     """Complex orders are orders that operate on other orders (supports and convoys)."""
+    __slots__ = ()
 
     def __init__(self, source: Province):
         super().__init__()
@@ -49,6 +52,7 @@ class ComplexOrder(UnitOrder):
 
 class NMR(UnitOrder):
     """No Move Recorded. Identical in function to Hold but done when an order is not given."""
+    __slots__ = ()
     display_priority: int = 20
 
     def __str__(self):
@@ -56,6 +60,7 @@ class NMR(UnitOrder):
 
 class Hold(UnitOrder):
     """Unit holds in place."""
+    __slots__ = ()
     display_priority: int = 20
 
     def __str__(self):
@@ -64,6 +69,7 @@ class Hold(UnitOrder):
 
 class Core(UnitOrder):
     """Unit cores and over two turns can turn a SC into a home SC. May be supportable depending on game rules."""
+    __slots__ = ()
     display_priority: int = 20
 
     def __init__(self):
@@ -75,6 +81,7 @@ class Core(UnitOrder):
 
 class Transform(UnitOrder):
     """Unit transforms from Army to Fleet or vice versa. This is the Order used in movement phases."""
+    __slots__ = ()
     display_priority: int = 20
 
     def __init__(self, destination_coast: str | None = None):
@@ -90,6 +97,7 @@ class Transform(UnitOrder):
 
 class Move(UnitOrder):
     """Moves a unit from one location to another. Does include moves via convoy."""
+    __slots__ = ("is_sortie",)
     display_priority: int = 30
 
     def __init__(self, destination: Province, destination_coast: str | None = None):
@@ -111,6 +119,7 @@ class Move(UnitOrder):
 
 class ConvoyTransport(ComplexOrder):
     """Convoys an Army from one Province to another."""
+    __slots__ = ()
     def __init__(self, source: Province, destination: Province):
         super().__init__(source)
         self.destination: Province = destination
@@ -127,6 +136,7 @@ class ConvoyTransport(ComplexOrder):
 
 class Support(ComplexOrder):
     """If source and destination are different, this is a support move. If they're the same, it's a support hold."""
+    __slots__ = ()
     display_priority: int = 10
 
     def __init__(self, source: Province, destination: Province, destination_coast: str | None = None):
@@ -156,6 +166,7 @@ class Support(ComplexOrder):
 
 class RetreatMove(UnitOrder):
     """For unit retreats."""
+    __slots__ = ()
     def __init__(self, destination: Province, destination_coast: str | None = None):
         super().__init__()
         self.destination: Province = destination
@@ -173,6 +184,7 @@ class RetreatMove(UnitOrder):
 
 class RetreatDisband(UnitOrder):
     """For disbands during retreats."""
+    __slots__ = ()
 
     def __str__(self):
         return "Disbands"
@@ -180,6 +192,7 @@ class RetreatDisband(UnitOrder):
 
 class PlayerOrder(Order):
     """Player orders are orders that belong to a player rather than a unit e.g. builds."""
+    __slots__ = ("province", "coast")
 
     def __init__(self, province: Province):
         super().__init__()
@@ -195,6 +208,7 @@ class PlayerOrder(Order):
 
 class Build(PlayerOrder):
     """Builds are player orders because the unit does not yet exist."""
+    __slots__ = ("unit_type",)
 
     def __init__(self, province: Province, unit_type: UnitType, coast: str | None = None):
         super().__init__(province)
@@ -207,12 +221,14 @@ class Build(PlayerOrder):
 
 class Disband(PlayerOrder):
     """Disbands are player order because builds are."""
+    __slots__ = ()
 
     def __str__(self):
         return f"Disband {self.province}"
 
 class TransformBuild(PlayerOrder):
     """This is for Transforming units during adjustment phases."""
+    __slots__ = ()
     def __init__(self, province: Province, destination_coast: str | None = None):
         super().__init__(province)
         self.coast = destination_coast
@@ -222,6 +238,7 @@ class TransformBuild(PlayerOrder):
 
 class Waive(Order):
     """Waives some number of builds. Doesn't do anything on adjudication."""
+    __slots__ = ("quantity",)
     def __init__(self, quantity: int):
         super().__init__()
         self.quantity: int = quantity
@@ -231,6 +248,7 @@ class Waive(Order):
 
 class RelationshipOrder(Order):
     """Vassal, Dual Monarchy, etc"""
+    __slots__ = ("player", "coast")
 
     nameId: str | None = None
 
@@ -247,36 +265,42 @@ class RelationshipOrder(Order):
 
 class Vassal(RelationshipOrder):
     """Specifies player to vassalize."""
+    __slots__ = ()
 
     def __str__(self):
         return f"Vassalize {self.player}"
 
 class Liege(RelationshipOrder):
     """Specifies player to swear allegiance to."""
+    __slots__ = ()
 
     def __str__(self):
         return f"Liege {self.player}"
 
 class DualMonarchy(RelationshipOrder):
     """Specifies player to swear allegiance to."""
+    __slots__ = ()
 
     def __str__(self):
         return f"Dual Monarchy with {self.player}"
 
 class Disown(RelationshipOrder):
     """Specifies player to drop as a vassal."""
+    __slots__ = ()
 
     def __str__(self):
         return f"Disown {self.player}"
 
 class Defect(RelationshipOrder):
     """Defect. Player is always your liege"""
+    __slots__ = ()
 
     def __str__(self):
         return "Defect"
 
 class RebellionMarker(RelationshipOrder):
     """Psudorder to mark rebellion from player due to class"""
+    __slots__ = ()
 
     def __str__(self):
         return f"(Rebelling from {self.player})"
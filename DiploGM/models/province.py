@@ -23,14 +23,14 @@ class ProvinceType(Enum):
     ISLAND = 2
     SEA = 3
 
-@dataclass
+@dataclass(slots=True)
 class ProvinceCore:
     """Information regarding the status of the province's cores."""
     core: player.Player | None = None
     half_core: player.Player | None = None
     corer: player.Player | None = None
 
-@dataclass
+@dataclass(slots=True)
 class ProvinceAdjacency:
     """Contains adjacency information about a province.
     At some point this should be moved into a ProvinceGeom class or something."""
@@ -49,6 +49,10 @@ class UnitLocation:
 
 class Province():
     """Represents a province on the map."""
+    # Boards hold hundreds of these, so they don't get a __dict__
+    __slots__ = ("name", "geometry", "unit_coordinates", "type", "is_impassable", "can_convoy", "has_supply_center",
+                 "owner", "core_data", "unit", "dislodged_unit", "adjacency_data", "all_coordinates")
+
     def __init__(
         self,
         name: str,
@@ -73,6 +77,20 @@ class Province():
         # This assumes that only fleet units have to deal with multiple coasts
         self.all_coordinates: dict[str, set[UnitLocation]] = {}
 
+    # Pickles the slots as a plain dict, like a __dict__ would be,
+    # so that following a chain of adjacent provinces doesn't recurse any deeper than it used to
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    # Orders hash on their province's name, and can be unpickled before the rest of the province is,
+    # so the province is created with its name already set
+    def __reduce_ex__(self, protocol):
+        return _new_province, (type(self), self.name), self.__getstate__()
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+
     def __str__(self):
         return self.name
 
@@ -328,3 +346,9 @@ class Province():
 
         # no connection worked
         return False
+
+
+def _new_province(cls: type[Province], name: str) -> Province:
+    province = cls.__new__(cls)
+    province.name = name
+    return province
@@ -17,7 +17,7 @@ class UnitType(Enum):
     ARMY = "A"
     FLEET = "F"
 
-@dataclass
+@dataclass(slots=True)
 class DPAllocation:
     """Dataclass for storing DP allocation information."""
     points: int
@@ -25,6 +25,8 @@ class DPAllocation:
 
 class Unit:
     """Units information. They don't have a lot of logic to them aside from retreat options at the moment."""
+    __slots__ = ("unit_type", "player", "province", "coast", "retreat_options", "order", "dp_allocations")
+
     def __init__(
         self,
         unit_type: UnitType,
@@ -5,7 +5,6 @@ import string
 
 from DiploGM.config import ERROR_COLOUR, PARTIAL_ERROR_COLOUR
 from DiploGM.utils import get_unit_type, get_keywords, parse_season
-from DiploGM.mapper.mapper import Mapper
 from DiploGM.models.board import Board
 from DiploGM.db.database import get_connection
 from DiploGM.manager import Manager
@@ -16,9 +15,10 @@ logger = logging.getLogger(__name__)
 manager = Manager()
 
 
-def parse_edit_state(message: str, board: Board) -> tuple[str, str, bytes | None, str | None, str | None]:
+def parse_edit_state(message: str, board: Board) -> tuple[str, str, str | None, bool]:
     """Parses a message containing commands to edit the game state,
-    executes those commands, and returns a response message and an updated map if applicable."""
+    executes those commands, and returns a response message and whether any of them changed the board.
+    The updated map is drawn by the caller, through the render queue."""
     invalid: list[tuple[str, Exception]] = []
     commands = str.splitlines(message)
     for command in commands:
@@ -42,17 +42,15 @@ def parse_edit_state(message: str, board: Board) -> tuple[str, str, bytes | None
         response_title = "Commands validated successfully. Results map updated."
         response_body = ""
 
-    if len(invalid) < len(commands):
-        file, file_name = Mapper(board).draw_current_map()
-    else:
-        file, file_name = None, None
+    changed = len(invalid) < len(commands)
+    if changed:
+        manager.invalidate_maps(board.board_id)
 
     return (
         response_title,
         response_body,
-        file,
-        file_name,
         embed_colour,
+        changed,
     )
 
 def _set_phase(keywords: list[str], board: Board) -> None:
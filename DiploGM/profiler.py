@@ -0,0 +1,126 @@
+"""Optional timing spans for map rendering and rasterization, aggregated into per-variant histograms.
+Spans cost almost nothing while profiling is disabled, so they can be left in hot paths."""
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import math
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from DiploGM.config import PROFILER_DUMP_FILE, PROFILER_ENABLED
+
+logger = logging.getLogger(__name__)
+
+# variant attributed to spans inside Manager.render that aren't given one; anything outside a render passes its own
+current_variant: contextvars.ContextVar[str | None] = contextvars.ContextVar("current_variant", default=None)
+
+UNKNOWN_VARIANT = "unknown"
+
+
+class Histogram:
+    """Counts values into power of two buckets, along with their count, total and maximum."""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        # exponent -> number of values in [2**(exponent - 1), 2**exponent)
+        self.buckets: dict[int, int] = {}
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        exponent = math.frexp(value)[1]
+        self.buckets[exponent] = self.buckets.get(exponent, 0) + 1
+
+    def quantile(self, q: float) -> float:
+        """Gets an upper bound for the qth quantile, to within a factor of two."""
+        seen = 0
+        for exponent in sorted(self.buckets):
+            seen += self.buckets[exponent]
+            if seen >= q * self.count:
+                return min(math.ldexp(1, exponent), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "total": self.total,
+            "max": self.max,
+            "buckets": {str(math.ldexp(1, exponent)): count for exponent, count in sorted(self.buckets.items())},
+        }
+
+
+class Profiler:
+    """Collects spans and values by (variant, name)."""
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._histograms: dict[tuple[str, str], Histogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, value: float, variant: str | None = None) -> None:
+        """Records a value, e.g. a duration in seconds or a size in bytes."""
+        if not self.enabled:
+            return
+        key = (variant or current_variant.get() or UNKNOWN_VARIANT, name)
+        with self._lock:
+            if key not in self._histograms:
+                self._histograms[key] = Histogram()
+            self._histograms[key].add(value)
+
+    @contextmanager
+    def span(self, name: str, variant: str | None = None) -> Iterator[None]:
+        """Times the enclosed block."""
+        if not self.enabled:
+            yield
+            return
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start, variant)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._histograms.clear()
+
+    def get_summary(self, variant: str | None = None) -> str:
+        """Gets a human readable summary of the spans, by variant and then by total time spent."""
+        with self._lock:
+            items = sorted(self._histograms.items(), key=lambda item: (item[0][0], -item[1].total))
+        lines = []
+        current = None
+        for (span_variant, name), histogram in items:
+            if variant is not None and span_variant != variant:
+                continue
+            if span_variant != current:
+                current = span_variant
+                lines.append(f"**{span_variant}**")
+            if name.endswith("bytes"):
+                lines.append(f"{name}: {histogram.count}x, avg {histogram.total / histogram.count / 1024:.0f}KiB "
+                             f"max {histogram.max / 1024:.0f}KiB")
+            else:
+                lines.append(f"{name}: {histogram.count}x, total {histogram.total:.2f}s, "
+                             f"avg {histogram.total / histogram.count * 1000:.1f}ms "
+                             f"p90 <{histogram.quantile(0.9) * 1000:.1f}ms max {histogram.max * 1000:.1f}ms")
+        if not lines:
+            return "Nothing has been profiled." if self.enabled else "Profiling is disabled."
+        return "\n".join(lines)
+
+    def dump(self, path: str = PROFILER_DUMP_FILE) -> str:
+        """Writes every histogram to a JSON file, returning the path written to."""
+        with self._lock:
+            data: dict[str, dict[str, dict]] = {}
+            for (variant, name), histogram in sorted(self._histograms.items()):
+                data.setdefault(variant, {})[name] = histogram.to_dict()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        logger.info(f"profiler dumped {sum(map(len, data.values()))} histograms to {path}")
+        return path
+
+
+profiler = Profiler(PROFILER_ENABLED)
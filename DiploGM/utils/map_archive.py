@@ -8,7 +8,6 @@ import logging
 from subprocess import PIPE
 from typing import TYPE_CHECKING
 from discord.ext import commands
-from DiploGM.adjudicator.utils import svg_to_png
 from DiploGM.config import MAP_ARCHIVE_SAS_TOKEN, MAP_ARCHIVE_UPLOAD_URL
 from DiploGM.models.turn import Turn
 from DiploGM.utils import log_command, send_message_and_file
@@ -23,7 +22,7 @@ logger = logging.getLogger(__name__)
 async def upload_map_to_archive(ctx: commands.Context,
                                 server_id: int,
                                 board: Board,
-                                game_map: bytes,
+                                png_map: bytes,
                                 turn: Turn | None = None) -> None:
     """Uploads a map to the archive given a server ID and the map as a PNG."""
     if not MAP_ARCHIVE_SAS_TOKEN:
@@ -39,7 +38,6 @@ async def upload_map_to_archive(ctx: commands.Context,
                 break
     if url is None:
         return
-    png_map, _ = await svg_to_png(game_map, url)
     p = await asyncio.create_subprocess_shell(
         f'azcopy copy "{url}" --from-to PipeBlob --content-type image/png',
         stdout=PIPE,
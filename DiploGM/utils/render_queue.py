@@ -0,0 +1,192 @@
+"""Queue that runs synchronous map rendering off the event loop, with priorities and per-guild fairness."""
+import asyncio
+import logging
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from enum import IntEnum
+from typing import Any, AsyncIterator, Callable
+
+from discord.abc import Messageable
+
+from DiploGM.profiler import current_variant, profiler
+from .send_message import send_message_and_file
+
+logger = logging.getLogger(__name__)
+
+
+class RenderPriority(IntEnum):
+    """Priority classes for render jobs, lower values are rendered first."""
+    RESULTS = 0     # adjudication results, rollbacks and published maps
+    GM = 1          # GM commands, including scheduled ones
+    PLAYER = 2      # ad-hoc player requests such as .view_map
+    BACKGROUND = 3  # archive uploads and substitute adverts
+
+
+class RenderQueueFull(Exception):
+    """Raised when a low priority render is submitted while the queue is at capacity."""
+
+
+@dataclass
+class RenderStats:
+    """Wait and service times for a priority class, in seconds."""
+    count: int = 0
+    total_wait: float = 0
+    total_service: float = 0
+    max_wait: float = 0
+    max_service: float = 0
+    rejected: int = 0
+
+    def record(self, wait: float, service: float) -> None:
+        self.count += 1
+        self.total_wait += wait
+        self.total_service += service
+        self.max_wait = max(self.max_wait, wait)
+        self.max_service = max(self.max_service, service)
+
+
+class RenderJob:
+    """A single queued render."""
+    def __init__(self, guild_id: int, priority: RenderPriority, draw: Callable[[], Any], future: asyncio.Future):
+        self.guild_id = guild_id
+        self.priority = priority
+        self.draw = draw
+        self.future = future
+        self.enqueued_at = time.perf_counter()
+        self.started_at: float | None = None
+        self.variant = current_variant.get()
+
+
+class RenderQueue:
+    """Runs render jobs in a thread pool.
+    Jobs are started highest priority first, round-robin between guilds within a priority,
+    and PLAYER or BACKGROUND jobs are rejected once max_depth jobs are waiting.
+    Renders draw the live boards, so a guild's jobs are held back while its boards are being edited, see editing."""
+    def __init__(self, workers: int, max_depth: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._workers = workers
+        self._max_depth = max_depth
+        self._running = 0
+        self._depth = 0
+        # priority -> guild id -> waiting jobs; guilds are moved to the back after each job
+        self._pending: dict[RenderPriority, OrderedDict[int, deque[RenderJob]]] = {
+            priority: OrderedDict() for priority in RenderPriority
+        }
+        self.stats: dict[RenderPriority, RenderStats] = {priority: RenderStats() for priority in RenderPriority}
+        # guild id -> renders running, edits running or waiting, and edits waiting on the running renders
+        self._rendering: dict[int, int] = {}
+        self._editing: dict[int, int] = {}
+        self._edit_waiters: dict[int, list[asyncio.Future]] = {}
+
+    @property
+    def depth(self) -> int:
+        """The number of jobs waiting to start."""
+        return self._depth
+
+    async def submit(self,
+                     guild_id: int,
+                     priority: RenderPriority,
+                     draw: Callable[[], Any],
+                     notify: Messageable | None = None) -> Any:
+        """Queues a render and waits for its result.
+        If the job can't start straight away and notify is given, a "queued" message is sent there."""
+        if self._depth >= self._max_depth and priority >= RenderPriority.PLAYER:
+            self.stats[priority].rejected += 1
+            raise RenderQueueFull(f"Render queue is full ({self._depth} maps waiting)")
+
+        job = RenderJob(guild_id, priority, draw, asyncio.get_running_loop().create_future())
+        self._pending[priority].setdefault(guild_id, deque()).append(job)
+        self._depth += 1
+        self._dispatch()
+
+        if job.started_at is None and notify is not None:
+            _ = asyncio.create_task(send_message_and_file(
+                channel=notify,
+                title="Map queued",
+                message=f"The bot is busy, your map is queued behind {self._depth - 1} others.",
+            ))
+        return await job.future
+
+    @asynccontextmanager
+    async def editing(self, guild_id: int) -> AsyncIterator[None]:
+        """Keeps renders off a guild's boards while the event loop changes them.
+        Waits for the guild's running renders to finish, and holds its queued renders until the edit is done.
+        Don't render the guild's boards inside, as the render would wait on the edit."""
+        self._editing[guild_id] = self._editing.get(guild_id, 0) + 1
+        try:
+            while self._rendering.get(guild_id):
+                waiter = asyncio.get_running_loop().create_future()
+                self._edit_waiters.setdefault(guild_id, []).append(waiter)
+                await waiter
+            yield
+        finally:
+            self._editing[guild_id] -= 1
+            if not self._editing[guild_id]:
+                del self._editing[guild_id]
+            self._dispatch()
+
+    def _next_guild(self, guilds: OrderedDict[int, deque[RenderJob]]) -> int | None:
+        # guilds being edited keep their place until the edit is done
+        return next((guild_id for guild_id in guilds if guild_id not in self._editing), None)
+
+    def _next_job(self) -> RenderJob | None:
+        for priority in RenderPriority:
+            guilds = self._pending[priority]
+            while (guild_id := self._next_guild(guilds)) is not None:
+                jobs = guilds.pop(guild_id)
+                job = jobs.popleft()
+                if jobs:
+                    guilds[guild_id] = jobs
+                self._depth -= 1
+                if not job.future.cancelled():
+                    return job
+        return None
+
+    def _dispatch(self) -> None:
+        while self._running < self._workers and (job := self._next_job()) is not None:
+            self._running += 1
+            self._rendering[job.guild_id] = self._rendering.get(job.guild_id, 0) + 1
+            job.started_at = time.perf_counter()
+            result = asyncio.get_running_loop().run_in_executor(self._executor, job.draw)
+            result.add_done_callback(lambda result, job=job: self._finish(job, result))
+
+    def _finish(self, job: RenderJob, result: asyncio.Future) -> None:
+        self._running -= 1
+        self._rendering[job.guild_id] -= 1
+        if not self._rendering[job.guild_id]:
+            del self._rendering[job.guild_id]
+            for waiter in self._edit_waiters.pop(job.guild_id, []):
+                if not waiter.done():
+                    waiter.set_result(None)
+        assert job.started_at is not None
+        wait = job.started_at - job.enqueued_at
+        service = time.perf_counter() - job.started_at
+        self.stats[job.priority].record(wait, service)
+        profiler.record("render_queue.wait", wait, job.variant)
+        profiler.record("render_queue.service", service, job.variant)
+        logger.info(f"render_queue.{job.priority.name.lower()}.{job.guild_id} waited {wait}s, took {service}s")
+
+        if not job.future.cancelled():
+            if (exception := result.exception()) is not None:
+                job.future.set_exception(exception)
+            else:
+                job.future.set_result(result.result())
+        self._dispatch()
+
+    def get_stats_summary(self) -> str:
+        """Gets a human readable summary of the queue and its wait and service times."""
+        lines = [f"Running: {self._running}/{self._workers}, waiting: {self._depth}/{self._max_depth}"]
+        for priority, stats in self.stats.items():
+            if stats.count == 0 and stats.rejected == 0:
+                continue
+            average_wait = stats.total_wait / stats.count if stats.count else 0
+            average_service = stats.total_service / stats.count if stats.count else 0
+            lines.append(
+                f"{priority.name}: {stats.count} renders, "
+                f"wait avg {average_wait:.2f}s max {stats.max_wait:.2f}s, "
+                f"service avg {average_service:.2f}s max {stats.max_service:.2f}s, "
+                f"{stats.rejected} rejected"
+            )
+        return "\n".join(lines)
@@ -1,7 +1,6 @@
 import datetime
 from enum import Enum
 import io
-import re
 from typing import List, Tuple
 import logging
 
@@ -10,7 +9,7 @@ from discord import Message, Embed, Colour
 from discord.abc import Messageable
 
 from DiploGM import config
-from DiploGM.adjudicator.utils import svg_to_png, png_to_jpg
+from DiploGM.adjudicator.utils import MapSize, svg_to_png, svg_to_pngs, shrink_png
 from .logging import log_command_no_ctx
 
 
@@ -55,6 +54,15 @@ async def send_orders_locked_error(channel: Messageable) -> Message:
                     embed_colour=config.ERROR_COLOUR,
                 )
 
+async def send_render_queue_full_error(channel: Messageable) -> Message:
+    """Sends a 'Too many maps queued' error message to the specified channel."""
+    return await send_message_and_file(
+                    channel=channel,
+                    title="Too many maps queued!",
+                    message="The bot is busy rendering other maps, please try again in a minute.",
+                    embed_colour=config.ERROR_COLOUR,
+                )
+
 async def send_message_and_file(
     *,
     channel: Messageable,
@@ -69,6 +77,8 @@ async def send_message_and_file(
     footer_datetime: datetime.datetime | None = None,
     fields: List[Tuple[str, str]] | None = None,
     convert_svg: bool = False,
+    map_size: MapSize = MapSize.FULL,
+    variant: str | None = None,
     **_,
 ) -> Message:
 
@@ -79,7 +89,11 @@ async def send_message_and_file(
     assert embed_colour is not None
 
     if convert_svg and file and file_name:
-        file, file_name = await svg_to_png(file, file_name)
+        if map_size == MapSize.FULL:
+            file, file_name = await svg_to_png(file, file_name, variant)
+        else:
+            rasterized = await svg_to_pngs(file, file_name, (map_size,), variant)
+            file, file_name = rasterized.get(map_size), rasterized.file_name
 
     # Checks embed title and bodies are within limits.
     if fields:
@@ -168,19 +182,9 @@ async def send_message_and_file(
                 channel.guild.name,
                 channel.name,
                 "?",
-                f"png is too big ({len(file)}); converting to jpg",
+                f"png is too big ({len(file)}); converting to a smaller format",
             )
-            file, file_name, error = await png_to_jpg(file, file_name)
-            error = re.sub("\\s+", " ", str(error)[2:-1])
-            if len(error) > 0:
-                log_command_no_ctx(
-                    logger,
-                    "?",
-                    channel.guild.name,
-                    channel.name,
-                    "?",
-                    f"png to jpeg conversion errors: {error}",
-                )
+            file, file_name = await shrink_png(file, file_name, DISCORD_FILE_LIMIT)
             if len(file) > DISCORD_FILE_LIMIT or len(file) == 0:
                 log_command_no_ctx(
                     logger,
@@ -188,7 +192,7 @@ async def send_message_and_file(
                     channel.guild.name,
                     channel.name,
                     "?",
-                    f"jpg is too big ({len(file)})",
+                    f"{file_name} is too big ({len(file)})",
                 )
                 if False: #TODO: redo this: is_gm_channel(channel):
                     message = "Try `.vm true` to get an svg"
@@ -0,0 +1,40 @@
+"""Measures how much memory a loaded board takes for every variant.
+
+Usage: python scripts/benchmark_board_memory.py [variant ...]
+Run from the repository root; defaults to the latest version of every variant under variants/.
+Each board is deep copied the way game and history boards are, and the memory allocated for the copy is traced.
+The size of the pickled board is reported alongside it. Variants that fail to parse are skipped."""
+import copy
+import logging
+import pickle
+import sys
+import tracemalloc
+
+sys.path.insert(0, ".")
+from DiploGM.map_parser.vector.adjacency_cache import get_variant_names  # pylint: disable=wrong-import-position
+from DiploGM.map_parser.vector.vector import get_parser  # pylint: disable=wrong-import-position
+
+
+def main() -> None:
+    logging.disable(logging.WARNING)
+    variants = sys.argv[1:] or get_variant_names()
+    print(f"{'variant':<40} {'provinces':>9} {'units':>6} {'bytes/board':>12} {'pickled':>10}")
+    for variant in variants:
+        try:
+            board = get_parser(variant).parse()
+        except Exception as err:  # pylint: disable=broad-exception-caught
+            print(f"{variant:<40} skipped, failed to parse: {type(err).__name__}: {err}")
+            continue
+
+        tracemalloc.start()
+        start, _ = tracemalloc.get_traced_memory()
+        clone = copy.deepcopy(board)
+        end, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        pickled = len(pickle.dumps(clone))
+        print(f"{variant:<40} {len(board.provinces):>9} {len(board.units):>6} {end - start:>12,} {pickled:>10,}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""Times parse_path and transform parsing over every path in a variant SVG.
+
+Usage: python scripts/benchmark_parse_path.py [svg file] [repeats]
+Run from the repository root; defaults to the world chaos map, which has the most complex paths."""
+import sys
+import time
+
+from lxml import etree
+
+sys.path.insert(0, ".")
+from DiploGM.map_parser.vector.transform import TransGL3  # pylint: disable=wrong-import-position
+from DiploGM.map_parser.vector.utils import parse_path  # pylint: disable=wrong-import-position
+
+DEFAULT_SVG = "variants/impdip.1.2.chaos.sa/worldchaos_sa.svg"
+
+
+def main() -> None:
+    svg_file = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_SVG
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    root = etree.parse(svg_file).getroot()
+    paths = [element for element in root.iter("{http://www.w3.org/2000/svg}path") if element.get("d")]
+    total_length = sum(len(element.get("d")) for element in paths)
+
+    timings = []
+    points = failed = 0
+    for _ in range(repeats):
+        points = failed = 0
+        start = time.perf_counter()
+        for element in paths:
+            try:
+                points += sum(len(subpath) for subpath in parse_path(element.get("d"), TransGL3(element)))
+            except Exception:  # pylint: disable=broad-exception-caught
+                failed += 1
+        timings.append(time.perf_counter() - start)
+
+    print(f"{svg_file}: {len(paths)} paths, {total_length / 1024:.0f}KiB of path data, {points} points, "
+          f"{failed} unparseable")
+    print(f"best {min(timings) * 1000:.1f}ms, mean {sum(timings) / len(timings) * 1000:.1f}ms over {repeats} runs")
+
+
+if __name__ == "__main__":
+    main()
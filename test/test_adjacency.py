@@ -0,0 +1,87 @@
+"""Tests for detecting adjacencies from variant geometry."""
+import itertools
+import os
+import tempfile
+import unittest
+
+import shapely
+
+from DiploGM.map_parser.vector.adjacency_cache import (AdjacencyCacheKey, get_cache_path, load_adjacencies,
+                                                        save_adjacencies)
+from DiploGM.map_parser.vector.vector import Parser, get_geometry_adjacencies
+from DiploGM.utils.sanitise import parse_variant_path
+
+def get_shipped_parsers() -> dict[str, Parser]:
+    """Gets parsers for the latest version of every variant whose map is in the repository."""
+    parsers = {}
+    for variant in sorted(os.listdir("variants")):
+        if not os.path.isdir(f"variants/{variant}"):
+            continue
+        try:
+            name = parse_variant_path(variant, as_filename=False)
+            parsers[name] = Parser(name)
+        except Exception: # pylint: disable=broad-exception-caught
+            # not a variant this version of the parser can load, or its map isn't checked in
+            continue
+    return parsers
+
+class TestAdjacency(unittest.TestCase):
+    """Tests for get_geometry_adjacencies."""
+    def test_adjacency_1(self):
+        """
+            The spatial index should find the same adjacencies as checking every pair of provinces.
+        """
+        parsers = get_shipped_parsers()
+        self.assertIn("classic", parsers)
+        for variant, parser in parsers.items():
+            with self.subTest(variant=variant):
+                provinces, _ = parser.read_map()
+                margin = parser.layers["border_margin_hint"]
+                expected = {(province1.name, province2.name)
+                            for province1, province2 in itertools.combinations(provinces, 2)
+                            if shapely.dwithin(province1.geometry, province2.geometry, margin)}
+                self.assertEqual(get_geometry_adjacencies(provinces, margin), expected)
+
+class TestAdjacencyCache(unittest.TestCase):
+    """Tests for the content-hashed adjacency cache."""
+    key = AdjacencyCacheKey("0" * 64, 1, 0.5)
+    adjacencies = {("Berlin", "Kiel"), ("Kiel", "Munich"), ("Berlin", "Munich")}
+
+    def test_adjacency_cache_1(self):
+        """
+            Saved adjacencies should load back unchanged, and a missing cache should load as None.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            self.assertIsNone(load_adjacencies("test", self.key, directory))
+            save_adjacencies("test", self.key, self.adjacencies, directory)
+            self.assertEqual(load_adjacencies("test", self.key, directory), self.adjacencies)
+            save_adjacencies("empty", self.key, set(), directory)
+            self.assertEqual(load_adjacencies("empty", self.key, directory), set())
+
+    def test_adjacency_cache_2(self):
+        """
+            A cache built from a different SVG, parser version or margin should be ignored.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            save_adjacencies("test", self.key, self.adjacencies, directory)
+            for key in (AdjacencyCacheKey("1" * 64, 1, 0.5),
+                        AdjacencyCacheKey("0" * 64, 2, 0.5),
+                        AdjacencyCacheKey("0" * 64, 1, 1.0)):
+                with self.subTest(key=key):
+                    self.assertIsNone(load_adjacencies("test", key, directory))
+
+    def test_adjacency_cache_3(self):
+        """
+            A truncated or corrupt cache should be ignored rather than raising.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            save_adjacencies("test", self.key, self.adjacencies, directory)
+            path = get_cache_path("test", directory)
+            with open(path, "rb") as f:
+                data = f.read()
+            for corrupt in (data[:10], b"not a cache" + data, data[:-4]):
+                with open(path, "wb") as f:
+                    f.write(corrupt)
+                with self.subTest(corrupt=corrupt[:12]):
+                    with self.assertLogs("DiploGM.map_parser.vector.adjacency_cache", "WARNING"):
+                        self.assertIsNone(load_adjacencies("test", self.key, directory))
@@ -0,0 +1,117 @@
+"""Tests for finding the convoy paths drawn on moves maps."""
+import time
+import unittest
+
+import shapely
+
+from DiploGM.mapper.mapper import Mapper
+from DiploGM.mapper.order_drawer import MAX_CONVOY_PATHS, OrderDrawer
+from DiploGM.models.order import ConvoyTransport, Move
+from DiploGM.models.province import Province, ProvinceType
+from DiploGM.models.unit import Unit, UnitType
+from test.utils import BoardBuilder
+
+def old_convoy_paths(drawer: OrderDrawer, start: Province, end: Province) -> list[list[Province]]:
+    """The convoy path search from before it was bounded: every path through convoying fleets,
+    then only the paths that aren't a superset of a shorter one."""
+    def path_helper(current: Province, already_checked=()) -> list[list[Province]]:
+        if current in already_checked:
+            return []
+        options = []
+        new_checked = already_checked + (current,)
+        for possibility in current.adjacency_data.adjacent:
+            if possibility.name not in drawer.adjacent_provinces:
+                continue
+            if possibility == end:
+                options += [[end]]
+                continue
+            if (unit := possibility.unit) is None:
+                continue
+            if possibility.can_convoy and unit.order.destination == end:
+                options += path_helper(possibility, new_checked)
+        return [[current] + option for option in options]
+
+    valid_convoys = path_helper(start)
+    if valid_convoys:
+        if len(valid_convoys) > 1 and [start, end] in valid_convoys:
+            valid_convoys.remove([start, end])
+    else:
+        valid_convoys = [[start, end]]
+    valid_convoys.sort(key=len)
+    shortest_convoys: list[list[Province]] = []
+    for convoy in valid_convoys:
+        if not any(set(shortest).issubset(convoy) for shortest in shortest_convoys):
+            shortest_convoys.append(convoy)
+    return shortest_convoys
+
+def path_names(paths: list[list[Province]]) -> set[tuple[str, ...]]:
+    return {tuple(province.name for province in path) for path in paths}
+
+def make_grid_convoy(size: int) -> tuple[Province, Province, OrderDrawer]:
+    """An army convoyed from one corner of a size by size grid of convoying fleets to the other."""
+    grid = {(x, y): Province(f"Sea {x}-{y}", shapely.Polygon(), ProvinceType.SEA)
+            for x in range(size) for y in range(size)}
+    source = Province("Start", shapely.Polygon(), ProvinceType.LAND)
+    destination = Province("End", shapely.Polygon(), ProvinceType.LAND)
+    for (x, y), province in grid.items():
+        for neighbour in ((x + 1, y), (x, y + 1)):
+            if neighbour in grid:
+                province.set_adjacent(grid[neighbour])
+                grid[neighbour].set_adjacent(province)
+        province.unit = Unit(UnitType.FLEET, None, province, None)
+        province.unit.order = ConvoyTransport(source, destination)
+    for province, corner in ((source, grid[0, 0]), (destination, grid[size - 1, size - 1])):
+        province.set_adjacent(corner)
+        corner.set_adjacent(province)
+    source.unit = Unit(UnitType.ARMY, None, source, None)
+    source.unit.order = Move(destination)
+    return source, destination, OrderDrawer(None, None, {}, {p.name for p in [source, destination, *grid.values()]})
+
+class TestConvoyPaths(unittest.TestCase):
+    """Tests for OrderDrawer's convoy path search."""
+    def test_convoy_paths_1(self):
+        """
+            Convoys with several routes should be drawn along the same paths as the old exhaustive search,
+            shortest first.
+        """
+        convoys = [
+            ("London", "Belgium", ["English Channel", "North Sea"]),
+            ("Liverpool", "Portugal", ["Irish Sea", "North Atlantic Ocean", "Mid-Atlantic Ocean"]),
+            ("Tunis", "Spain", ["Western Mediterranean Sea", "Tyrrhenian Sea", "Gulf of Lyon", "Ionian Sea"]),
+            ("Norway", "Brest", ["North Sea", "English Channel", "Norwegian Sea", "North Atlantic Ocean",
+                                 "Irish Sea", "Mid-Atlantic Ocean"]),
+        ]
+        for start, end, fleets in convoys:
+            with self.subTest(f"{start} - {end}"):
+                b = BoardBuilder()
+                england = b.players["England"]
+                army = b.move(england, UnitType.ARMY, start, end)
+                for fleet in fleets:
+                    b.convoy(england, fleet, army, end)
+                drawer = Mapper(b.board).order_drawer
+                source, destination = b.board.get_province(start), b.board.get_province(end)
+
+                new_paths = drawer.find_convoy_path(source, destination)
+                old_paths = old_convoy_paths(drawer, source, destination)
+                self.assertGreater(len(old_paths), 1)
+                self.assertEqual(path_names(new_paths), path_names(old_paths))
+                self.assertEqual([len(path) for path in new_paths], sorted(len(path) for path in old_paths))
+
+    def test_convoy_paths_2(self):
+        """
+            Convoys through a grid of fleets, which has a huge number of paths with no shortcuts,
+            should stop at MAX_CONVOY_PATHS of the shortest paths, or once MAX_CONVOY_SEARCH paths have been tried.
+        """
+        source, destination, drawer = make_grid_convoy(6)
+        paths = drawer.find_convoy_path(source, destination)
+        self.assertEqual(len(paths), MAX_CONVOY_PATHS)
+        self.assertEqual(len(path_names(paths)), len(paths))
+        # every shortest path through the grid goes through 11 fleets
+        self.assertTrue(all(len(path) == 13 for path in paths))
+
+        source, destination, drawer = make_grid_convoy(12)
+        start = time.perf_counter()
+        paths = drawer.find_convoy_path(source, destination)
+        self.assertLess(time.perf_counter() - start, 5)
+        # the search gives up before reaching the far corner, so the move is drawn directly
+        self.assertEqual(path_names(paths), {("Start", "End")})
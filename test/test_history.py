@@ -0,0 +1,30 @@
+"""Tests for rendering the history of a game."""
+import os
+import tarfile
+import tempfile
+import unittest
+
+from DiploGM.db.database import get_connection
+from DiploGM.mapper.history import render_history
+from test.utils import BoardBuilder
+
+class TestHistory(unittest.TestCase):
+    """Tests for the history batch render."""
+    def test_history_1(self):
+        """
+            Every phase should be rendered in order into the output, in a directory or tarball.
+        """
+        board = BoardBuilder().board
+        phases = get_connection().get_phases(board.board_id)
+        self.assertEqual(phases[-1], board.turn.get_indexed_name())
+
+        with tempfile.TemporaryDirectory() as output:
+            stats = render_history(board.board_id, output, workers=1, niceness=0)
+            self.assertEqual(stats.phases, len(phases))
+            self.assertEqual(stats.failed, 0)
+            self.assertEqual(sorted(os.listdir(output))[-1], f"{len(phases) - 1:03d}_1901_Spring_Moves_moves_map.svg")
+
+            tar_path = os.path.join(output, "history.tar.gz")
+            render_history(board.board_id, tar_path, workers=1, niceness=0)
+            with tarfile.open(tar_path) as tar:
+                self.assertEqual(len(tar.getnames()), 2 * len(phases))
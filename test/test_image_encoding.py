@@ -0,0 +1,83 @@
+"""Tests for re-encoding oversized maps."""
+import io
+import unittest
+
+import numpy as np
+from PIL import Image
+
+from DiploGM.adjudicator.utils import (
+    MapSize, RasterizedMap, RASTERIZED_MAP_CACHE_SIZE, cache_rasterized_map, downscale_png, encode_to_size,
+    evict_rasterized_maps, get_cached_rasterized_map
+)
+from DiploGM.manager import Manager
+
+def make_png() -> bytes:
+    """A detailed image, so that quality makes a real difference to the encoded size."""
+    y, x = np.mgrid[0:200, 0:300]
+    pixels = np.stack([x % 256, y % 256, (x * y) % 256, np.full_like(x, 255)], -1).astype(np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels, "RGBA").save(output, format="PNG")
+    return output.getvalue()
+
+class TestImageEncoding(unittest.TestCase):
+    """Tests for encode_to_size and multi-resolution maps."""
+    def test_image_encoding_1(self):
+        """
+            The encoded image should fit the target size, at a higher quality when there's more room.
+        """
+        png = make_png()
+        for image_format, extension in (("jpeg", ".jpg"), ("webp", ".webp")):
+            small, small_name = encode_to_size(png, "map.png", 12000, image_format)
+            large, _ = encode_to_size(png, "map.png", 25000, image_format)
+            self.assertEqual(small_name, "map" + extension)
+            self.assertLessEqual(len(small), 12000)
+            self.assertLessEqual(len(large), 25000)
+            self.assertGreater(len(large), len(small))
+            with Image.open(io.BytesIO(small)) as image:
+                self.assertEqual(image.size, (300, 200))
+
+    def test_image_encoding_2(self):
+        """
+            If nothing fits, the lowest quality image should be returned.
+        """
+        png = make_png()
+        data, _ = encode_to_size(png, "map.png", 100, "jpeg", min_quality=40)
+        self.assertGreater(len(data), 100)
+
+    def test_image_encoding_3(self):
+        """
+            Downscaled maps should be scaled from the full size, and missing sizes should fall back to full size.
+        """
+        png = make_png()
+        pngs = downscale_png(png, [MapSize.MEDIUM])
+        with Image.open(io.BytesIO(pngs[MapSize.MEDIUM])) as image:
+            self.assertEqual(image.size, (150, 100))
+
+        rasterized = RasterizedMap("map.png", {MapSize.FULL: png, MapSize.MEDIUM: pngs[MapSize.MEDIUM]})
+        self.assertIs(rasterized.get(MapSize.MEDIUM), pngs[MapSize.MEDIUM])
+        self.assertIs(RasterizedMap("map.png", {MapSize.FULL: png}).get(MapSize.MEDIUM), png)
+
+    def test_image_encoding_4(self):
+        """
+            Only the most recently cached maps should be kept.
+        """
+        rasterized = RasterizedMap("map.png", {MapSize.FULL: b""})
+        for i in range(RASTERIZED_MAP_CACHE_SIZE + 1):
+            cache_rasterized_map(("test", i), rasterized)
+        self.assertIsNone(get_cached_rasterized_map(("test", 0)))
+        self.assertIs(get_cached_rasterized_map(("test", RASTERIZED_MAP_CACHE_SIZE)), rasterized)
+
+    def test_image_encoding_5(self):
+        """
+            Invalidating a server's maps, e.g. on rollback, reload or adjudication, should drop its rasterized maps
+            and leave other servers' maps alone.
+        """
+        rasterized = RasterizedMap("map.png", {MapSize.FULL: b""})
+        cache_rasterized_map(("orders", 1, "S1901M"), rasterized)
+        cache_rasterized_map(("orders", 2, "S1901M"), rasterized)
+        evict_rasterized_maps(1)
+        self.assertIsNone(get_cached_rasterized_map(("orders", 1, "S1901M")))
+        self.assertIs(get_cached_rasterized_map(("orders", 2, "S1901M")), rasterized)
+
+        Manager().invalidate_maps(2)
+        self.assertIsNone(get_cached_rasterized_map(("orders", 2, "S1901M")))
@@ -0,0 +1,93 @@
+"""Tests for moves maps that are kept between renders."""
+import unittest
+
+from DiploGM.mapper.live import LiveMovesMap
+from DiploGM.mapper.mapper import Mapper
+from DiploGM.models.order import Hold, Move
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder
+
+def sorted_elements(svg: bytes) -> list[bytes]:
+    """Units are drawn in set order, so compare maps without element ordering."""
+    return sorted(svg.split(b"<"))
+
+class TestLiveMap(unittest.TestCase):
+    """Tests for LiveMovesMap."""
+    def setUp(self):
+        self.b = BoardBuilder()
+        self.b.board.data["svg config"].setdefault("unknown", "888888")
+
+    def assert_matches_full_draw(self, live_map: LiveMovesMap):
+        live_svg, live_name = live_map.draw()
+        full_svg, full_name = Mapper(self.b.board).draw_moves_map(self.b.board.turn, None)
+        self.assertEqual(live_name, full_name)
+        self.assertEqual(sorted_elements(live_svg), sorted_elements(full_svg))
+
+    def test_live_map_1(self):
+        """
+            Changing orders should give the same map as drawing from scratch, without redrawing unchanged orders.
+        """
+        england = self.b.players["England"]
+        a_london = self.b.move(england, UnitType.ARMY, "London", "Wales")
+        a_paris = self.b.move(self.b.players["France"], UnitType.ARMY, "Paris", "Burgundy")
+        self.b.support_move(self.b.players["France"], UnitType.ARMY, "Marseilles", a_paris, "Burgundy")
+        live_map = LiveMovesMap(self.b.board, None)
+        self.assert_matches_full_draw(live_map)
+        untouched = live_map.drawn[a_paris][1]
+
+        a_london.order = Move(self.b.board.get_province("Yorkshire"))
+        self.assert_matches_full_draw(live_map)
+        self.assertIs(live_map.drawn[a_paris][1], untouched)
+
+        # the support follows the supported unit's order
+        a_paris.order = Hold()
+        self.assert_matches_full_draw(live_map)
+        self.assertIsNot(live_map.drawn[a_paris][1], untouched)
+
+    def test_live_map_2(self):
+        """
+            Live maps should go stale when the board state changes outside of orders.
+        """
+        self.b.army("London", self.b.players["England"])
+        live_map = LiveMovesMap(self.b.board, None)
+        self.assertTrue(live_map.is_current(self.b.board))
+        self.b.army("Paris", self.b.players["France"])
+        self.assertFalse(live_map.is_current(self.b.board))
+
+    def test_live_map_3(self):
+        """
+            Live maps should go stale when half cores or anything the side panel shows changes.
+        """
+        live_map = LiveMovesMap(self.b.board, None)
+        self.b.board.get_province("Paris").core_data.half_core = self.b.players["England"]
+        self.assertFalse(live_map.is_current(self.b.board))
+
+        live_map = LiveMovesMap(self.b.board, None)
+        self.b.board.add_nickname(self.b.players["England"], "Albion")
+        self.assertFalse(live_map.is_current(self.b.board))
+
+        live_map = LiveMovesMap(self.b.board, None)
+        self.b.board.data["players"]["France"]["hidden"] = "true"
+        self.assertFalse(live_map.is_current(self.b.board))
+
+    def test_live_map_4(self):
+        """
+            Redrawn orders, including holds and convoys drawn outside the arrow layer,
+            should end up in the same document order as drawing from scratch.
+        """
+        england, france = self.b.players["England"], self.b.players["France"]
+        a_london = self.b.move(england, UnitType.ARMY, "London", "Belgium")
+        self.b.convoy(england, "English Channel", a_london, "Belgium")
+        f_north_sea = self.b.hold(england, UnitType.FLEET, "North Sea")
+        a_paris = self.b.hold(france, UnitType.ARMY, "Paris")
+        self.b.hold(france, UnitType.ARMY, "Marseilles")
+        live_map = LiveMovesMap(self.b.board, None)
+        live_map.draw()
+
+        for unit, order in ((a_paris, Move(self.b.board.get_province("Burgundy"))), (a_paris, Hold()),
+                            (f_north_sea, Move(self.b.board.get_province("Norwegian Sea"))), (f_north_sea, Hold())):
+            unit.order = order
+            with self.subTest(unit=unit.province.name, order=type(order).__name__):
+                live_svg, _ = live_map.draw()
+                full_svg, _ = Mapper(self.b.board).draw_moves_map(self.b.board.turn, None)
+                self.assertEqual(live_svg, full_svg)
@@ -0,0 +1,71 @@
+"""Tests for the mapper's coordinate and SVG helpers."""
+import unittest
+
+import lxml.etree as etree
+import numpy as np
+
+from DiploGM.mapper.order_drawer import get_control_points
+from DiploGM.mapper.utils import MapperUtils, add_marker_definitions_to_svg, get_defs
+from test.utils import BoardBuilder
+
+class TestMapperUtils(unittest.TestCase):
+    """Tests for MapperUtils and the arrow geometry helpers."""
+    def test_mapper_utils_1(self):
+        """
+            The closest location should be found, crossing the edge of the map with a penalty.
+        """
+        utils = MapperUtils({"map_width": 1000})
+        self.assertEqual(utils.get_closest_loc({(100, 100), (400, 100)}, (350, 120)), [400, 100])
+        # crossing the edge moves the point by the map width
+        self.assertEqual(utils.get_closest_loc({(950, 100)}, (50, 100)), [-50, 100])
+        # but costs 500px, so a further point that doesn't cross is preferred
+        self.assertEqual(utils.get_closest_loc({(950, 100), (400, 100)}, (50, 100)), [400, 100])
+
+    def test_mapper_utils_2(self):
+        """
+            Batched lookups should match individual lookups, even with differently sized possibilities.
+        """
+        utils = MapperUtils({"map_width": 1000})
+        possibilities = [{(100, 100), (400, 100)}, {(950, 100)}, np.array([[10.0, 10.0], [20.0, 990.0], [900.0, 0.0]])]
+        coords = [(350, 120), (50, 100), (890, 5)]
+        self.assertEqual(utils.get_closest_locs(possibilities, coords),
+                         [utils.get_closest_loc(p, c) for p, c in zip(possibilities, coords)])
+        self.assertEqual(utils.get_closest_locs([], []), [])
+
+    def test_mapper_utils_3(self):
+        """
+            Control points should be pulled 30px from each inner point of a convoy path.
+        """
+        points = np.array([[0.0, 0.0], [100.0, 0.0], [100.0, 100.0], [200.0, 100.0]])
+        controls = get_control_points(points)
+        self.assertEqual(controls.shape, (2, 2))
+        for control, point in zip(controls, points[1:-1]):
+            self.assertAlmostEqual(float(np.linalg.norm(control - point)), 30)
+
+    def test_mapper_utils_4(self):
+        """
+            Only referenced half-core gradients should be added, reusing cached gradients for the same colors.
+        """
+        builder = BoardBuilder()
+        board = builder.board
+        board.data["build_options"] = "cores"
+        france, germany = builder.players["France"], builder.players["Germany"]
+        for province in ("Munich", "Berlin"):
+            board.get_province(province).core_data.core = germany
+            board.get_province(province).core_data.half_core = france
+        colors = {"None": "ffffff", "France": "0000ff", "Germany": "000000"}
+        utils = MapperUtils({})
+        cache = {}
+
+        svg = etree.ElementTree(etree.Element("{http://www.w3.org/2000/svg}svg"))
+        add_marker_definitions_to_svg(svg)
+        utils.add_half_core_gradients_to_svg(svg, board, colors, cache)
+        defs = get_defs(svg)
+        self.assertEqual([element.get("id") for element in defs],
+                         ["arrow", "redarrow", "ball", "redball", "France_Germany"])
+        self.assertEqual([stop.get("stop-color") for stop in defs[-1]], ["#0000ff", "#000000"])
+
+        svg = etree.ElementTree(etree.Element("{http://www.w3.org/2000/svg}svg"))
+        utils.add_half_core_gradients_to_svg(svg, board, colors, cache)
+        self.assertEqual(len(cache), 1)
+        self.assertIsNot(get_defs(svg)[0], cache[("France", "Germany", "0000ff", "000000")])
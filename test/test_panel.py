@@ -0,0 +1,87 @@
+"""Tests for the side panel layout parsed once per map template."""
+import unittest
+from unittest.mock import patch
+from xml.etree.ElementTree import ElementTree
+
+from DiploGM.map_parser.vector.transform import TransGL3
+from DiploGM.map_parser.vector.utils import find_svg_element, get_element_color
+from DiploGM.mapper.mapper import Mapper
+from DiploGM.models.board import Board
+from test.utils import BoardBuilder
+
+def parse_banner(power_element) -> tuple[tuple[float, float], tuple[float, float]]:
+    """The pretransform and final coordinates of a banner, parsed the way the panel drawer did on every render."""
+    pretransform_coordinates = TransGL3(power_element[0]).transform((float(power_element[0].get("x", 0)),
+                                                                     float(power_element[0].get("y", 0))))
+    return pretransform_coordinates, TransGL3(power_element).transform(pretransform_coordinates)
+
+def old_draw_banners(board: Board, svg: ElementTree) -> list[tuple[str, int]]:
+    """Matches players to banners the way the panel drawer did before the layout was cached, re-parsing each banner
+    (including the ones already moved into place) for every player. Returns the (player, banner position) pairs."""
+    banners = find_svg_element(svg, "power_banners", board.data["svg config"])
+    scoreboard_power_locations = sorted((parse_banner(power_element)[1] for power_element in banners),
+                                        key=lambda loc: loc[1])
+    high_player_count = (len(board.get_players()) > len(scoreboard_power_locations)
+                         or board.data.get("vassals") == "enabled")
+    drawn = []
+    for i, player in enumerate(board.get_players_sorted_by_score()):
+        if i >= len(scoreboard_power_locations):
+            break
+        for position, power_element in enumerate(banners):
+            if len(power_element) == 0:
+                continue
+            pretransform_coordinates, coordinates = parse_banner(power_element)
+            if high_player_count and coordinates != scoreboard_power_locations[i]:
+                continue
+            if not high_player_count and get_element_color(power_element[0]) != player.default_color:
+                continue
+            drawn.append((player.name, position))
+            new_translation = (scoreboard_power_locations[i][0] - pretransform_coordinates[0],
+                               scoreboard_power_locations[i][1] - pretransform_coordinates[1])
+            power_element.set("transform", f"translate({new_translation[0]}, {new_translation[1]})")
+            break
+    return drawn
+
+class TestPanel(unittest.TestCase):
+    """Tests for PanelLayout and PanelDrawer."""
+    def test_panel_1(self):
+        """
+            The cached banner layout should match parsing the banners on each render, and each player should be drawn
+            on the same banner, moved to the same place, as before, including when there are more players than banners.
+        """
+        b = BoardBuilder()
+        board = b.board
+        b.player_core(b.players["Turkey"], "Ankara", "Constantinople", "Smyrna", "Bulgaria")
+        b.player_core(b.players["England"], "London", "Edinburgh")
+
+        for extra_players in (0, 3):
+            for index in range(extra_players):
+                board.add_new_player(f"Extra {index}", "808080")
+            with self.subTest(players=len(board.get_players())):
+                mapper = Mapper(board)
+                layout = mapper.template.panel_layout
+                svg = mapper.template.copy_svg()
+                banners = find_svg_element(svg, "power_banners", board.data["svg config"])
+                self.assertEqual([banner.position for banner in layout.banners], list(range(len(banners))))
+                for banner, power_element in zip(layout.banners, banners):
+                    self.assertEqual((banner.pretransform_coordinates, banner.coordinates),
+                                     parse_banner(power_element))
+                    self.assertEqual(banner.color, get_element_color(power_element[0]))
+                self.assertEqual(layout.scoreboard_power_locations,
+                                 sorted((parse_banner(power_element)[1] for power_element in banners),
+                                        key=lambda loc: loc[1]))
+                self.assertEqual(mapper.panel_drawer._is_high_player_count(), extra_players > 0)
+
+                old_drawn = old_draw_banners(board, svg)
+                drawer = mapper.panel_drawer
+                new_svg = mapper.template.copy_svg()
+                with patch.object(drawer, "_draw_power_banner", wraps=drawer._draw_power_banner) as draw_banner:
+                    drawer._draw_side_panel_scoreboard(new_svg)
+                new_drawn = [(call.args[2].name, call.args[1].position) for call in draw_banner.call_args_list]
+                self.assertEqual(new_drawn, old_drawn)
+                self.assertEqual(len(new_drawn), min(len(board.get_players()), len(layout.banners)))
+                self.assertEqual(len({position for _, position in new_drawn}), len(new_drawn))
+
+                new_banners = find_svg_element(new_svg, "power_banners", board.data["svg config"])
+                for _, position in new_drawn:
+                    self.assertEqual(new_banners[position].get("transform"), banners[position].get("transform"))
@@ -0,0 +1,47 @@
+"""Tests for parsing SVG paths and transforms."""
+import unittest
+
+import numpy as np
+
+from DiploGM.map_parser.vector.transform import TransGL3
+from DiploGM.map_parser.vector.utils import parse_path
+
+class TestParsePath(unittest.TestCase):
+    """Tests for parse_path and TransGL3."""
+    def test_parse_path_1(self):
+        """
+            Relative, absolute, horizontal and vertical commands should give the end point of each command.
+        """
+        coordinates = parse_path("m10,20 l5,0 0,5 H30 v-10 h-5 c1,1 2,2 3,4 L0,0 z", TransGL3())
+        self.assertEqual(len(coordinates), 1)
+        self.assertEqual(coordinates[0].tolist(),
+                         [[10, 20], [15, 20], [15, 25], [30, 25], [30, 15], [25, 15], [28, 19], [0, 0], [10, 20]])
+
+    def test_parse_path_2(self):
+        """
+            Closing a path with more to come should start another subpath, and glued tokens should be split.
+        """
+        coordinates = parse_path("M0,0L10,0 10,10z m1,1 l2,0 0,2 Z", TransGL3("translate(100,200)"))
+        self.assertEqual([subpath.tolist() for subpath in coordinates], [
+            [[100, 200], [110, 200], [110, 210], [100, 200]],
+            [[111, 211], [113, 211], [113, 213], [111, 211]],
+        ])
+
+    def test_parse_path_3(self):
+        """
+            Malformed paths should raise errors.
+        """
+        for path in ("10,10 l1,1", "m1,1 l1", "m1,1 x2,2", "z", "m1,1 z 2"):
+            with self.subTest(path=path), self.assertRaises(Exception):
+                parse_path(path, TransGL3())
+
+    def test_parse_path_4(self):
+        """
+            Batched transforms should match transforming each point, and parsed transforms should be shared.
+        """
+        transform = TransGL3("matrix(0.5,0.1,-0.2,2,30,40)") * TransGL3("rotate(30,5,5)")
+        points = np.array([[1.5, 2.25], [-3, 7], [100, -50]])
+        self.assertTrue(np.allclose(transform.transform_array(points),
+                                    [transform.transform(tuple(point)) for point in points]))
+        self.assertIs(TransGL3("translate(1,2)").matrix, TransGL3(" translate(1,2) ").matrix)
+        self.assertFalse(TransGL3("translate(1,2)").matrix.flags.writeable)
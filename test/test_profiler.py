@@ -0,0 +1,127 @@
+"""Tests for the render profiler."""
+import asyncio
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from PIL import Image
+
+from DiploGM.adjudicator.utils import MapSize, svg_to_pngs
+from DiploGM.manager import Manager
+from DiploGM.mapper.mapper import Mapper
+from DiploGM.profiler import Histogram, Profiler, current_variant, profiler
+from DiploGM.utils.render_queue import RenderPriority
+from test.utils import BoardBuilder
+
+class TestProfiler(unittest.TestCase):
+    """Tests for profiler spans and histograms."""
+    def test_profiler_1(self):
+        """
+            Nothing should be recorded while profiling is disabled.
+        """
+        test_profiler = Profiler()
+        with test_profiler.span("test", "classic"):
+            pass
+        test_profiler.record("test_bytes", 100, "classic")
+        self.assertEqual(test_profiler.get_summary(), "Profiling is disabled.")
+
+    def test_profiler_2(self):
+        """
+            Values should be grouped by variant, falling back to the current variant, and dumped as JSON.
+        """
+        test_profiler = Profiler(enabled=True)
+        for value in (0.001, 0.002, 0.003, 0.1):
+            test_profiler.record("mapper.units", value, "classic")
+        token = current_variant.set("impdip")
+        try:
+            test_profiler.record("rasterize.png_bytes", 2048)
+        finally:
+            current_variant.reset(token)
+
+        with tempfile.TemporaryDirectory() as directory:
+            with open(test_profiler.dump(os.path.join(directory, "profile.json")), encoding="utf-8") as f:
+                data = json.load(f)
+        self.assertEqual(data["classic"]["mapper.units"]["count"], 4)
+        self.assertEqual(data["impdip"]["rasterize.png_bytes"]["max"], 2048)
+        self.assertNotIn("impdip", test_profiler.get_summary("classic"))
+
+    def test_profiler_3(self):
+        """
+            Histogram quantiles should be within a factor of two of the real value.
+        """
+        histogram = Histogram()
+        for value in range(1, 101):
+            histogram.add(value / 1000)
+        self.assertLessEqual(0.09, histogram.quantile(0.9))
+        self.assertLessEqual(histogram.quantile(0.9), 0.18)
+        self.assertEqual(histogram.quantile(1), 0.1)
+
+    def test_profiler_4(self):
+        """
+            Drawing a map should record spans for each stage under the board's variant.
+        """
+        board = BoardBuilder().board
+        profiler.enabled = True
+        profiler.reset()
+        try:
+            Mapper(board).draw_moves_map(board.turn, None)
+            summary = profiler.get_summary(board.datafile)
+        finally:
+            profiler.enabled = False
+            profiler.reset()
+        for name in ("mapper.template", "mapper.units", "mapper.recolor", "mapper.panel",
+                     "mapper.copy.moves", "mapper.orders", "mapper.serialize"):
+            self.assertIn(name, summary)
+
+    def test_profiler_5(self):
+        """
+            Renders should be attributed to their board's variant without it leaking into later records.
+        """
+        board = BoardBuilder().board
+        manager = Manager()
+        test_profiler = Profiler(enabled=True)
+
+        async def render_then_record():
+            await manager.render(board.board_id, RenderPriority.GM, lambda: None)
+            test_profiler.record("after_render", 1)
+
+        profiler.enabled = True
+        profiler.reset()
+        try:
+            asyncio.run(render_then_record())
+            summary = profiler.get_summary(board.datafile)
+        finally:
+            profiler.enabled = False
+            profiler.reset()
+        self.assertIn("render_queue.wait", summary)
+        self.assertIsNone(current_variant.get())
+        self.assertNotIn("after_render", test_profiler.get_summary(board.datafile))
+        self.assertIn("after_render", test_profiler.get_summary("unknown"))
+
+    def test_profiler_6(self):
+        """
+            Rasterizing happens after a render has finished, so it should be recorded under the variant it's given.
+        """
+        output = io.BytesIO()
+        Image.new("RGB", (40, 20)).save(output, format="PNG")
+        inkscape = MagicMock()
+        inkscape.communicate = AsyncMock(return_value=(output.getvalue(), b""))
+
+        profiler.enabled = True
+        profiler.reset()
+        try:
+            with patch("asyncio.create_subprocess_shell", AsyncMock(return_value=inkscape)):
+                rasterized = asyncio.run(svg_to_pngs(b"<svg/>", "map.svg", (MapSize.FULL, MapSize.MEDIUM), "classic"))
+            summary = profiler.get_summary("classic")
+            unknown_summary = profiler.get_summary("unknown")
+        finally:
+            profiler.enabled = False
+            profiler.reset()
+        self.assertEqual(rasterized.file_name, "map.png")
+        for name in ("rasterize.wait", "rasterize.process", "rasterize.svg_bytes", "rasterize.png_bytes",
+                     "rasterize.downscale"):
+            self.assertIn(name, summary)
+            self.assertNotIn(name, unknown_summary)
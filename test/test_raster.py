@@ -0,0 +1,97 @@
+"""Tests for reading provinces, owners and units from raster maps."""
+import itertools
+import unittest
+
+import numpy as np
+import shapely
+from scipy import ndimage
+
+from DiploGM.map_parser.raster.raster_input import (expand_labels, get_adjacencies, get_centers,
+                                                    get_province_geometries, get_province_owners, get_units)
+
+BORDER = (0, 0, 0, 255)
+OCEAN = (0, 38, 255, 255)
+GREEN = (0, 255, 33, 255)
+RED = (255, 0, 0, 255)
+GREEN_UNIT = (182, 255, 0, 255)
+RED_UNIT = (255, 0, 221, 255)
+
+def make_provinces_image() -> np.ndarray:
+    """A 3x3 grid of provinces with two pixel borders, with a stray pixel of another color in one province."""
+    image = np.zeros((32, 32, 4), dtype=np.uint8)
+    image[:] = BORDER
+    for row, column in itertools.product(range(3), range(3)):
+        color = OCEAN if row == 0 else GREEN if column < 2 else RED
+        image[row * 10 + 2:row * 10 + 10, column * 10 + 2:column * 10 + 10] = color
+    image[15, 15] = RED
+    return image
+
+class TestRaster(unittest.TestCase):
+    """Tests for the raster map parser."""
+    def setUp(self):
+        self.image = make_provinces_image()
+        self.province_id_map, self.num_provinces = ndimage.label((self.image != BORDER).any(-1),
+                                                                 structure=np.ones((3, 3)))
+
+    def test_raster_1(self):
+        """
+            Provinces should be adjacent exactly when their expanded pixels touch horizontally or vertically.
+        """
+        expanded = expand_labels(self.province_id_map, distance=3)
+        self.assertTrue((expanded != 0).all())
+        expected = set()
+        for row, column in itertools.product(range(expanded.shape[0]), range(expanded.shape[1])):
+            for other_row, other_column in ((row + 1, column), (row, column + 1)):
+                if other_row < expanded.shape[0] and other_column < expanded.shape[1]:
+                    pair = sorted((expanded[row, column], expanded[other_row, other_column]))
+                    if pair[0] != pair[1]:
+                        expected.add(tuple(pair))
+        self.assertEqual(get_adjacencies(expanded), expected)
+        # a grid has no diagonal adjacencies
+        self.assertEqual(len(expected), 12)
+
+    def test_raster_2(self):
+        """
+            Owners should come from each province's most common color, and units from the province they mostly cover.
+        """
+        with self.assertLogs("DiploGM.map_parser.raster.raster_input", "WARNING"):
+            owners = get_province_owners(self.image, self.province_id_map, self.num_provinces)
+        self.assertEqual(sorted(owners.values()), ["green"] * 4 + ["ocean"] * 3 + ["red"] * 2)
+
+        units = np.zeros_like(self.image)
+        units[4:8, 4:8] = GREEN_UNIT
+        units[5, 5] = (1, 2, 3, 255)
+        # mostly over the middle right province, a little over the one below
+        units[16:23, 24:28] = RED_UNIT
+        found = get_units(self.province_id_map, units)
+        self.assertEqual(found, {
+            self.province_id_map[5, 5]: {"unit_number": 1, "player": "green"},
+            self.province_id_map[15, 25]: {"unit_number": 2, "player": "red"},
+        })
+
+        centers = np.zeros_like(self.image)
+        centers[14:17, 9:13] = GREEN
+        self.assertEqual(get_centers(self.province_id_map, centers),
+                         {self.province_id_map[15, 5], self.province_id_map[15, 15]})
+
+    def test_raster_3(self):
+        """
+            Each province's geometry should cover exactly its own pixels, including provinces that aren't rectangles.
+        """
+        # join the top left province to the ones below and to the right of it, making an L shape
+        self.image[10:12, 2:10] = OCEAN
+        self.image[2:10, 10:12] = OCEAN
+        province_id_map, num_provinces = ndimage.label((self.image != BORDER).any(-1), structure=np.ones((3, 3)))
+        geometries = get_province_geometries(province_id_map)
+        self.assertEqual(sorted(geometries), list(range(1, num_provinces + 1)))
+
+        rows, columns = np.indices(province_id_map.shape)
+        centers = shapely.points(columns.ravel() + 0.5, rows.ravel() + 0.5)
+        for province_id, geometry in geometries.items():
+            with self.subTest(province_id=province_id):
+                mask = (province_id_map == province_id).ravel()
+                self.assertEqual(geometry.area, mask.sum())
+                self.assertTrue((shapely.contains(geometry, centers) == mask).all())
+        l_shape = geometries[province_id_map[5, 5]]
+        self.assertEqual(l_shape.area, 8 * 8 * 3 + 8 * 2 * 2)
+        self.assertLess(l_shape.area, l_shape.envelope.area)
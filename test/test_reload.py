@@ -0,0 +1,73 @@
+"""Tests for reloading a variant without reparsing unchanged geometry or reloading boards from the database."""
+import asyncio
+import copy
+import unittest
+
+from DiploGM.manager import Manager
+from DiploGM.map_parser.vector.vector import Parser, get_parser
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder
+
+class TestReload(unittest.TestCase):
+    """Tests for Parser reuse and Board.rebind_variant."""
+    def test_reload_1(self):
+        """
+            A parser for an unchanged SVG should reuse the last parser's shapes and adjacencies,
+            unless the SVG's layer config has changed.
+        """
+        previous = get_parser("classic")
+        previous.parse()
+        parser = Parser("classic", previous=previous)
+        self.assertTrue(parser.reuses_geometry)
+        self.assertIs(parser.cache_provinces, previous.cache_provinces)
+        self.assertEqual({p.name for p in parser.parse().provinces}, {p.name for p in previous.parse().provinces})
+
+        previous = copy.copy(previous)
+        previous.layers = dict(previous.layers, border_margin_hint=previous.layers["border_margin_hint"] + 1)
+        self.assertFalse(Parser("classic", previous=previous).reuses_geometry)
+
+    def test_reload_2(self):
+        """
+            Rebinding should take the new map data but keep units, owners and this game's own parameters,
+            with adjacencies pointing at the board's own provinces.
+        """
+        builder = BoardBuilder()
+        board = builder.board
+        army = builder.army("Spain", builder.players["France"])
+        board.get_province("Spain").owner = builder.players["France"]
+        board.custom_data["build_options"] = "anywhere"
+
+        variant_board = Parser("classic").parse()
+        new_spain, new_moscow = variant_board.get_province("Spain"), variant_board.get_province("Moscow")
+        new_spain.set_adjacent(new_moscow)
+        new_moscow.set_adjacent(new_spain)
+        new_moscow.set_unit_coordinate((1, 2), UnitType.ARMY)
+
+        self.assertTrue(board.rebind_variant(variant_board))
+        spain, moscow = board.get_province("Spain"), board.get_province("Moscow")
+        self.assertIn(moscow, spain.adjacency_data.adjacent)
+        self.assertNotIn(new_moscow, spain.adjacency_data.adjacent)
+        self.assertEqual(moscow.get_unit_coordinates(UnitType.ARMY), (1, 2))
+        self.assertIs(spain.unit, army)
+        self.assertIn(spain, builder.players["France"].centers)
+        self.assertEqual(board.data["build_options"], "anywhere")
+        for province in board.provinces:
+            for adjacent in province.adjacency_data.adjacent:
+                self.assertIn(adjacent, board.provinces)
+
+    def test_reload_3(self):
+        """
+            A board whose provinces no longer match the variant shouldn't be changed,
+            and reloading the variant should keep the live board when it can.
+        """
+        board = BoardBuilder().board
+        variant_board = Parser("classic").parse()
+        variant_board.provinces.remove(variant_board.get_province("Spain"))
+        spain_adjacent = set(board.get_province("Spain").adjacency_data.adjacent)
+        self.assertFalse(board.rebind_variant(variant_board))
+        self.assertEqual(board.get_province("Spain").adjacency_data.adjacent, spain_adjacent)
+
+        manager = Manager()
+        message = asyncio.run(manager.reload_variant("classic"))
+        self.assertIs(manager.get_board(0), board)
+        self.assertIn("updated in place", message)
@@ -0,0 +1,82 @@
+"""Tests for the render queue."""
+import asyncio
+import threading
+import unittest
+
+from DiploGM.utils.render_queue import RenderPriority, RenderQueue, RenderQueueFull
+
+class TestRenderQueue(unittest.IsolatedAsyncioTestCase):
+    """Tests for render queue ordering and backpressure."""
+    async def test_render_queue_1(self):
+        """
+            Higher priorities should render first, and guilds should take turns within a priority.
+            Guild 1: two player renders, Guild 2: one player render, Guild 3: one results render
+            Order should be guild 3, guild 1, guild 2, guild 1.
+        """
+        queue = RenderQueue(workers=1, max_depth=10)
+        release = threading.Event()
+        order = []
+
+        blocker = asyncio.create_task(queue.submit(0, RenderPriority.GM, release.wait))
+        await asyncio.sleep(0)
+        jobs = [
+            asyncio.create_task(queue.submit(guild_id, priority, lambda guild_id=guild_id: order.append(guild_id)))
+            for guild_id, priority in [(1, RenderPriority.PLAYER),
+                                       (1, RenderPriority.PLAYER),
+                                       (2, RenderPriority.PLAYER),
+                                       (3, RenderPriority.RESULTS)]
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.gather(blocker, *jobs)
+
+        self.assertEqual(order, [3, 1, 2, 1])
+        self.assertEqual(queue.stats[RenderPriority.PLAYER].count, 3)
+
+    async def test_render_queue_2(self):
+        """
+            Player renders should be rejected when the queue is full, but results should still be queued.
+        """
+        queue = RenderQueue(workers=1, max_depth=1)
+        release = threading.Event()
+
+        blocker = asyncio.create_task(queue.submit(0, RenderPriority.GM, release.wait))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(queue.submit(1, RenderPriority.PLAYER, lambda: 1))
+        await asyncio.sleep(0)
+
+        with self.assertRaises(RenderQueueFull):
+            await queue.submit(2, RenderPriority.PLAYER, lambda: 2)
+        results = asyncio.create_task(queue.submit(3, RenderPriority.RESULTS, lambda: 3))
+        await asyncio.sleep(0)
+        release.set()
+
+        self.assertEqual(await waiting, 1)
+        self.assertEqual(await results, 3)
+        await blocker
+        self.assertEqual(queue.stats[RenderPriority.PLAYER].rejected, 1)
+
+    async def test_render_queue_3(self):
+        """
+            Edits should wait for a guild's running renders, and hold back its queued renders until they're done,
+            without holding up other guilds.
+        """
+        queue = RenderQueue(workers=2, max_depth=10)
+        release = threading.Event()
+        events = []
+
+        async def edit():
+            async with queue.editing(1):
+                events.append("edit")
+
+        running = asyncio.create_task(queue.submit(1, RenderPriority.GM, release.wait))
+        await asyncio.sleep(0)
+        editing = asyncio.create_task(edit())
+        await asyncio.sleep(0)
+        queued = asyncio.create_task(queue.submit(1, RenderPriority.RESULTS, lambda: events.append("guild 1")))
+        await queue.submit(2, RenderPriority.GM, lambda: events.append("guild 2"))
+        self.assertEqual(events, ["guild 2"])
+
+        release.set()
+        await asyncio.gather(running, editing, queued)
+        self.assertEqual(events, ["guild 2", "edit", "guild 1"])
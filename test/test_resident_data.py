@@ -0,0 +1,54 @@
+"""Tests for placing supply centers, units and names in provinces."""
+import random
+import unittest
+
+from lxml import etree
+from shapely.geometry import Point
+
+from DiploGM.map_parser.vector.utils import initialize_province_resident_data
+from test.utils import BoardBuilder
+
+def get_coordinates(element) -> tuple[float | None, float | None]:
+    x, y = element.get("x"), element.get("y")
+    return (float(x), float(y)) if x is not None and y is not None else (None, None)
+
+class TestResidentData(unittest.TestCase):
+    """Tests for initialize_province_resident_data."""
+    def test_resident_data_1(self):
+        """
+            Every element should be matched to the same province as checking each province in turn.
+        """
+        province_set = BoardBuilder().board.provinces
+        provinces = list(province_set)
+        bounds = [province.geometry.bounds for province in provinces if not province.geometry.is_empty]
+        min_x, min_y = min(b[0] for b in bounds), min(b[1] for b in bounds)
+        max_x, max_y = max(b[2] for b in bounds), max(b[3] for b in bounds)
+        rng = random.Random(0)
+        elements = [etree.Element("circle", {"id": str(i),
+                                             "x": str(rng.uniform(min_x, max_x)),
+                                             "y": str(rng.uniform(min_y, max_y))}) for i in range(500)]
+        elements.append(etree.Element("circle", {"id": "no coordinates"}))
+
+        expected = []
+        remaining = [element for element in elements if element.get("x") is not None]
+        for province in provinces:
+            contained = [element for element in remaining if province.geometry.contains(Point(get_coordinates(element)))]
+            expected.extend((province.name, element.get("id")) for element in contained)
+            remaining = [element for element in remaining if element not in contained]
+
+        matched = []
+        with self.assertLogs("DiploGM.map_parser.vector.utils", "WARNING") as logs:
+            initialize_province_resident_data(province_set, elements, get_coordinates,
+                                              lambda province, element, _: matched.append((province.name, element.get("id"))))
+        self.assertEqual(matched, expected)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn(f"{len(remaining)} elements aren't in any province", logs.output[0])
+
+    def test_resident_data_2(self):
+        """
+            An empty layer shouldn't match anything.
+        """
+        provinces = BoardBuilder().board.provinces
+        matched = []
+        initialize_province_resident_data(provinces, [], get_coordinates, lambda *args: matched.append(args))
+        self.assertEqual(matched, [])
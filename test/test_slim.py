@@ -0,0 +1,58 @@
+"""Tests for slimming rendered SVGs."""
+import unittest
+
+import lxml.etree as etree
+
+from DiploGM.mapper.slim import round_numbers, slim_svg
+
+SVG = b"""<svg xmlns="http://www.w3.org/2000/svg"
+    xmlns:inkscape="http://www.inkscape.org/namespaces/inkscape"
+    xmlns:sodipodi="http://sodipodi.sourceforge.net/DTD/sodipodi-0.dtd">
+  <sodipodi:namedview id="view" />
+  <defs>
+    <marker id="arrow"><path d="M 0,0 L 1,1" /></marker>
+    <marker id="unused"><path d="M 0,0 L 1,1" /></marker>
+  </defs>
+  <g inkscape:label="Layer" inkscape:groupmode="layer"><g /></g>
+  <g style="display:none"><path d="M 0,0 L 1,1" /></g>
+  <path style="fill:#ffffff;marker-end:url(#arrow)" d="M 1.23456,2.34567 L 3,4" />
+  <path style="fill:#ffffff;marker-end:url(#arrow)" d="M 5,6 L 7,8" sodipodi:type="star" />
+</svg>"""
+
+class TestSlim(unittest.TestCase):
+    """Tests for the SVG slimming pass."""
+    def test_slim_1(self):
+        """
+            Numbers should be rounded without merging adjacent numbers.
+        """
+        self.assertEqual(round_numbers("m 2157.3123,443.50781 c -0.4797,0.27696 z", 2), "m 2157.31,443.51 c -0.48,0.28 z")
+        self.assertEqual(round_numbers("M1.001.5L-3.333-4.4449e-3", 2), "M1 0.5L-3.33 0")
+
+    def test_slim_2(self):
+        """
+            Editor data, hidden elements, empty groups and unused defs should be removed.
+        """
+        root = etree.fromstring(SVG)
+        slim_svg(root)
+        svg = etree.tostring(root).decode()
+
+        self.assertNotIn("inkscape:", svg)
+        self.assertNotIn("sodipodi:", svg)
+        self.assertNotIn("display:none", svg)
+        self.assertNotIn("<g", svg)
+        self.assertNotIn('id="unused"', svg)
+        self.assertIn('id="arrow"', svg)
+
+    def test_slim_3(self):
+        """
+            Repeated styles should be moved into a class.
+        """
+        root = etree.fromstring(SVG)
+        slim_svg(root)
+        paths = root.findall("{http://www.w3.org/2000/svg}path")
+        style = root.find("{http://www.w3.org/2000/svg}style")
+
+        self.assertEqual([path.get("class") for path in paths], ["s0", "s0"])
+        self.assertIsNotNone(style)
+        self.assertIn(".s0{fill:#ffffff;marker-end:url(#arrow)}", style.text)
+        self.assertEqual(paths[0].get("d"), "M 1.23,2.35 L 3,4")
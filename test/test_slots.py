@@ -0,0 +1,46 @@
+"""Tests that the slotted board models still pickle and copy."""
+import copy
+import pickle
+import unittest
+
+from DiploGM.adjudicator.defs import AdjudicableOrder
+from DiploGM.models.order import Build, Move
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder
+
+class TestSlots(unittest.TestCase):
+    """Tests for the __slots__ on Province, Unit, the orders and AdjudicableOrder."""
+    def setUp(self):
+        self.builder = BoardBuilder()
+        france, germany = self.builder.players["France"], self.builder.players["Germany"]
+        self.army = self.builder.move(france, UnitType.ARMY, "Paris", "Burgundy")
+        self.builder.army("Munich", germany)
+        self.builder.build(germany, (UnitType.FLEET, "Kiel"))
+
+    def test_slots_1(self):
+        """
+            Provinces, units and orders shouldn't have a __dict__.
+        """
+        board = self.builder.board
+        objects = [board.get_province("Paris"), board.get_province("Paris").core_data,
+                   board.get_province("Paris").adjacency_data, self.army, self.army.order,
+                   next(iter(self.builder.players["Germany"].build_orders)), AdjudicableOrder(self.army)]
+        for obj in objects:
+            with self.subTest(type(obj).__name__):
+                self.assertFalse(hasattr(obj, "__dict__"))
+
+    def test_slots_2(self):
+        """
+            A board should round trip through pickle and deepcopy with its provinces, units and orders intact.
+        """
+        for clone in (pickle.loads(pickle.dumps(self.builder.board)), copy.deepcopy(self.builder.board)):
+            paris, burgundy = clone.get_province("Paris"), clone.get_province("Burgundy")
+            self.assertIsNot(paris, self.builder.board.get_province("Paris"))
+            self.assertIs(paris.unit.province, paris)
+            self.assertIsInstance(paris.unit.order, Move)
+            self.assertIs(paris.unit.order.destination, burgundy)
+            self.assertIn(burgundy, paris.adjacency_data.adjacent)
+            self.assertIn(paris.unit, clone.units)
+            build, = clone.get_player("Germany").build_orders
+            self.assertIsInstance(build, Build)
+            self.assertIs(build.province, clone.get_province("Kiel"))
@@ -0,0 +1,158 @@
+"""Tests for the per-variant map templates."""
+import copy
+import itertools
+import json
+import os
+import tempfile
+import unittest
+
+import lxml.etree as etree
+
+from DiploGM.map_parser.vector.utils import NAMESPACE, find_svg_element
+from DiploGM.mapper.mapper import Mapper
+from DiploGM.mapper.template import MapTemplate, clear_map_template, get_map_template
+from DiploGM.models.province import ProvinceType
+from DiploGM.models.unit import UnitType
+from test.utils import BoardBuilder
+
+LABEL = f"{NAMESPACE['inkscape']}label"
+
+def color_by_label(mapper: Mapper) -> None:
+    """Recolors provinces and centers by looking up each element's label, as the mapper did before the index."""
+    svg, svg_data = mapper.board_svg, mapper.board_svg_data
+    layers = {name: find_svg_element(svg, name, svg_data) for name in
+              ("land_layer", "island_fill_layer", "island_ring_layer", "sea_borders", "island_borders",
+               "supply_center_icons")}
+    layers = {name: layer if layer is not None else [] for name, layer in layers.items()}
+
+    def get_color(province) -> str:
+        if province.name not in mapper.adjacent_provinces:
+            return svg_data["unknown"]
+        if province.owner:
+            return mapper.player_colors[province.owner.name]
+        return mapper.impassable_color if province.is_impassable else mapper.neutral_color
+
+    for element in itertools.chain(layers["land_layer"], layers["island_fill_layer"]):
+        mapper.utils.color_element(element, get_color(mapper.board.get_province(element.get(LABEL))))
+    for element in itertools.chain(layers["sea_borders"], layers["island_borders"]):
+        if element.get(LABEL) in mapper.adjacent_provinces:
+            mapper.utils.color_element(element, mapper.clear_seas_color)
+    for element in layers["island_ring_layer"]:
+        mapper.utils.color_element(element, get_color(mapper.board.get_province(element.get(LABEL))), key="stroke")
+
+    for center_element in layers["supply_center_icons"]:
+        province = mapper.board.get_province(center_element.get(LABEL))
+        if province.name not in mapper.adjacent_provinces:
+            core_color = half_color = svg_data["unknown"]
+        else:
+            core_color = mapper.player_colors[province.core_data.core.name] if province.core_data.core else "#ffffff"
+            half_color = (mapper.player_colors[province.core_data.half_core.name]
+                          if province.core_data.half_core else core_color)
+        for element in center_element:
+            if element.attrib["id"].startswith("Capital_Marker"):
+                continue
+            if element.get(LABEL) == "Halfcore Marker":
+                mapper.utils.color_element(element, half_color)
+            elif element.get(LABEL) == "Core Marker":
+                mapper.utils.color_element(element, core_color)
+            elif half_color != core_color:
+                core_name = province.core_data.core.name if province.core_data.core else "None"
+                half_name = province.core_data.half_core.name if province.core_data.half_core else "None"
+                mapper.utils.color_element(element, f"url(#{half_name}_{core_name})")
+            else:
+                mapper.utils.color_element(element, core_color)
+
+def old_gui_data(board) -> tuple[dict, dict, dict]:
+    """The location, coast and province type data the GUI map script was given before it was cached."""
+    locdict = {}
+    coast_to_province = {}
+    province_to_province_type = {}
+    for province in board.provinces:
+        coast = None
+        if province.unit:
+            unit_type = province.unit.unit_type
+            coast = province.unit.coast
+        else:
+            unit_type = UnitType.FLEET if province.type == ProvinceType.SEA else UnitType.ARMY
+        locdict[province.name] = list(province.get_unit_coordinates(unit_type, coast))
+        for coast in province.get_multiple_coasts():
+            locdict[province.get_name(coast)] = list(province.get_unit_coordinates(UnitType.FLEET, coast))
+            coast_to_province[province.get_name(coast)] = province.name
+        province_to_province_type[province.name] = province.type.name.lower()
+    return locdict, coast_to_province, province_to_province_type
+
+class TestTemplate(unittest.TestCase):
+    """Tests for MapTemplate."""
+    def test_template_1(self):
+        """
+            Recoloring through the template's element index should give the same SVG as looking up each element's
+            label, including for provinces with more than one element in a layer.
+        """
+        b = BoardBuilder()
+        board = b.board
+        board.data = {**board.data, "svg config": {"unknown": "888888", **board.data["svg config"]}}
+        board.get_province("Munich").core_data.half_core = b.players["France"]
+        board.change_owner(board.get_province("Belgium"), b.players["England"])
+
+        svg = etree.parse(board.data["file"])
+        for layer_name, province in (("land_layer", "Paris"), ("sea_borders", "North Sea"),
+                                     ("supply_center_icons", "Munich")):
+            layer = find_svg_element(svg, layer_name, board.data["svg config"])
+            element = next(element for element in layer if element.get(LABEL) == province)
+            layer.append(copy.deepcopy(element))
+        variant_file = board.data["file"]
+        with tempfile.TemporaryDirectory() as directory:
+            board.data["file"] = os.path.join(directory, "classic.svg")
+            svg.write(board.data["file"])
+            template = MapTemplate(board)
+        board.data["file"] = variant_file
+        for layer_name, province in (("land_layer", "Paris"), ("sea_borders", "North Sea"),
+                                     ("supply_center_icons", "Munich")):
+            self.assertEqual(len(template.layer_index[layer_name][province]), 2)
+
+        for restriction in (None, b.players["England"]):
+            with self.subTest(restriction=restriction):
+                mapper = Mapper(board, restriction)
+                mapper.template = template
+                mapper.board_svg = template.copy_svg()
+                mapper._color_provinces()
+                mapper._color_centers()
+                indexed = etree.tostring(mapper.board_svg)
+
+                mapper.board_svg = template.copy_svg()
+                color_by_label(mapper)
+                self.assertEqual(indexed, etree.tostring(mapper.board_svg))
+
+    def test_template_2(self):
+        """
+            The cached GUI data along with the per-phase location overrides should give the same locations as
+            building them per render, and clearing the template should drop the cached data.
+        """
+        b = BoardBuilder()
+        board = b.board
+        b.fleet("Spain sc", b.players["France"])
+        b.fleet("Brest", b.players["France"])
+        b.army("Paris", b.players["France"])
+        b.fleet("North Sea", b.players["England"])
+
+        clear_map_template(board.datafile)
+        template = get_map_template(board)
+        cached = template.get_gui_data(board)
+        self.assertIs(template.get_gui_data(board), cached)
+        self.assertEqual(cached, MapTemplate(board).get_gui_data(board))
+
+        gui_data = json.loads(cached)
+        overrides = template.get_gui_location_overrides(board)
+        locdict, coast_to_province, province_to_province_type = old_gui_data(board)
+        self.assertEqual({**gui_data["location_data"], **overrides}, locdict)
+        self.assertEqual(gui_data["coast_to_province"], coast_to_province)
+        self.assertEqual(gui_data["province_to_province_type"], province_to_province_type)
+        self.assertEqual(gui_data["svg_config"], board.data["svg config"])
+        self.assertIn("Spain", overrides)
+        self.assertNotIn("Paris", overrides)
+
+        clear_map_template(board.datafile)
+        refreshed = get_map_template(board)
+        self.assertIsNot(refreshed, template)
+        self.assertIsNone(refreshed._gui_data)
+        self.assertEqual(refreshed.get_gui_data(board), cached)
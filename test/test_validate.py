@@ -0,0 +1,45 @@
+"""Tests for the variant validation tool."""
+import unittest
+
+from DiploGM.map_parser.validate import find_variants, validate_variant, validate_variants
+
+class TestValidate(unittest.TestCase):
+    """Tests for validating variants ahead of a deploy."""
+    def test_validate_1(self):
+        """
+            Every variant with a config should be found, including versions nested in a variant folder.
+        """
+        variants = find_variants()
+        self.assertIn("classic", variants)
+        self.assertIn("impdip.1.2.chaos.sa", variants)
+        self.assertEqual(variants, sorted(set(variants)))
+
+    def test_validate_2(self):
+        """
+            A valid variant should pass with timings for each stage, and a broken one should be reported, not raised.
+        """
+        result = validate_variant("classic")
+        self.assertTrue(result["ok"], result)
+        self.assertEqual(result["svg_errors"], [])
+        self.assertEqual(set(result["timings"]), {"load", "verify_svg", "parse", "verify_adjacencies", "total"})
+
+        result = validate_variant("classic.missing")
+        self.assertFalse(result["ok"])
+        self.assertIn("ValueError", result["error"])
+
+    def test_validate_3(self):
+        """
+            Variants validated in the process pool should come back in the order they were given.
+        """
+        results = validate_variants(["classic.missing", "classic"], jobs=2)
+        self.assertEqual([result["variant"] for result in results], ["classic.missing", "classic"])
+        self.assertEqual([result["ok"] for result in results], [False, True])
+
+    def test_validate_4(self):
+        """
+            Chaos variants, whose players are detected from the map and whose high seas only exist in the config,
+            should pass too, as a failing variant fails the image build.
+        """
+        result = validate_variant("impdip.1.2.chaos.sa")
+        self.assertTrue(result["ok"], result)
+        self.assertEqual(result["svg_errors"], [])
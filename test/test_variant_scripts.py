@@ -0,0 +1,54 @@
+"""Tests for caching compiled variant scripts."""
+import os
+import tempfile
+import unittest
+
+from DiploGM.models.board import _get_compiled_script
+
+class TestVariantScripts(unittest.TestCase):
+    """Tests for _get_compiled_script."""
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "scripts.py")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write(self, source: str, mtime_ns: int):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(source)
+        os.utime(self.path, ns=(mtime_ns, mtime_ns))
+
+    def run_script(self) -> dict:
+        script_globals = {"__builtins__": __builtins__}
+        exec(_get_compiled_script(self.path), script_globals)
+        return script_globals
+
+    def test_variant_scripts_1(self):
+        """
+            A script should only be compiled again when its contents change, and a missing script gives None.
+        """
+        self.assertIsNone(_get_compiled_script(self.path))
+        self.write("value = 1\n", 1_000_000_000)
+        code = _get_compiled_script(self.path)
+        self.assertIs(_get_compiled_script(self.path), code)
+
+        # touched, but not changed
+        self.write("value = 1\n", 2_000_000_000)
+        self.assertIs(_get_compiled_script(self.path), code)
+
+        self.write("value = 2\n", 3_000_000_000)
+        self.assertIsNot(_get_compiled_script(self.path), code)
+        self.assertEqual(self.run_script()["value"], 2)
+
+    def test_variant_scripts_2(self):
+        """
+            A script that fails to compile shouldn't be cached, and each run should start from fresh globals.
+        """
+        self.write("value = (\n", 1_000_000_000)
+        with self.assertRaises(SyntaxError):
+            _get_compiled_script(self.path)
+
+        self.write("value = globals().get('value', 0) + 1\nif value > 1:\n    raise RuntimeError\n", 2_000_000_000)
+        self.assertEqual(self.run_script()["value"], 1)
+        self.assertEqual(self.run_script()["value"], 1)
@@ -0,0 +1,66 @@
+"""Tests for finding adjacency issues in a variant."""
+import time
+import unittest
+
+import shapely
+
+from DiploGM.map_parser.verify import verify_adjacencies
+from DiploGM.models.province import Province, ProvinceType
+from test.utils import BoardBuilder
+
+def connect(*provinces: Province):
+    for province in provinces:
+        province.adjacency_data.adjacent.update(p for p in provinces if p != province)
+
+class GridBoard:
+    """Just enough of a board for verify_adjacencies: a grid of provinces with diagonals in some cells."""
+    def __init__(self, size: int):
+        grid = {(x, y): Province(f"Grid {x}-{y}", shapely.Polygon(), ProvinceType.LAND)
+                for x in range(size) for y in range(size)}
+        for (x, y), province in grid.items():
+            for neighbour in ((x + 1, y), (x, y + 1), (x + 1, y + 1) if (x * 7 + y * 3) % 2 else None):
+                if neighbour in grid:
+                    connect(province, grid[neighbour])
+        self.provinces = set(grid.values())
+
+    def get_province(self, name: str) -> Province:
+        return next(province for province in self.provinces if province.name == name)
+
+class TestVerify(unittest.TestCase):
+    """Tests for verify_adjacencies."""
+    def test_verify_1(self):
+        """
+            Classic should only have the loop of provinces around the board edge, reported once.
+        """
+        warnings = verify_adjacencies(BoardBuilder().board)
+        self.assertEqual(len(warnings), 1)
+        self.assertTrue(warnings[0].startswith("Found a loop of provinces Armenia, Syria,"))
+        self.assertIn("St. Petersburg, Moscow, Sevastopol. If they surround", warnings[0])
+
+    def test_verify_2(self):
+        """
+            Adjacencies with nothing in common and groups of four bordering provinces should be found once each,
+            with the provinces in name order.
+        """
+        board = BoardBuilder().board
+        paris, munich, ruhr, spain, moscow = (board.get_province(name)
+                                              for name in ("Paris", "Munich", "Ruhr", "Spain", "Moscow"))
+        connect(paris, munich)
+        connect(paris, ruhr)
+        connect(spain, moscow)
+        warnings = verify_adjacencies(board)
+        self.assertIn("Provinces Moscow and Spain are adjacent but have no common adjacencies", warnings)
+        self.assertEqual(warnings.count("Provinces Burgundy, Munich, Paris, and Ruhr all border each other"), 1)
+        self.assertEqual(warnings, verify_adjacencies(board))
+
+    def test_verify_3(self):
+        """
+            Loops should be found without trying every path, as a partly triangulated grid has a huge number of them.
+        """
+        board = GridBoard(20)
+        start = time.perf_counter()
+        warnings = verify_adjacencies(board)
+        self.assertLess(time.perf_counter() - start, 5)
+        loops = [warning for warning in warnings if warning.startswith("Found a loop")]
+        self.assertTrue(loops)
+        self.assertEqual(len(loops), len(set(loops)))
@@ -0,0 +1,115 @@
+"""Tests for Fog of War visibility."""
+import unittest
+
+from test.utils import BoardBuilder
+from DiploGM.cogs.fog_of_war import get_panel_key, get_view_key
+from DiploGM.manager import Manager
+from DiploGM.mapper.mapper import Mapper
+from DiploGM.models.province import ProvinceType
+from DiploGM.models.unit import UnitType
+
+class TestVisibility(unittest.TestCase):
+    """Tests for the provinces a player can see in Fog of War games."""
+    def test_visibility_1(self):
+        """
+            Visibility should match a full scan over every province on the starting board.
+        """
+        manager = Manager()
+        try:
+            manager.total_delete(0)
+        except:
+            pass
+        manager.create_game(0, "classic")
+        board = manager.get_board(0)
+
+        all_visible = board.get_all_visible_provinces()
+        for player in board.players:
+            expected = set()
+            for province in board.provinces:
+                for unit in player.units:
+                    if (unit.unit_type == UnitType.ARMY
+                        and province in unit.province.adjacency_data.adjacent
+                        and province.type != ProvinceType.SEA):
+                        expected.add(province)
+                    if (unit.unit_type == UnitType.FLEET
+                        and unit.province.is_coastally_adjacent((province, None), unit.coast)):
+                        expected.add(province)
+            for unit in player.units:
+                expected.add(unit.province)
+            for province in player.centers:
+                if province.core_data.core == player:
+                    expected.update(province.adjacency_data.adjacent)
+                expected.add(province)
+
+            self.assertEqual(all_visible[player], expected, f"Visibility mismatch for {player.name}")
+
+    def test_visibility_2(self):
+        """
+            Visibility should follow units that are moved after it was first computed.
+            England: A Wales -> Edinburgh (edited directly)
+            England should see Clyde but no longer see London.
+        """
+        b = BoardBuilder()
+        england = b.players["England"]
+        for province in list(england.centers):
+            b.board.change_owner(province, None)
+        a_wales = b.army("Wales", england)
+
+        visible = b.board.get_visible_provinces(england)
+        self.assertIn(b.board.get_province("London"), visible)
+        self.assertNotIn(b.board.get_province("Clyde"), visible)
+
+        b.board.move_unit(a_wales, b.board.get_province("Edinburgh"))
+        visible = b.board.get_visible_provinces(england)
+        self.assertIn(b.board.get_province("Clyde"), visible)
+        self.assertNotIn(b.board.get_province("London"), visible)
+
+    def test_visibility_3(self):
+        """
+            Fleets should see sea provinces but armies should not.
+            Turkey: F Ankara, A Smyrna
+            Turkey should see the Black Sea, but not the Eastern Mediterranean.
+        """
+        b = BoardBuilder()
+        turkey = b.players["Turkey"]
+        for province in list(turkey.centers):
+            b.board.change_owner(province, None)
+        b.fleet("Ankara", turkey)
+        b.army("Smyrna", turkey)
+
+        visible = b.board.get_visible_provinces(turkey)
+        self.assertIn(b.board.get_province("Black Sea"), visible)
+        self.assertNotIn(b.board.get_province("Eastern Mediterranean Sea"), visible)
+
+    def test_visibility_4(self):
+        """
+            Players who see the same provinces should share one drawn map, with only the side panel drawn for each.
+            England: A Paris, France: Paris as its only center
+        """
+        b = BoardBuilder()
+        b.board.data["svg config"].setdefault("unknown", "888888")
+        england, france = b.players["England"], b.players["France"]
+        for player in (england, france):
+            for province in list(player.centers):
+                b.board.change_owner(province, None)
+        b.army("Paris", england)
+        b.board.change_owner(b.board.get_province("Paris"), france)
+        b.board.get_province("Paris").core_data.core = france
+        self.assertEqual(get_view_key(b.board, england), get_view_key(b.board, france))
+        self.assertNotEqual(get_panel_key(b.board, england), get_panel_key(b.board, france))
+
+        for draw_moves in (False, True):
+            with self.subTest(draw_moves=draw_moves):
+                mapper = Mapper(b.board, england)
+                svg, _ = mapper.draw_moves_svg(b.board.turn, None) if draw_moves else mapper.draw_current_svg()
+                exported = mapper.export_for_players(svg, [england, france])
+                for player, player_svg in zip((england, france), exported):
+                    player_mapper = Mapper(b.board, player)
+                    expected, _ = (player_mapper.draw_moves_map(b.board.turn, None) if draw_moves
+                                   else player_mapper.draw_current_map())
+                    self.assertEqual(sorted(player_svg.split(b"<")), sorted(expected.split(b"<")))
+                self.assertNotEqual(exported[0], exported[1])
+
+        b.board.data["players"]["England"]["hidden"] = "true"
+        b.board.data["players"]["France"]["hidden"] = "true"
+        self.assertEqual(get_panel_key(b.board, england), get_panel_key(b.board, france))